@@ -1,44 +1,255 @@
 # -*- coding: utf-8 -*-
 """Parsing command-line arguments and executing the application."""
 
-import argparse
-
-from base16_theme_switcher import app
-
-
-parser = argparse.ArgumentParser(
-    description=(
-        'Set an .Xresources based color theme for supported applications.\n'
-    )
-)
-parser.add_argument(
-    '-c', '--config', type=str,
-    default='~/.config/base16-theme-switcher/config.yml',
-    help='A configuration file to be used for the theme switcher.'
-)
-parser.add_argument(
-    '-l', '--log', type=str,
-    default='~/.logs/base16-theme-switcher/latest.log',
-    help='An output file for latest logs.'
-)
-parser.add_argument(
-    '-v', '--verbose', type=bool, default=False,
-    help=(
-        'Print not only errors, but also debug messages in standard output.'
-    )
-)
-
-group = parser.add_mutually_exclusive_group()
-
-group.add_argument(
-    'theme_name', type=str, nargs='?', default=None,
-    help='A name of a theme to be set.'
-)
-
-group.add_argument(
-    '-r', '--reload', type=bool, default=False,
-    help='Reload an already set theme.'
-)
-
-arguments = parser.parse_args()
-app.main(arguments)
+import re
+import sys
+
+
+def positive_int(text):
+    """Convert a command-line argument to a positive integer.
+
+    :param text: the argument.
+    :returns: the integer.
+    :raises argparse.ArgumentTypeError: if the argument isn't
+        a positive integer.
+    """
+    import argparse
+
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(
+            'a positive integer is required: {}'.format(text)
+        )
+    return value
+
+
+def get_parser():
+    """Get a parser of command-line arguments of the application.
+
+    :returns: the parser.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            'Set an .Xresources based color theme for supported '
+            'applications.\n'
+        )
+    )
+    parser.add_argument(
+        '-c', '--config', type=str,
+        default='~/.config/base16-theme-switcher/config.yml',
+        help='A configuration file to be used for the theme switcher.'
+    )
+    parser.add_argument(
+        '-l', '--log', type=str,
+        default='~/.logs/base16-theme-switcher/latest.log',
+        help='An output file for latest logs.'
+    )
+    parser.add_argument(
+        '-v', '--verbose', action='store_true',
+        help=(
+            'Print not only errors, but also debug messages in standard '
+            'output.'
+        )
+    )
+    parser.add_argument(
+        '-r', '--reload', action='store_true',
+        help='Reload an already set theme, like the reload command.'
+    )
+
+    display_parser = argparse.ArgumentParser(add_help=False)
+
+    display_group = display_parser.add_mutually_exclusive_group()
+
+    display_group.add_argument(
+        '-d', '--display', type=str, action='append', dest='displays',
+        help=(
+            'An X display to which the theme is applied, instead of the '
+            'display inherited by the process. May be given several times.'
+        )
+    )
+
+    display_group.add_argument(
+        '-a', '--all-displays', action='store_true',
+        help='Apply the theme to all displays found in /tmp/.X11-unix.'
+    )
+
+    display_parser.add_argument(
+        '-j', '--display-jobs', type=positive_int, default=4,
+        help='The maximum number of displays updated at the same time.'
+    )
+
+    subparsers = parser.add_subparsers(
+        dest='command',
+        help=(
+            'A command to be executed. By default, a theme is set, so '
+            'a name of a theme may be given without the set command.'
+        )
+    )
+
+    set_parser = subparsers.add_parser(
+        'set', parents=[display_parser],
+        help='Set a theme.'
+    )
+    set_parser.add_argument(
+        'theme', type=str, nargs='?', default=None,
+        help=(
+            'A name of a theme to be set. If omitted, a user is prompted '
+            'for it.'
+        )
+    )
+
+    subparsers.add_parser(
+        'reload', parents=[display_parser],
+        help='Reload an already set theme.'
+    ).set_defaults(reload=True)
+
+    subparsers.add_parser(
+        'stats',
+        help='Show percentiles of recent durations of theme appliers.'
+    )
+
+    export_parser = subparsers.add_parser(
+        'export',
+        help='Write palettes of themes in a format used by other tools.'
+    )
+    export_parser.add_argument(
+        'patterns', type=str, nargs='*',
+        help=(
+            'Shell-style patterns matching names of themes to be '
+            'exported. By default, all themes are exported.'
+        )
+    )
+    export_parser.add_argument(
+        '-f', '--format', choices=('jsonl', 'csv', 'css', 'osc'),
+        default='jsonl',
+        help=(
+            'A format of the palettes: JSON lines, CSV, CSS custom '
+            'properties or terminal escape sequences.'
+        )
+    )
+    export_parser.add_argument(
+        '-o', '--output', type=str, default=None,
+        help='An output file. By default, standard output is used.'
+    )
+    export_parser.add_argument(
+        '-j', '--jobs', type=positive_int, default=None,
+        help=(
+            'The maximum number of worker processes. By default, it is '
+            'the number of processors.'
+        )
+    )
+
+    gallery_parser = subparsers.add_parser(
+        'gallery',
+        help=(
+            'Render swatches of all themes and an HTML index into '
+            'a directory. Only new and modified themes are rendered.'
+        )
+    )
+    gallery_parser.add_argument(
+        'output', type=str,
+        help='A directory to which the gallery is written.'
+    )
+    gallery_parser.add_argument(
+        '-j', '--jobs', type=positive_int, default=None,
+        help=(
+            'The maximum number of worker processes. By default, it is '
+            'the number of processors.'
+        )
+    )
+
+    complete_parser = subparsers.add_parser(
+        'complete',
+        help=(
+            'Print names of themes starting with a prefix, for shell '
+            'completion. With --script SHELL, print a completion script '
+            'for bash, zsh or fish.'
+        )
+    )
+    complete_parser.add_argument('prefix', nargs='?', default='')
+    complete_parser.add_argument('--script', type=str)
+
+    parser.set_defaults(
+        command='set', theme=None, reload=False,
+        displays=None, all_displays=False, display_jobs=4
+    )
+    return parser
+
+
+COMMANDS = 'set', 'reload', 'stats', 'export', 'gallery', 'complete'
+"""Names of commands of the application."""
+
+
+def _insert_default_command(argv):
+    """Insert the "set" command before its arguments if it's omitted.
+
+    :param argv: command-line arguments.
+    :returns: a new list of the arguments.
+    """
+    argv = list(argv)
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ('-c', '--config', '-l', '--log'):
+            i += 2
+        elif (arg.startswith(('--config=', '--log=')) or
+              re.match(r'-[vr]*[cl].', arg) or
+              re.fullmatch(r'-[vr]+|--verbose|--reload', arg)):
+            i += 1
+        elif re.fullmatch(r'-[vr]*[cl]', arg):
+            i += 2
+        else:
+            if arg not in COMMANDS + ('-h', '--help'):
+                argv.insert(i, 'set')
+            break
+    return argv
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments of the application.
+
+    For compatibility with earlier versions, the "set" command may be
+    omitted before a name of a theme and its options, and -r/--reload
+    may be used instead of the "reload" command.
+
+    :param argv: the arguments, or None for arguments of the process.
+    :returns: the parsed arguments.
+    """
+    parser = get_parser()
+    args = parser.parse_args(_insert_default_command(
+        sys.argv[1:] if argv is None else argv
+    ))
+    if args.reload and args.command == 'set':
+        if args.theme is not None:
+            parser.error('a theme name can\'t be used with -r/--reload')
+        args.command = 'reload'
+    return args
+
+
+def main():
+    """Execute the application.
+
+    The "complete" command is executed before importing the rest of
+    the application, because it must respond as quickly as possible.
+    If it's the first argument, even parsing of arguments is skipped.
+    """
+    if sys.argv[1:2] == ['complete']:
+        from base16_theme_switcher import completion
+        sys.exit(completion.main(sys.argv[2:]))
+
+    args = parse_args()
+    if args.command == 'complete':
+        from base16_theme_switcher import completion
+        sys.exit(completion.run(args.prefix, args.script, args.config))
+
+    from base16_theme_switcher import app
+    app.main(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,56 @@
 """The application's root components."""
 
 import logging
+import os
 import subprocess
+import sys
+import threading
 from abc import ABC, abstractmethod
+from pathlib import Path
 
-from .config_structures import ConfigValueError, SetupError, YamlConfigPath
+from . import commands, metrics
+from .completion import load_theme_names, save_theme_names
+from .config_structures import (
+    ConfigValueError,
+    ConfiguredAbsolutePath,
+    RootConfigMapping,
+    SetupError,
+    YamlConfigPath,
+)
+from .discovery import (
+    DEFAULT_DIRECTORY_CACHE_PATH,
+    DEFAULT_IGNORED,
+    load_theme_directories,
+    save_theme_directories,
+)
+from .displays import (
+    DEFAULT_MAX_WORKERS,
+    apply_to_displays,
+    find_displays,
+)
+from .export import export_palettes, select_themes
+from .latency import DEFAULT_HISTORY_PATH, LatencyStore, format_summary
+from .locking import DEFAULT_LOCK_PATH, SwitchCoordinator
 from .logging import configure_b16ts_root_logger, get_info_logger
 from .plugin_loading import apply_configured_prefixed_plugins
-from .themes import Base16ThemeNameMap
+from .preview import DEFAULT_PREVIEW_DELAY, ThemePreview
+from .scheduling import ApplierScheduler, ApplierTask
+from .schemes import COLOR_NAMES, DEFAULT_CACHE_PATH, SchemeCache
+from .terminals import (
+    DEFAULT_PTS_DIR,
+    find_terminals,
+    get_osc_sequences,
+    write_to_terminals,
+)
+from .themes import (
+    Base16Theme,
+    Base16ThemeNameMap,
+    ProbedThemeNameMap,
+    StreamedThemeNameMap,
+    get_search_paths,
+    stream_theme_names,
+)
+from .xresources import DEFAULT_STATE_DIR, ResourceDatabase
 
 
 class ThemeApplier(ABC):
@@ -18,6 +61,10 @@ class ThemeApplier(ABC):
     base16 theme setting for applications accepting color configuration.
     """
 
+    supports_preview = False
+    """True if the theme applier is fast and its effects are undone by
+    applying another theme, so it may be used to preview themes."""
+
     @abstractmethod
     def apply(self, theme):
         """Perform actions necessary to apply the theme.
@@ -38,6 +85,414 @@ class ThemeApplier(ABC):
         return NotImplemented
 
 
+class DisplayThemeApplier(ThemeApplier):
+    """A theme applier for applications running on a specific X display.
+
+    When a theme is applied to several X displays, the instances of this
+    class are used once for each of the displays, while other theme
+    appliers are used only once.
+    """
+
+    @abstractmethod
+    def apply_to_display(self, theme, display):
+        """Perform actions necessary to apply the theme on the display.
+
+        :param theme: a theme to be set.
+        :param display: a name of the X display, like ":0", or None
+            for the display inherited by the process.
+        """
+        pass
+
+    def apply(self, theme):
+        """Apply the theme on the display inherited by the process.
+
+        :param theme: a theme to be set.
+        """
+        self.apply_to_display(theme, os.environ.get('DISPLAY'))
+
+    @classmethod
+    def __subclasshook__(cls, C):
+        if cls is DisplayThemeApplier:
+            if any('apply_to_display' in B.__dict__ for B in C.__mro__):
+                return True
+        return NotImplemented
+
+
+class PreparedChange(ABC):
+    """Changes prepared by a theme applier, to be made visible later."""
+
+    @abstractmethod
+    def commit(self):
+        """Make the changes visible.
+
+        This is supposed to be quick, so that changes prepared by all
+        theme appliers become visible at nearly the same time.
+        """
+        pass
+
+    @abstractmethod
+    def abort(self):
+        """Discard the changes that were not made visible.
+
+        It is called if committing changes of any theme applier fails,
+        and it must not raise errors.
+        """
+        pass
+
+
+class TwoPhaseThemeApplier(ThemeApplier):
+    """A theme applier doing its expensive work before a switch.
+
+    Theme appliers are used in two phases if possible: changes of all
+    instances of this class are prepared in parallel, before any theme
+    applier is used, and they are committed when the appliers are
+    scheduled to be used. For this reason, preparing changes must not
+    depend on effects of other theme appliers.
+    """
+
+    @abstractmethod
+    def prepare(self, theme):
+        """Prepare changes applying the theme, without making them
+        visible.
+
+        :param theme: a theme to be set.
+        :returns: an instance of PreparedChange.
+        """
+        pass
+
+    def apply(self, theme):
+        """Prepare changes applying the theme and commit them.
+
+        :param theme: a theme to be set.
+        """
+        change = self.prepare(theme)
+        try:
+            change.commit()
+        except BaseException:
+            change.abort()
+            raise
+
+    @classmethod
+    def __subclasshook__(cls, C):
+        if cls is TwoPhaseThemeApplier:
+            if any('prepare' in B.__dict__ for B in C.__mro__):
+                return True
+        return NotImplemented
+
+
+class XrdbMergeApplier(DisplayThemeApplier):
+    """A theme applier merging a theme into the X resource database.
+
+    Only resources whose values differ from those in a model of the
+    resource database of each display are merged.
+    """
+
+    supports_preview = True
+
+    def __init__(self, state_dir=None):
+        """Create a new instance.
+
+        :param state_dir: a path to a directory storing models of
+            resource databases between runs, or None if they are not
+            to be stored.
+        """
+        self._state_dir = state_dir
+        self._databases = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def apply_to_display(self, theme, display):
+        """Merge the theme into the resource database of the display.
+
+        :param theme: a theme to be set.
+        :param display: a name of the X display, or None for the
+            display inherited by the process.
+        """
+        with self._lock:
+            database = self._databases.get(display)
+            if database is None:
+                database = self._databases[display] = ResourceDatabase(
+                    display, self._state_dir
+                )
+        changed = database.merge(theme.content)
+        if changed is not None:
+            self._logger.debug(
+                'Merged %d changed X resources of "%s".',
+                len(changed), theme.name
+            )
+
+
+class TerminalWrite(PreparedChange):
+    """Escape sequences to be written to terminals."""
+
+    def __init__(self, paths, data, timeout):
+        """Create a new instance.
+
+        :param paths: paths to the terminals.
+        :param data: the escape sequences, as bytes.
+        :param timeout: the maximum time of writing to a terminal, in
+            seconds.
+        """
+        self._paths = paths
+        self._data = data
+        self._timeout = timeout
+        self._logger = logging.getLogger(__name__)
+
+    def commit(self):
+        """Write the escape sequences.
+
+        Terminals that can't be written to are logged and skipped.
+        """
+        errors = write_to_terminals(self._paths, self._data, self._timeout)
+        for path, error in errors.items():
+            self._logger.debug('Couldn\'t recolor %s: %s', path, error)
+
+    def abort(self):
+        """Do nothing, because nothing is staged."""
+
+
+class TerminalColorsApplier(TwoPhaseThemeApplier):
+    """A theme applier changing colors of running terminals.
+
+    Escape sequences setting the colors are written to all
+    pseudo-terminals of the user, so terminals use the theme without
+    being restarted.
+    """
+
+    supports_preview = True
+
+    def __init__(self, pts_dir=DEFAULT_PTS_DIR, timeout=0.5):
+        """Create a new instance.
+
+        :param pts_dir: a directory containing pseudo-terminal devices.
+        :param timeout: the maximum time of writing to a terminal, in
+            seconds.
+        """
+        self._pts_dir = pts_dir
+        self._timeout = timeout
+
+    def prepare(self, theme):
+        """Get escape sequences setting colors of the theme.
+
+        :param theme: a theme to be set.
+        :returns: an instance of TerminalWrite, writing the sequences
+            to terminals found when it was prepared.
+        """
+        data = get_osc_sequences(
+            {n: theme[n] for n in COLOR_NAMES}
+        ).encode('ascii')
+        return TerminalWrite(
+            find_terminals(self._pts_dir), data, self._timeout
+        )
+
+
+XRDB_MERGE = 'xrdb-merge'
+"""A name of the task merging a theme into the X resource database.
+
+Theme appliers depend on this task by default.
+"""
+
+TERMINAL_COLORS = 'terminal-colors'
+"""A name of the task changing colors of running terminals.
+
+It is used only if the "recolor-terminals" option is enabled.
+"""
+
+PROMPT_ROLE = 'prompt'
+"""A role of a plugin providing a theme prompt."""
+
+STREAMING_PROMPT_ROLE = 'streaming-prompt'
+"""A role of a plugin providing a streaming theme prompt."""
+
+APPLIER_ROLE = 'applier'
+"""A role of a plugin providing theme appliers."""
+
+
+class StreamingPrompt(ABC):
+    """A theme prompt showing names of themes while they are found.
+
+    Such a prompt can be shown before all themes are found, and it is
+    filled incrementally, starting with names of themes found by the
+    previous search.
+    """
+
+    @abstractmethod
+    def prompt_from(self, theme_names, **kwargs):
+        """Prompt a user for a theme.
+
+        :param theme_names: an iterator of instances of ThemeNameChange,
+            adding names of found themes and removing names of themes
+            that turned out to be unavailable. It may block until more
+            themes are found.
+        :param kwargs: keyword arguments passed to other prompts, like
+            preview.
+        :returns: a name of the chosen theme.
+        """
+        pass
+
+    @classmethod
+    def __subclasshook__(cls, C):
+        if cls is StreamingPrompt:
+            if any('prompt_from' in B.__dict__ for B in C.__mro__):
+                return True
+        return NotImplemented
+
+
+def check_prompt(value):
+    """Check if an object may be used as a theme prompt.
+
+    :param value: the object.
+    :raises TypeError: if the object is neither callable nor an
+        instance of StreamingPrompt.
+    """
+    if not callable(value) and not isinstance(value, StreamingPrompt):
+        raise TypeError('The prompt must be callable.')
+
+
+class LazyPluginComponents:
+    """Components provided by a plugin activated on first use.
+
+    An instance is passed to the plugin module instead of the builder,
+    and records the prompt and theme appliers the plugin provides.
+    """
+
+    def __init__(self, plugin, config):
+        """Create a new instance.
+
+        :param plugin: an instance of LazyPlugin.
+        :param config: a configuration mapping of the application.
+        """
+        self._plugin = plugin
+        self._config = config
+        self._prompt = None
+        self._lock = threading.Lock()
+        self._activated = False
+        self.theme_appliers = []
+
+    @property
+    def config(self):
+        """Configuration mapping to be used by theme switcher."""
+        return self._config
+
+    @property
+    def plugins_to_activate(self):
+        """Get a list containing the name of the lazy plugin."""
+        return [self._plugin.name]
+
+    def add_theme_applier(self, theme_applier, *args, **kwargs):
+        """Record a theme applier provided by the plugin.
+
+        The applier is used in order of registration by the lazy theme
+        applier of the plugin, so any other arguments are ignored.
+
+        :param theme_applier: the theme applier.
+        :raises TypeError: if the theme applier object doesn't provide
+            apply method.
+        """
+        if not isinstance(theme_applier, ThemeApplier):
+            raise TypeError(
+                '{} is not an instance of {}'.format(
+                    theme_applier, ThemeApplier)
+            )
+        self.theme_appliers.append(theme_applier)
+
+    @property
+    def prompt(self):
+        """Get a prompt provided by the plugin."""
+        return self._prompt
+
+    @prompt.setter
+    def prompt(self, value):
+        """Record a prompt provided by the plugin.
+
+        :param value: a callable or an instance of StreamingPrompt to be
+            used as the prompt.
+        :raises TypeError: if the value can't be used as a prompt.
+        """
+        check_prompt(value)
+        self._prompt = value
+
+    def activate(self):
+        """Activate the plugin, if not done yet.
+
+        The plugin is activated only once, even if this method is
+        called from several threads.
+
+        :raises SetupError: if the plugin can't be activated.
+        """
+        with self._lock:
+            if not self._activated:
+                self._plugin.activate(self)
+                self._activated = True
+
+
+class LazyPrompt:
+    """A prompt activating its plugin when it is first called."""
+
+    def __init__(self, components):
+        """Create a new instance.
+
+        :param components: components of a lazy plugin.
+        """
+        self._components = components
+
+    def _get_prompt(self):
+        self._components.activate()
+        prompt = self._components.prompt
+        if prompt is None:
+            raise SetupError('A plugin declared a prompt but didn\'t set it.')
+        return prompt
+
+    def __call__(self, *args, **kwargs):
+        """Activate the plugin and call its prompt.
+
+        :returns: the value returned by the prompt.
+        :raises SetupError: if the plugin can't be activated or if it
+            doesn't provide a prompt.
+        """
+        return self._get_prompt()(*args, **kwargs)
+
+
+class LazyStreamingPrompt(LazyPrompt, StreamingPrompt):
+    """A streaming prompt activating its plugin when it is first used."""
+
+    def prompt_from(self, theme_names, **kwargs):
+        """Activate the plugin and use its streaming prompt.
+
+        :param theme_names: an iterator of instances of ThemeNameChange.
+        :returns: the value returned by the prompt.
+        :raises SetupError: if the plugin can't be activated or if it
+            doesn't provide a streaming prompt.
+        """
+        prompt = self._get_prompt()
+        if not isinstance(prompt, StreamingPrompt):
+            raise SetupError(
+                'A plugin declared a streaming prompt but set another one.'
+            )
+        return prompt.prompt_from(theme_names, **kwargs)
+
+
+class LazyThemeApplier(ThemeApplier):
+    """A theme applier activating its plugin when it is first used."""
+
+    def __init__(self, components):
+        """Create a new instance.
+
+        :param components: components of a lazy plugin.
+        """
+        self._components = components
+
+    def apply(self, theme):
+        """Activate the plugin and use its theme appliers in order.
+
+        :param theme: a theme to be applied.
+        :raises SetupError: if the plugin can't be activated.
+        """
+        self._components.activate()
+        for theme_applier in self._components.theme_appliers:
+            theme_applier.apply(theme)
+
+
 class ThemeSwitcherBuilder:
     """A class responsible for building a valid application object.
 
@@ -58,7 +513,21 @@ class ThemeSwitcherBuilder:
         if not themes:
             raise SetupError('The themes mapping cannot be empty.')
         self._themes = themes
-        self._theme_appliers = []
+        self._applier_tasks = [
+            ApplierTask(XRDB_MERGE, XrdbMergeApplier(
+                config.get('xresources-state-dir', DEFAULT_STATE_DIR)
+            ), (), 1)
+        ]
+        if config.get('recolor-terminals', False):
+            self._applier_tasks.append(ApplierTask(
+                TERMINAL_COLORS,
+                TerminalColorsApplier(
+                    timeout=config.get('terminal-write-timeout', 0.5)
+                ),
+                (),
+                1
+            ))
+        self._last_added_applier = XRDB_MERGE
         self._prompt = None
 
     @property
@@ -71,10 +540,30 @@ class ThemeSwitcherBuilder:
         """Configuration mapping to be used by theme switcher."""
         return self._config
 
-    def add_theme_applier(self, theme_applier):
+    def add_theme_applier(
+            self, theme_applier, name=None, depends_on=None, cost=1
+    ):
         """Add a theme applier to be used by the theme switcher.
 
+        Theme appliers are used in parallel, as soon as all theme
+        appliers they depend on have finished. Theme appliers added
+        without dependencies are used one after another, in the order
+        in which they were added, after merging the theme into the X
+        resource database. To be used in parallel with others, a theme
+        applier has to name its dependencies, like (XRDB_MERGE,).
+
         :param theme_applier: the theme applier to be added.
+        :param name: a unique name of the theme applier, to be used
+            by other theme appliers depending on it. If None, a name is
+            generated from the name of the class of the theme applier.
+        :param depends_on: a sequence of names of theme appliers that
+            have to finish before this theme applier is used, or None
+            if it depends on the theme applier added before it, or on
+            merging the theme into the X resource database if it's the
+            first one.
+        :param cost: an estimated, relative duration of applying
+            a theme with the theme applier, used to start the most
+            time-consuming chains of theme appliers first.
         :raises TypeError: if the theme applier object doesn't provide
             apply method.
         """
@@ -83,7 +572,47 @@ class ThemeSwitcherBuilder:
                 '{} is not an instance of {}'.format(
                     theme_applier, ThemeApplier)
             )
-        self._components.append(theme_applier)
+        if name is None:
+            name = '{}-{}'.format(
+                type(theme_applier).__name__, len(self._applier_tasks)
+            )
+        if depends_on is None:
+            depends_on = (self._last_added_applier,)
+        self._applier_tasks.append(
+            ApplierTask(name, theme_applier, tuple(depends_on), cost)
+        )
+        self._last_added_applier = name
+
+    def add_lazy_plugin(self, plugin):
+        """Register proxies for roles of a plugin activated on first use.
+
+        A plugin with the prompt or streaming-prompt role provides the
+        prompt, and a plugin with the applier role provides a theme
+        applier named after the plugin. The plugin module is imported
+        and applied only when a proxy is used.
+
+        :param plugin: an instance of LazyPlugin.
+        :raises SetupError: if the plugin declares an unknown role, or
+            if another plugin already provides a prompt.
+        """
+        unknown = set(plugin.roles) - {
+            PROMPT_ROLE, STREAMING_PROMPT_ROLE, APPLIER_ROLE
+        }
+        if unknown or not plugin.roles:
+            raise SetupError(
+                'The "{}" plugin declares unsupported roles: {}.'.format(
+                    plugin.name, ', '.join(sorted(unknown)) or 'none'
+                )
+            )
+        components = LazyPluginComponents(plugin, self._config)
+        if STREAMING_PROMPT_ROLE in plugin.roles:
+            self.prompt = LazyStreamingPrompt(components)
+        elif PROMPT_ROLE in plugin.roles:
+            self.prompt = LazyPrompt(components)
+        if APPLIER_ROLE in plugin.roles:
+            self.add_theme_applier(
+                LazyThemeApplier(components), name=plugin.name
+            )
 
     @property
     def prompt(self):
@@ -92,66 +621,179 @@ class ThemeSwitcherBuilder:
 
     @prompt.setter
     def prompt(self, value):
-        """Set a callable theme prompt for the theme switcher.
+        """Set a theme prompt for the theme switcher.
 
-        :param value: a callable to be used as the prompt.
+        :param value: a callable or an instance of StreamingPrompt to be
+            used as the prompt.
         :raises SetupError: if a caller attempts to override an already
             set prompt.
-        :raises TypeError: if the value is not callable.
+        :raises TypeError: if the value can't be used as a prompt.
         """
         if self._prompt is not None:
             raise SetupError('Only one plugin may provide a prompt.')
 
-        if not callable(value):
-            raise TypeError('The prompt must be callable.')
+        check_prompt(value)
         self._prompt = value
 
     def build(self):
         """Get theme switcher object.
 
         :returns: the theme switcher object.
+        :raises SetupError: if a theme applier depends on an unknown
+            theme applier, or if names of theme appliers are not unique.
+        :raises scheduling.DependencyCycleError: if theme appliers
+            depend on each other in a cycle.
         """
         return ThemeSwitcher(
             config=self._config,
             themes=self._themes,
-            theme_appliers=self._components,
-            prompt=self._prompt
+            theme_appliers=ApplierScheduler(self._applier_tasks),
+            prompt=self._prompt,
+            latency_store=LatencyStore(self._config.get(
+                'latency-history-path', DEFAULT_HISTORY_PATH
+            )),
+            latency_budget=self._config.get('applier-latency-budget'),
+            switch_coordinator=SwitchCoordinator(self._config.get(
+                'switch-lock-path', DEFAULT_LOCK_PATH
+            ))
         )
 
     @classmethod
-    def from_(cls, config_path):
+    def from_(cls, config_path, theme_name=None, in_background=False):
         """Create a new instance using application config file.
 
+        If a name of a theme to be set is given, the theme is probed
+        for in its likely locations first, and other themes are searched
+        for only if they are needed. The probing is skipped if the
+        "detect-duplicate-themes" option is enabled.
+
         :param config_path: a path to YAML file containing configuration
             to be used by theme switcher.
+        :param theme_name: a name of a theme to be set, or None.
+        :param in_background: True if themes are to be searched for in
+            a background thread, while plugins are applied and names of
+            found themes are streamed to a prompt. Errors of the search
+            are raised when the themes are first used.
         :raises ConfigValueError: if the theme directory provided in
             the configuration doesn't contain any themes.
         """
         config = YamlConfigPath.get_config_mapping(config_path)
+        if in_background:
+            return cls(config, StreamedThemeNameMap(
+                lambda on_found: find_themes(config, on_found),
+                load_theme_names() or ()
+            ))
+        if (theme_name is not None and
+                not config.get('detect-duplicate-themes', False)):
+            theme = probe_theme(config, theme_name)
+            if theme is not None:
+                return cls(config, ProbedThemeNameMap(
+                    theme, lambda: find_themes(config)
+                ))
+        return cls(config, find_themes(config))
+
+
+def probe_theme(config, theme_name):
+    """Find a theme in likely locations in the theme directories.
+
+    The locations are the directories that contained themes when they
+    were last searched for, or the theme directories and their
+    conventional subdirectories if they were never searched.
+
+    :param config: a configuration mapping of the application.
+    :param theme_name: a name of the theme.
+    :returns: the theme, or None if it wasn't found, or if several
+        themes with the name were found in the same theme directory.
+    """
+    paths = get_search_paths(config['theme-search-dir-path'])
+    ignore = config.get('theme-search-ignore', DEFAULT_IGNORED)
+    with metrics.collected.time(
+            'b16ts_phase_duration_seconds', phase='probe'
+    ):
+        return Base16Theme.probe_in(
+            paths,
+            theme_name,
+            SchemeCache(config.get('scheme-cache-path', DEFAULT_CACHE_PATH)),
+            load_theme_directories(
+                config.get(
+                    'theme-directory-cache-path',
+                    DEFAULT_DIRECTORY_CACHE_PATH
+                ),
+                [str(p) for p in paths],
+                ignore
+            ),
+            ignore
+        )
+
+
+def find_themes(config, on_found=None):
+    """Find themes in the theme directories provided in the configuration.
+
+    Names of the themes are saved to be used for completion, and
+    directories containing them are saved to be probed for themes.
+
+    :param config: a configuration mapping of the application.
+    :param on_found: a callable to be called with lists of paths to
+        theme files as soon as they are found, or None.
+    :returns: a mapping of the themes indexed by their names.
+    :raises ConfigValueError: if the theme directories don't contain
+        any themes.
+    """
+    with metrics.collected.time(
+            'b16ts_phase_duration_seconds', phase='discovery'
+    ):
         themes = Base16ThemeNameMap.from_unique_in(
-            config['theme-search-dir-path']
+            config['theme-search-dir-path'],
+            SchemeCache(config.get('scheme-cache-path', DEFAULT_CACHE_PATH)),
+            config.get('theme-search-ignore', DEFAULT_IGNORED),
+            on_found
         )
-        if not themes:
-            raise ConfigValueError(
-                'There are no themes in {}.'.format(
-                    config['theme-search-dir-path']
-                )
+    metrics.collected.set('b16ts_themes', len(themes))
+    if not themes:
+        raise ConfigValueError(
+            'There are no themes in {}.'.format(
+                config['theme-search-dir-path']
             )
-        return cls(config, themes)
+        )
+    save_theme_names(themes)
+    save_theme_directories(
+        config.get('theme-directory-cache-path', DEFAULT_DIRECTORY_CACHE_PATH),
+        [str(p) for p in get_search_paths(config['theme-search-dir-path'])],
+        config.get('theme-search-ignore', DEFAULT_IGNORED),
+        {
+            os.path.dirname(str(t.path)) for t in themes.values()
+            if isinstance(t.path, Path)
+        }
+    )
+    return themes
 
 
 class ThemeSwitcher:
     """An object responsible for setting themes."""
 
-    def __init__(self, config, themes, theme_appliers, prompt):
+    def __init__(
+            self, config, themes, theme_appliers, prompt,
+            latency_store=None, latency_budget=None, switch_coordinator=None
+    ):
         """Create a new instance.
 
         :param config: a configuration mapping to be used by the object.
         :param themes: a mapping of themes indexed by their names.
-        :param theme_appliers: a sequence of objects responsible for
-            applying theme changes to different applications.
+        :param theme_appliers: an applier scheduler or a sequence of
+            objects responsible for applying theme changes to different
+            applications, to be used one after another once the theme
+            is merged into the X resource database.
         :param prompt: a callable for presenting user with a theme
             selection prompt.
+        :param latency_store: a store to which durations of using theme
+            appliers are recorded, or None if they are not recorded.
+        :param latency_budget: a duration in milliseconds. Theme
+            appliers whose 95th percentile of recent durations exceeds
+            it are deferred to a background process, together with all
+            appliers depending on them. If None, nothing is deferred.
+        :param switch_coordinator: an object serializing theme switches
+            made by concurrent processes, or None if they are not
+            serialized.
         """
         if config is None:
             raise SetupError(
@@ -161,30 +803,203 @@ class ThemeSwitcher:
         if not themes:
             raise SetupError('No themes provided to theme switcher.')
         self._themes = themes
-        self._theme_appliers = theme_appliers
         if prompt is None:
             raise SetupError('No prompt provided to theme switcher.')
         self._prompt = prompt
+        if not isinstance(theme_appliers, ApplierScheduler):
+            theme_appliers = ApplierScheduler.sequential(
+                theme_appliers,
+                ApplierTask(XRDB_MERGE, XrdbMergeApplier(), (), 1)
+            )
+        self._theme_appliers = theme_appliers
+        self._latency_store = latency_store
+        self._latency_budget = latency_budget
+        self._switch_coordinator = switch_coordinator
         self._logger = logging.getLogger(__name__)
+        self.target_displays = None
+        self.max_display_workers = DEFAULT_MAX_WORKERS
+        self.background_args = None
 
     def _apply(self, theme_name):
         """Apply a theme without saving it to the configuration.
 
+        If target_displays is None, the theme is applied to the display
+        inherited by the process. Otherwise, it is applied to each of
+        the target displays. Theme appliers running concurrently share
+        a snapshot of the theme.
+
         :param theme_name: a name of a theme to be applied.
         :raises KeyError: if there is no theme with the name.
+        :raises InvalidThemeError: if the theme is invalid.
+        """
+        theme = self._themes[theme_name].snapshot()
+        if self.target_displays is None:
+            self._run_appliers(theme)
+            return
+        self.apply_to_displays(theme, self.target_displays)
+
+    def _get_deferred_task_names(self):
+        if self._latency_store is None or self._latency_budget is None:
+            return set()
+        deferred = set()
+        for t in self._theme_appliers.tasks:
+            p95 = self._latency_store.percentile(t.name, 95)
+            if ((p95 is not None and p95 > self._latency_budget) or
+                    deferred.intersection(t.dependencies)):
+                deferred.add(t.name)
+        return deferred
+
+    def _run_and_record(self, theme, skip):
+        durations = []
+        try:
+            self._theme_appliers.run(
+                theme, skip, lambda *d: durations.append(d)
+            )
+        finally:
+            for name, duration in durations:
+                metrics.collected.observe(
+                    'b16ts_applier_duration_seconds', duration,
+                    applier=name
+                )
+            if self._latency_store is not None:
+                for name, duration in durations:
+                    self._latency_store.record(name, duration)
+                self._latency_store.save()
+
+    def _run_appliers(self, theme, skip=()):
+        """Use the theme appliers, deferring the slow ones.
+
+        :param theme: a theme to be applied.
+        :param skip: names of tasks of appliers that were already used.
         """
-        theme = self._themes[theme_name]
-        subprocess.call('xrdb -merge {}'.format(theme), shell=True)
-        for c in self._theme_appliers:
-            c.apply(theme)
+        deferred = self._get_deferred_task_names().difference(skip)
+        self._run_and_record(theme, deferred.union(skip))
+        if deferred:
+            self._logger.info(
+                'Deferring theme appliers: %s', ', '.join(sorted(deferred))
+            )
+            finished = [
+                t.name for t in self._theme_appliers.tasks
+                if t.name not in deferred
+            ]
+            self._run_in_background(theme, finished)
+
+    def _run_in_background(self, theme, skip):
+        """Use theme appliers in a detached background process.
+
+        The process executes the deferred module in a new session, with
+        background_args preceding the name of the theme and the names
+        of the tasks to skip. It is a new interpreter rather than a fork,
+        because the current process may already run several threads.
+        If background_args is None, the appliers are used in the
+        current process instead.
+
+        :param theme: a theme to be applied.
+        :param skip: names of tasks of appliers that were already used.
+        """
+        if self.background_args is None:
+            self._run_and_record(theme, skip)
+            return
+        args = [sys.executable, '-m', 'base16_theme_switcher.deferred']
+        args.extend(self.background_args)
+        for name in skip:
+            args.extend(('--skip', name))
+        args.extend(('--', theme.name))
+        try:
+            subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        except OSError as e:
+            self._logger.error(
+                'Couldn\'t start deferred theme appliers: %s', e
+            )
+
+    def apply_deferred(self, theme_name, skip):
+        """Use theme appliers deferred by another process.
+
+        The appliers are used while no other process is switching
+        themes, and only if the theme is still the configured one and
+        no other theme is waiting to be set. Themes left by other
+        processes in the meantime are set afterwards.
+
+        :param theme_name: a name of a theme to be applied.
+        :param skip: names of tasks of appliers that were already used.
+        :raises KeyError: if there is no theme with the name.
+        """
+        theme = self._themes[theme_name].snapshot()
+
+        def apply():
+            if isinstance(self._config, RootConfigMapping):
+                self._config.reload()
+            if self._config.get('theme') != theme_name:
+                self._logger.info(
+                    'Skipping deferred theme appliers of "%s", because '
+                    'another theme was set.', theme_name
+                )
+                return
+            self._run_and_record(theme, set(skip))
+
+        if self._switch_coordinator is None:
+            apply()
+            return
+        if not self._switch_coordinator.run_exclusively(
+                apply, self._set_requested_theme, self._is_theme_name
+        ):
+            self._logger.info(
+                'Skipping deferred theme appliers of "%s", because '
+                'another theme is waiting to be set.', theme_name
+            )
+
+    def apply_to_displays(self, theme, displays):
+        """Apply a theme to several X displays.
+
+        All display-scoped theme appliers, including the one updating
+        the X resource database, are used for each display, with at
+        most max_display_workers displays being processed at the same
+        time. The remaining theme appliers are used once, afterwards.
+
+        :param theme: a theme to be applied.
+        :param displays: a sequence of names of X displays.
+        :returns: a list of results of applying the theme to each of
+            the displays.
+        """
+        display_tasks = [
+            t for t in self._theme_appliers.tasks
+            if isinstance(t.applier, DisplayThemeApplier)
+        ]
+        report = apply_to_displays(
+            theme,
+            displays,
+            [t.applier for t in display_tasks],
+            self.max_display_workers
+        )
+        self._run_appliers(theme, skip=[t.name for t in display_tasks])
+
+        for r in report:
+            if r.succeeded:
+                self._logger.info('Applied "%s" to %s.', theme.name, r.display)
+            else:
+                self._logger.error(
+                    'Failed to apply "%s" to %s: %s',
+                    theme.name, r.display, r.error
+                )
+        return report
 
     @property
     def current_theme_name(self):
-        """Get a name of the currently configured theme."""
-        return self._config.get(
-            'theme',
-            self._themes.sorted_by_name[0].name
-        )
+        """Get a name of the currently configured theme.
+
+        The first theme by name is used only if no theme is configured,
+        because sorting themes that are still being found waits until
+        all of them are found.
+        """
+        if 'theme' in self._config:
+            return self._config['theme']
+        return self._themes.sorted_by_name[0].name
 
     @current_theme_name.setter
     def current_theme_name(self, theme_name):
@@ -196,9 +1011,13 @@ class ThemeSwitcher:
         :param theme_name: a name of a theme to be set.
         :raises KeyError: if there is no theme with the name.
         """
-        self._apply(theme_name)
+        with metrics.collected.time(
+                'b16ts_phase_duration_seconds', phase='apply'
+        ):
+            self._apply(theme_name)
         self._config['theme'] = theme_name
         self._config.save()
+        metrics.collected.increment('b16ts_switches_total')
         self._logger.info(
             'The theme "%s" has been successfully applied.', theme_name
         )
@@ -215,39 +1034,332 @@ class ThemeSwitcher:
     def main(self, command_args):
         """Set or apply a theme based on command-line arguments.
 
+        If the "use-spawn-helper" option is enabled, external commands
+        are executed by a spawn helper started for this purpose.
+
         :param command_args: command-line arguments.
         """
+        if not self._config.get('use-spawn-helper', False):
+            self._main(command_args)
+            return
+        with commands.SpawnHelper() as helper:
+            commands.use_spawn_helper(helper)
+            try:
+                self._main(command_args)
+            finally:
+                commands.use_spawn_helper(None)
+
+    def _main(self, command_args):
+        if command_args.all_displays:
+            self.target_displays = find_displays()
+            if not self.target_displays:
+                self._logger.warning('No X displays were found.')
+        elif command_args.displays:
+            self.target_displays = command_args.displays
+        self.max_display_workers = command_args.display_jobs
+        self.background_args = [
+            '--config', command_args.config, '--log', command_args.log
+        ]
+        if command_args.verbose:
+            self.background_args.append('--verbose')
+
         if command_args.reload:
             self.reload()
             return
 
         theme = command_args.theme
         if theme is None:
-            theme = self._prompt()
+            with metrics.collected.time(
+                    'b16ts_phase_duration_seconds', phase='prompt'
+            ):
+                if self._config.get('preview-themes', False):
+                    theme = self._prompt_with_preview()
+                else:
+                    theme = self._call_prompt()
+            if theme is None:
+                return
+
+        self.switch_to(theme)
+
+    def _prompt_with_preview(self):
+        """Prompt for a theme, previewing themes selected in the prompt.
+
+        The prompt is passed a preview keyword argument: an object
+        whose select method is to be called with a name of each theme
+        the user selects before choosing one.
+
+        :returns: a name of the chosen theme, or None if the user
+            didn't choose any.
+        """
+        with self.preview(
+                self._config.get('preview-delay', DEFAULT_PREVIEW_DELAY)
+        ) as preview:
+            theme_name = self._call_prompt(preview=preview)
+            if not theme_name:
+                preview.cancel()
+                self._logger.info('No theme was chosen.')
+                return None
+        return theme_name
+
+    def _call_prompt(self, **kwargs):
+        """Prompt for a theme.
+
+        A streaming prompt is given names of themes as they are found.
+
+        :param kwargs: keyword arguments passed to the prompt.
+        :returns: a name of the chosen theme.
+        """
+        if isinstance(self._prompt, StreamingPrompt):
+            return self._prompt.prompt_from(
+                stream_theme_names(self._themes), **kwargs
+            )
+        return self._prompt(**kwargs)
+
+    def preview(self, delay=DEFAULT_PREVIEW_DELAY):
+        """Start previewing themes.
+
+        Themes are previewed only with theme appliers supporting it,
+        on the display inherited by the process, and they aren't saved
+        to the configuration.
+
+        :param delay: the time a selection has to stay on a theme
+            before it is previewed, in seconds.
+        :returns: an instance of ThemePreview. It has to be closed, or
+            cancelled to restore the current theme.
+        """
+        return ThemePreview(
+            self._preview_theme, self.current_theme_name, delay
+        )
+
+    def _preview_theme(self, theme_name):
+        """Apply a theme using only theme appliers supporting previews.
+
+        :param theme_name: a name of a theme to be applied.
+        :raises KeyError: if there is no theme with the name.
+        """
+        theme = self._themes[theme_name].snapshot()
+        self._theme_appliers.run(theme, [
+            t.name for t in self._theme_appliers.tasks
+            if not getattr(t.applier, 'supports_preview', False)
+        ])
+
+    def _set_requested_theme(self, theme_name):
+        self.current_theme_name = theme_name
+
+    def _is_theme_name(self, name):
+        return isinstance(name, str) and name in self._themes
+
+    def switch_to(self, theme_name):
+        """Set a theme, unless another process is switching themes.
+
+        If another process is switching themes, the name is left for it
+        to set after it finishes, and only the newest of such names is
+        set. Names left by other processes that don't belong to any of
+        the themes are ignored.
+
+        :param theme_name: a name of a theme to be set.
+        :raises KeyError: if there is no theme with the name.
+        """
+        if self._switch_coordinator is None:
+            self.current_theme_name = theme_name
+            return
+        if not self._switch_coordinator.submit(
+                theme_name, self._set_requested_theme, self._is_theme_name
+        ):
+            self._logger.info(
+                'Another process is switching themes, so it will set "%s".',
+                theme_name
+            )
+
+
+def print_latency_stats(config_path):
+    """Print percentiles of recent durations of theme appliers.
+
+    :param config_path: a path to YAML file containing configuration
+        of the theme switcher.
+    """
+    config = YamlConfigPath.get_config_mapping(config_path)
+    store = LatencyStore(
+        config.get('latency-history-path', DEFAULT_HISTORY_PATH)
+    )
+    summary = store.summary()
+    if not summary:
+        print('No durations of theme appliers were recorded yet.')
+        return
+    print(format_summary(summary))
+
+
+def export_themes(config_path, patterns, format_name, output_path=None,
+                  max_workers=None):
+    """Write palettes of themes to a file or to standard output.
+
+    :param config_path: a path to YAML file containing configuration
+        of the theme switcher.
+    :param patterns: shell-style patterns matching names of themes to
+        be exported, or an empty sequence to export all themes.
+    :param format_name: a name of a supported export format.
+    :param output_path: a path to the output file, or None to write to
+        standard output.
+    :param max_workers: the maximum number of worker processes, or
+        None for the number of processors.
+    """
+    config = YamlConfigPath.get_config_mapping(config_path)
+    themes = select_themes(
+        Base16ThemeNameMap.from_unique_in(
+            config['theme-search-dir-path'],
+            ignore=config.get('theme-search-ignore', DEFAULT_IGNORED)
+        ).sorted_by_name,
+        patterns
+    )
+    if output_path is None:
+        export_palettes(themes, sys.stdout, format_name, max_workers)
+        return
+    with ConfiguredAbsolutePath.from_(output_path) as path:
+        with path.open('w', encoding='utf-8', newline='') as f:
+            export_palettes(themes, f, format_name, max_workers)
+
+
+def make_gallery(config_path, output_path, max_workers=None):
+    """Render swatches of all themes and their HTML index.
+
+    :param config_path: a path to YAML file containing configuration
+        of the theme switcher.
+    :param output_path: a path to a directory of the gallery.
+    :param max_workers: the maximum number of worker processes, or
+        None for the number of processors.
+    """
+    # The gallery module imports theme appliers of the templates module,
+    # which depends on this one.
+    from .gallery import Gallery
+
+    config = YamlConfigPath.get_config_mapping(config_path)
+    themes = Base16ThemeNameMap.from_unique_in(
+        config['theme-search-dir-path'],
+        ignore=config.get('theme-search-ignore', DEFAULT_IGNORED)
+    )
+    rendered, skipped, invalid = Gallery(output_path).update(
+        themes.sorted_by_name, max_workers
+    )
+    print(
+        'Rendered {} themes and skipped {} unchanged ones. {} themes are '
+        'invalid.'.format(rendered, skipped, invalid)
+    )
+
 
-        self.current_theme_name = theme
+def save_metrics(config_path):
+    """Save metrics collected by the application, if configured.
+
+    The metrics are saved to a file for the textfile collector of
+    Prometheus node_exporter, given by the "metrics-path" option.
+
+    :param config_path: a path to YAML file containing configuration
+        of the theme switcher.
+    """
+    try:
+        path = YamlConfigPath.get_config_mapping(config_path).get(
+            'metrics-path'
+        )
+    except Exception:
+        return
+    if path is not None:
+        metrics.save(metrics.collected, path)
 
 
 def main(command_args):
     """Set up the application and execute it with given arguments.
 
+    If a metrics file is configured, metrics of the run are saved to
+    it afterwards, even if the run failed.
+
     :param command_args: command-line arguments.
     """
     logger = get_info_logger(
         __name__,
-        use_gui=not (command_args.theme or command_args.reload)
+        use_gui=command_args.command == 'set' and not command_args.theme
+    )
+    metrics.collected.increment(
+        'b16ts_runs_total', command=command_args.command
     )
     try:
-        configure_b16ts_root_logger(
-            command_args.log,
-            verbose=command_args.verbose
-        )
-        builder = ThemeSwitcherBuilder.from_(command_args.config)
-        apply_configured_prefixed_plugins(builder, 'b16ts_')
-        theme_switcher = builder.build()
-        theme_switcher.main(command_args)
-
+        with metrics.collected.time(
+                'b16ts_run_duration_seconds', command=command_args.command
+        ):
+            _main(command_args)
     except SetupError as e:
+        metrics.collected.increment(
+            'b16ts_failures_total', exception=type(e).__name__
+        )
         logger.error(e)
-    except Exception:
+    except Exception as e:
+        metrics.collected.increment(
+            'b16ts_failures_total', exception=type(e).__name__
+        )
         logger.exception('An unexpected error occured.')
+    finally:
+        save_metrics(command_args.config)
+
+
+def run_deferred(config_path, log_path, verbose, theme_name, skip):
+    """Use theme appliers deferred by a theme switch.
+
+    The theme switcher is set up like in main, and metrics of the run
+    are saved afterwards. Errors are logged instead of being raised,
+    because there is no one to report them to.
+
+    :param config_path: a path to the configuration file.
+    :param log_path: a path to the log file.
+    :param verbose: True if debug messages are to be printed.
+    :param theme_name: a name of a theme to be applied.
+    :param skip: names of tasks of appliers that were already used.
+    """
+    logger = logging.getLogger(__name__)
+    metrics.collected.increment('b16ts_runs_total', command='deferred')
+    try:
+        configure_b16ts_root_logger(log_path, verbose=verbose)
+        builder = ThemeSwitcherBuilder.from_(config_path, theme_name)
+        apply_configured_prefixed_plugins(builder, 'b16ts_')
+        builder.build().apply_deferred(theme_name, skip)
+    except Exception as e:
+        metrics.collected.increment(
+            'b16ts_failures_total', exception=type(e).__name__
+        )
+        logger.exception(
+            'Deferred theme appliers failed to apply "%s".', theme_name
+        )
+    finally:
+        save_metrics(config_path)
+
+
+def _main(command_args):
+    configure_b16ts_root_logger(
+        command_args.log,
+        verbose=command_args.verbose
+    )
+    if command_args.command == 'stats':
+        print_latency_stats(command_args.config)
+        return
+    if command_args.command == 'export':
+        export_themes(
+            command_args.config, command_args.patterns,
+            command_args.format, command_args.output, command_args.jobs
+        )
+        return
+    if command_args.command == 'gallery':
+        make_gallery(
+            command_args.config, command_args.output, command_args.jobs
+        )
+        return
+    builder = ThemeSwitcherBuilder.from_(
+        command_args.config,
+        None if command_args.reload else command_args.theme,
+        in_background=not command_args.reload and command_args.theme is None
+    )
+    with metrics.collected.time(
+            'b16ts_phase_duration_seconds', phase='plugins'
+    ):
+        apply_configured_prefixed_plugins(builder, 'b16ts_')
+    with metrics.collected.time(
+            'b16ts_phase_duration_seconds', phase='build'
+    ):
+        theme_switcher = builder.build()
+    theme_switcher.main(command_args)
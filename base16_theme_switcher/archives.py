@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Reading theme files directly from zip and tar archives.
+
+The member list of an archive is read once, when the archive is
+opened, and members are read on demand through a handle shared by all
+of them. Members of compressed tar archives can't be read without
+decompressing everything preceding them, so small members are read
+while the archive is indexed, in a single pass.
+"""
+
+import os
+import tarfile
+import threading
+import zipfile
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+
+ARCHIVE_SUFFIXES = (
+    '.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz',
+    '.txz'
+)
+"""Extensions of names of supported archives."""
+
+MAX_PRELOADED_SIZE = 64 * 1024
+"""The maximum size of a member of a compressed tar archive read when
+the archive is indexed, in bytes."""
+
+
+def is_archive(path):
+    """Check if a path has an extension of a supported archive.
+
+    :param path: the path.
+    :returns: True if the extension is supported, False otherwise.
+    """
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class ArchiveMember:
+    """A path to a file in an archive.
+
+    The object supports the methods of pathlib.Path used for theme
+    files.
+    """
+
+    def __init__(self, archive, member_name):
+        """Create a new instance.
+
+        :param archive: an archive containing the file.
+        :param member_name: a name of the file in the archive.
+        """
+        self.archive = archive
+        self.member_name = member_name
+        self.name = PurePosixPath(member_name).name
+        self.suffix = PurePosixPath(member_name).suffix
+
+    def read_bytes(self):
+        """Read the content of the file.
+
+        :returns: the content.
+        :raises OSError: if the archive can't be read.
+        """
+        return self.archive.read(self.member_name)
+
+    def read_text(self, encoding='utf-8'):
+        """Read the content of the file as text.
+
+        :param encoding: an encoding of the text.
+        :returns: the content.
+        :raises OSError: if the archive can't be read.
+        """
+        return self.read_bytes().decode(encoding)
+
+    def stat(self):
+        """Get the status of the archive containing the file.
+
+        :returns: an instance of os.stat_result.
+        """
+        return self.archive.path.stat()
+
+    def __str__(self):
+        """Get the path as a string.
+
+        :returns: the path to the archive, joined with the name of the
+            file in the archive.
+        """
+        return os.path.join(str(self.archive.path), self.member_name)
+
+    def __eq__(self, other):
+        return isinstance(other, ArchiveMember) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+class ZipArchive:
+    """A zip archive, indexed by its central directory."""
+
+    def __init__(self, path):
+        """Open the archive.
+
+        :param path: a path to the archive.
+        :raises OSError: if the archive can't be opened or is invalid.
+        """
+        self.path = Path(path)
+        try:
+            self._file = zipfile.ZipFile(str(path))
+        except zipfile.BadZipFile as e:
+            raise OSError('Invalid zip archive {}: {}'.format(path, e))
+
+    def names(self):
+        """Get names of files in the archive.
+
+        :returns: a list of the names.
+        """
+        return [i.filename for i in self._file.infolist() if not i.is_dir()]
+
+    def read(self, member_name):
+        """Read a file from the archive, decompressing only the file.
+
+        :param member_name: a name of the file.
+        :returns: the content of the file.
+        :raises OSError: if the file can't be read.
+        """
+        try:
+            return self._file.read(member_name)
+        except (KeyError, zipfile.BadZipFile) as e:
+            raise OSError('Can\'t read {} from {}: {}'.format(
+                member_name, self.path, e
+            ))
+
+
+class TarArchive:
+    """A tar archive, possibly compressed, indexed in a single pass."""
+
+    def __init__(self, path):
+        """Open and index the archive.
+
+        :param path: a path to the archive.
+        :raises OSError: if the archive can't be opened or is invalid.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._preloaded = {}
+        try:
+            try:
+                self._file = tarfile.open(str(path), 'r:')
+                compressed = False
+            except tarfile.ReadError:
+                self._file = tarfile.open(str(path), 'r:*')
+                compressed = True
+            self._members = {}
+            for info in self._file:
+                if not info.isfile():
+                    continue
+                name = PurePosixPath(info.name).as_posix()
+                self._members[name] = info
+                if compressed and info.size <= MAX_PRELOADED_SIZE:
+                    self._preloaded[name] = (
+                        self._file.extractfile(info).read()
+                    )
+        except tarfile.TarError as e:
+            raise OSError('Invalid tar archive {}: {}'.format(path, e))
+
+    def names(self):
+        """Get names of files in the archive.
+
+        :returns: a list of the names.
+        """
+        return list(self._members)
+
+    def read(self, member_name):
+        """Read a file from the archive.
+
+        :param member_name: a name of the file.
+        :returns: the content of the file.
+        :raises OSError: if the file can't be read.
+        """
+        data = self._preloaded.get(member_name)
+        if data is not None:
+            return data
+        try:
+            with self._lock:
+                return self._file.extractfile(
+                    self._members[member_name]
+                ).read()
+        except (KeyError, tarfile.TarError) as e:
+            raise OSError('Can\'t read {} from {}: {}'.format(
+                member_name, self.path, e
+            ))
+
+
+@lru_cache(maxsize=16)
+def _open_archive(path, mtime_ns, size):
+    if path.lower().endswith('.zip'):
+        return ZipArchive(path)
+    return TarArchive(path)
+
+
+def open_archive(path):
+    """Open and index an archive, or get an already opened one.
+
+    An archive is opened again only if it was modified.
+
+    :param path: a path to the archive.
+    :returns: an instance of ZipArchive or TarArchive.
+    :raises OSError: if the archive can't be opened or is invalid.
+    """
+    path = str(path)
+    info = os.stat(path)
+    return _open_archive(path, info.st_mtime_ns, info.st_size)
+
+
+def find_members(path, pattern):
+    """Find files in an archive whose names match a pattern.
+
+    :param path: a path to the archive.
+    :param pattern: a shell-style pattern matched against names of the
+        files, without their directories.
+    :returns: a list of instances of ArchiveMember, in the order of the
+        files in the archive.
+    :raises OSError: if the archive can't be opened or is invalid.
+    """
+    archive = open_archive(path)
+    return [
+        ArchiveMember(archive, n) for n in archive.names()
+        if fnmatchcase(PurePosixPath(n).name, pattern)
+    ]
+
+
+def resolve_path(path):
+    """Get an object representing a path to a file, maybe in an archive.
+
+    :param path: the path, as a string. A path to a file in an archive
+        is the path to the archive joined with the name of the file.
+    :returns: an instance of pathlib.Path if the path doesn't point to
+        a file in an archive, or an instance of ArchiveMember otherwise.
+    :raises OSError: if the archive can't be opened or is invalid.
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+    for archive_path in path.parents:
+        if is_archive(archive_path) and archive_path.is_file():
+            return ArchiveMember(
+                open_archive(archive_path),
+                path.relative_to(archive_path).as_posix()
+            )
+    return path
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Representations of theme colors derived from hexadecimal strings.
+
+If NumPy is available, the representations of all colors of a theme
+are computed with vectorized operations. Otherwise, an equivalent
+pure-Python implementation is used.
+"""
+
+import colorsys
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _get_xterm256_palette():
+    """Get RGB values of colors 16-255 of the xterm 256-color palette.
+
+    Colors 0-15 are not included, because they are configured by users
+    (often by the base16 theme itself), so their values are unknown.
+
+    :returns: a list of (red, green, blue) tuples. The color with index
+        i in the palette is at index i - 16 in the list.
+    """
+    levels = 0, 95, 135, 175, 215, 255
+    cube = [(r, g, b) for r in levels for g in levels for b in levels]
+    grays = [(v, v, v) for v in range(8, 248, 10)]
+    return cube + grays
+
+
+XTERM256_PALETTE = _get_xterm256_palette()
+"""RGB values of colors 16-255 of the xterm 256-color palette."""
+
+_XTERM256_OFFSET = 16
+
+_CACHE_FORMAT = struct.Struct('<48B16B48d')
+"""A format of derived colors of a theme stored in a cache.
+
+It consists of RGB components, xterm-256 indexes and HSL components
+of all 16 colors. The HSL components are stored as doubles, so that
+they are restored exactly.
+"""
+
+
+def _derive_with_numpy(hex_values):
+    rgb = numpy.array(
+        [[int(h[i:i + 2], 16) for i in (1, 3, 5)] for h in hex_values],
+        dtype=numpy.float64
+    )
+
+    normalized = rgb / 255
+    high = normalized.max(axis=1)
+    low = normalized.min(axis=1)
+    chroma = high - low
+    lightness = (high + low) / 2
+    has_chroma = chroma > 0
+    safe_chroma = numpy.where(has_chroma, chroma, 1)
+    saturation = numpy.where(
+        has_chroma,
+        chroma / numpy.where(
+            lightness <= 0.5, high + low, 2 - high - low
+        ).clip(min=1e-12),
+        0
+    )
+    r, g, b = normalized.T
+    hue = numpy.select(
+        [high == r, high == g],
+        [((g - b) / safe_chroma) % 6, (b - r) / safe_chroma + 2],
+        (r - g) / safe_chroma + 4
+    )
+    hue = numpy.where(has_chroma, hue * 60, 0) % 360
+    hsl = numpy.stack([hue, saturation, lightness], axis=1)
+
+    palette = numpy.array(XTERM256_PALETTE, dtype=numpy.float64)
+    distances = ((rgb[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+    xterm256 = distances.argmin(axis=1) + _XTERM256_OFFSET
+
+    return (
+        tuple(tuple(int(c) for c in row) for row in rgb),
+        tuple(tuple(float(c) for c in row) for row in hsl),
+        tuple(int(i) for i in xterm256)
+    )
+
+
+def _get_nearest_xterm256(rgb):
+    distances = (
+        sum((a - b) ** 2 for a, b in zip(rgb, p)) for p in XTERM256_PALETTE
+    )
+    index, _ = min(enumerate(distances), key=lambda d: d[1])
+    return index + _XTERM256_OFFSET
+
+
+def _derive_in_pure_python(hex_values):
+    rgb = tuple(
+        tuple(int(h[i:i + 2], 16) for i in (1, 3, 5)) for h in hex_values
+    )
+    hsl = []
+    for color in rgb:
+        h, l, s = colorsys.rgb_to_hls(*(c / 255 for c in color))
+        hsl.append((h * 360 % 360, s, l))
+    return (
+        rgb,
+        tuple(hsl),
+        tuple(_get_nearest_xterm256(c) for c in rgb)
+    )
+
+
+class DerivedColors:
+    """Representations of all colors of a theme, computed in one batch.
+
+    The representations are:
+
+    * rgb - a tuple of red, green and blue components, from 0 to 255
+    * hsl - a tuple of hue (in degrees, from 0 to 360), saturation and
+      lightness (from 0 to 1)
+    * xterm256 - an index of the nearest color in the 256-color palette
+      of xterm, from 16 to 255.
+    """
+
+    def __init__(self, names, rgb, hsl, xterm256):
+        """Create a new instance.
+
+        :param names: a sequence of names of colors.
+        :param rgb: a sequence of RGB representations of the colors.
+        :param hsl: a sequence of HSL representations of the colors.
+        :param xterm256: a sequence of xterm-256 color indexes.
+        """
+        self._indexes = {n: i for i, n in enumerate(names)}
+        self._rgb = tuple(rgb)
+        self._hsl = tuple(hsl)
+        self._xterm256 = tuple(xterm256)
+
+    def rgb(self, name):
+        """Get an RGB representation of a color.
+
+        :param name: a name of the color, like base0D.
+        :returns: a tuple of red, green and blue components.
+        :raises KeyError: if there is no color with the name.
+        """
+        return self._rgb[self._indexes[name]]
+
+    def hsl(self, name):
+        """Get an HSL representation of a color.
+
+        :param name: a name of the color, like base0D.
+        :returns: a tuple of hue, saturation and lightness.
+        :raises KeyError: if there is no color with the name.
+        """
+        return self._hsl[self._indexes[name]]
+
+    def xterm256(self, name):
+        """Get an index of the nearest color in the xterm-256 palette.
+
+        :param name: a name of the color, like base0D.
+        :returns: the index.
+        :raises KeyError: if there is no color with the name.
+        """
+        return self._xterm256[self._indexes[name]]
+
+    def to_bytes(self):
+        """Get a compact binary representation, to be stored in a cache.
+
+        Only representations of exactly 16 colors can be stored.
+
+        :returns: the representation.
+        """
+        return _CACHE_FORMAT.pack(
+            *(c for color in self._rgb for c in color),
+            *self._xterm256,
+            *(c for color in self._hsl for c in color)
+        )
+
+    @classmethod
+    def from_bytes(cls, names, data):
+        """Create an instance from its compact binary representation.
+
+        :param names: a sequence of names of the 16 colors.
+        :param data: the representation returned by to_bytes.
+        :returns: the new instance.
+        """
+        values = _CACHE_FORMAT.unpack(data)
+        rgb, xterm256, hsl = values[:48], values[48:64], values[64:]
+        return cls(
+            names,
+            [rgb[i:i + 3] for i in range(0, 48, 3)],
+            [hsl[i:i + 3] for i in range(0, 48, 3)],
+            xterm256
+        )
+
+    @classmethod
+    def from_hex(cls, names, hex_values, use_numpy=True):
+        """Derive representations of colors from hexadecimal strings.
+
+        :param names: a sequence of names of colors.
+        :param hex_values: a sequence of valid, hexadecimal color codes
+            like "#1f2b3c", in the same order as the names.
+        :param use_numpy: False if the pure-Python implementation must
+            be used even if NumPy is available.
+        :returns: the new instance.
+        """
+        derive = _derive_in_pure_python
+        if use_numpy and numpy is not None:
+            derive = _derive_with_numpy
+        return cls(names, *derive(hex_values))
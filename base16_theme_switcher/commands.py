@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Executing external commands used by the application and plugins.
+
+Commands are given as lists of arguments and are executed without
+a shell. Optionally, they may be spawned by a small, persistent helper
+process (see SpawnHelper), so that a large parent process doesn't have
+to be forked for each of them.
+
+Every executed command is timed and its exit status is logged and
+passed to registered listeners.
+"""
+
+import itertools
+import logging
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+_HEADER = struct.Struct('<I')
+"""A header of a message exchanged with the spawn helper: its length."""
+
+_listeners = []
+_spawn_helper = None
+
+
+class CommandResult(
+        namedtuple('CommandResult', 'args returncode duration stdout')
+):
+    """A result of executing a command.
+
+    :ivar args: the arguments of the command.
+    :ivar returncode: the exit status of the command, or None if it
+        couldn't be executed or didn't finish in time.
+    :ivar duration: the time of executing the command, in seconds.
+    :ivar stdout: the captured output of the command, or None if it
+        wasn't captured.
+    """
+
+
+def add_listener(listener):
+    """Register a callable to be called with a result of each command.
+
+    :param listener: the callable. It receives an instance of
+        CommandResult and may be called from any thread.
+    """
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    """Unregister a callable registered with add_listener.
+
+    :param listener: the callable.
+    :raises ValueError: if the callable isn't registered.
+    """
+    _listeners.remove(listener)
+
+
+def _spawn(args, input, timeout, capture_output):
+    completed = subprocess.run(
+        args,
+        input=input,
+        timeout=timeout,
+        stdout=subprocess.PIPE if capture_output else None,
+        universal_newlines=True
+    )
+    return completed.returncode, completed.stdout
+
+
+def run(args, input=None, timeout=None, check=False, capture_output=False):
+    """Execute a command.
+
+    :param args: a sequence of arguments of the command, starting with
+        its name.
+    :param input: a string to be passed to standard input of the
+        command, or None.
+    :param timeout: the maximum duration of the command in seconds, or
+        None for no limit.
+    :param check: True if a non-zero exit status is an error.
+    :param capture_output: True if standard output of the command is
+        to be captured and returned.
+    :returns: an instance of CommandResult.
+    :raises OSError: if the command can't be executed.
+    :raises subprocess.TimeoutExpired: if the command didn't finish in
+        time.
+    :raises subprocess.CalledProcessError: if check is True and the
+        command failed.
+    """
+    args = [str(a) for a in args]
+    spawn = _spawn if _spawn_helper is None else _spawn_helper.run
+    returncode = stdout = None
+    start = time.perf_counter()
+    try:
+        returncode, stdout = spawn(args, input, timeout, capture_output)
+    finally:
+        result = CommandResult(
+            args, returncode, time.perf_counter() - start, stdout
+        )
+        logging.getLogger(__name__).debug(
+            'Command %s finished with status %s in %.1f ms.',
+            args, returncode, result.duration * 1000
+        )
+        for listener in list(_listeners):
+            listener(result)
+
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode, args, stdout)
+    return result
+
+
+def _write_message(stream, message):
+    data = pickle.dumps(message)
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_message(stream):
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    data = stream.read(_HEADER.unpack(header)[0])
+    return pickle.loads(data)
+
+
+class SpawnHelper:
+    """A persistent process executing commands on behalf of its parent.
+
+    The helper is a small Python process executing this module as
+    a script, so it imports only a few modules of the standard library.
+    Commands are sent to it through a pipe, and it executes each of
+    them in a separate thread, so several commands may run at once.
+    """
+
+    def __init__(self):
+        """Create a new, not started helper."""
+        self._process = None
+        self._write_lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count()
+
+    def start(self):
+        """Start the helper process.
+
+        The interpreter runs in isolated mode, so that modules of this
+        package don't shadow modules of the standard library.
+        """
+        self._process = subprocess.Popen(
+            [sys.executable, '-I', os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        threading.Thread(target=self._read_responses, daemon=True).start()
+
+    def _read_responses(self):
+        while True:
+            response = _read_message(self._process.stdout)
+            if response is None:
+                break
+            request_id, error, returncode, stdout = response
+            future = self._pending.pop(request_id)
+            if error is None:
+                future.set_result((returncode, stdout))
+            else:
+                future.set_exception(error)
+        for future in list(self._pending.values()):
+            future.set_exception(OSError('The spawn helper has exited.'))
+        self._pending.clear()
+
+    def run(self, args, input, timeout, capture_output):
+        """Execute a command in the helper.
+
+        :param args: a list of arguments of the command.
+        :param input: a string to be passed to standard input of the
+            command, or None.
+        :param timeout: the maximum duration of the command in seconds,
+            or None.
+        :param capture_output: True if standard output of the command
+            is to be captured.
+        :returns: a tuple containing the exit status and the captured
+            output (or None).
+        :raises OSError: if the helper isn't running or if the command
+            can't be executed.
+        """
+        if self._process is None or self._process.poll() is not None:
+            raise OSError('The spawn helper isn\'t running.')
+        request_id = next(self._ids)
+        future = Future()
+        self._pending[request_id] = future
+        with self._write_lock:
+            _write_message(
+                self._process.stdin,
+                (request_id, args, input, timeout, capture_output)
+            )
+        return future.result()
+
+    def close(self):
+        """Stop the helper process after it finishes running commands."""
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        self._process.wait()
+        self._process = None
+
+    def __enter__(self):
+        """Start the helper.
+
+        :returns: the helper.
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop the helper."""
+        self.close()
+
+
+def use_spawn_helper(helper):
+    """Set a spawn helper to be used for executing commands.
+
+    :param helper: a started spawn helper, or None to execute commands
+        directly.
+    """
+    global _spawn_helper
+    _spawn_helper = helper
+
+
+def serve():
+    """Execute commands received from the parent of the helper process.
+
+    The pipes connected to the parent are moved to other descriptors,
+    so that executed commands write their output to standard error of
+    the helper instead of corrupting the messages.
+    """
+    requests = os.fdopen(os.dup(0), 'rb')
+    responses = os.fdopen(os.dup(1), 'wb')
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(2, 1)
+    write_lock = threading.Lock()
+
+    def execute(request_id, args, input, timeout, capture_output):
+        error = returncode = stdout = None
+        try:
+            returncode, stdout = _spawn(args, input, timeout, capture_output)
+        except Exception as e:
+            error = e
+        with write_lock:
+            _write_message(
+                responses, (request_id, error, returncode, stdout)
+            )
+
+    while True:
+        request = _read_message(requests)
+        if request is None:
+            break
+        threading.Thread(target=execute, args=request).start()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Completing names of themes in shells.
+
+This module is used by the "complete" command, which is executed on
+each completion request, so it imports only lightweight modules of the
+standard library. Names of themes are read from a list saved whenever
+themes are discovered by the application. If there is no such list,
+the configuration file is loaded and a limited number of entries of
+the theme directories is scanned.
+"""
+
+import bisect
+import os
+import sys
+
+DEFAULT_NAMES_PATH = os.path.expanduser(
+    '~/.cache/base16-theme-switcher/theme-names'
+)
+"""A path to the list of names of themes used for completion."""
+
+DEFAULT_CONFIG_PATH = '~/.config/base16-theme-switcher/config.yml'
+"""A default path to the configuration file of the application."""
+
+THEME_EXTENSIONS = '.Xresources', '.yaml'
+"""Extensions of files recognized as themes."""
+
+MAX_SCANNED_ENTRIES = 10000
+"""The maximum number of directory entries checked by a fallback scan."""
+
+COMMANDS = 'set', 'reload', 'stats', 'export', 'gallery'
+"""Names of commands of the application."""
+
+SCRIPTS = {
+    'bash': '''\
+_base16_theme_switcher() {
+    local cur=${COMP_WORDS[COMP_CWORD]}
+    if [[ $COMP_CWORD -eq 1 ]]; then
+        COMPREPLY=(
+            $(compgen -W "{commands}" -- "$cur")
+            $(base16-theme-switcher complete "$cur")
+        )
+    elif [[ ${COMP_WORDS[1]} == set && $COMP_CWORD -eq 2 ]]; then
+        COMPREPLY=($(base16-theme-switcher complete "$cur"))
+    fi
+}
+complete -F _base16_theme_switcher base16-theme-switcher
+''',
+    'zsh': '''\
+#compdef base16-theme-switcher
+_base16_theme_switcher() {
+    if (( CURRENT == 2 )); then
+        compadd -- {commands} \\
+            ${(f)"$(base16-theme-switcher complete "$PREFIX")"}
+    elif [[ $words[2] == set && CURRENT -eq 3 ]]; then
+        compadd -- ${(f)"$(base16-theme-switcher complete "$PREFIX")"}
+    fi
+}
+compdef _base16_theme_switcher base16-theme-switcher
+''',
+    'fish': '''\
+complete -c base16-theme-switcher -f -n __fish_use_subcommand \\
+    -a '{commands}'
+complete -c base16-theme-switcher -f -n __fish_use_subcommand \\
+    -a '(base16-theme-switcher complete (commandline -ct))'
+complete -c base16-theme-switcher -f \\
+    -n '__fish_seen_subcommand_from set' \\
+    -a '(base16-theme-switcher complete (commandline -ct))'
+'''
+}
+"""Completion scripts for supported shells."""
+
+
+def save_theme_names(names, path=DEFAULT_NAMES_PATH):
+    """Save names of themes to be used for completion.
+
+    The file is replaced atomically. Errors are ignored, because the
+    list is only an optimization.
+
+    :param names: names of themes.
+    :param path: a path of the file storing the names.
+    """
+    import tempfile  # not needed for completion, so imported lazily
+
+    content = ''.join(n + '\n' for n in sorted(names))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix='.theme-names-'
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def load_theme_names(path=DEFAULT_NAMES_PATH):
+    """Load the saved names of themes.
+
+    :param path: a path of the file storing the names.
+    :returns: a sorted list of names, or None if there is no list.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read().splitlines()
+    except OSError:
+        return None
+
+
+def get_theme_search_paths(config_path=DEFAULT_CONFIG_PATH):
+    """Get theme directories configured in a configuration file.
+
+    The modules reading the configuration are imported only when this
+    function is called, that is: when there is no saved list of names.
+
+    :param config_path: a path to the YAML configuration file.
+    :returns: a list of paths to the theme directories, in priority
+        order. It is empty if they can't be found.
+    """
+    from ruamel.yaml.error import YAMLError
+
+    from .config_structures import SetupError, YamlConfigPath
+
+    try:
+        config = YamlConfigPath.from_(config_path).read()
+    except (OSError, SetupError, YAMLError):
+        return []
+    if not isinstance(config, dict):
+        return []
+    value = config.get('theme-search-dir-path')
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [os.path.expanduser(str(p)) for p in value]
+
+
+def scan_theme_names(path, prefix='', max_entries=MAX_SCANNED_ENTRIES):
+    """Find names of themes in a directory, checking limited entries.
+
+    :param path: a path to the theme directory.
+    :param prefix: a prefix of names of themes to be returned.
+    :param max_entries: the maximum number of directory entries to be
+        checked.
+    :returns: a sorted list of unique names of themes found before the
+        limit was reached.
+    """
+    names = set()
+    directories = [path]
+    remaining = max_entries
+    while directories and remaining > 0:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for e in entries:
+                    remaining -= 1
+                    if remaining < 0:
+                        break
+                    if e.is_dir(follow_symlinks=False):
+                        directories.append(e.path)
+                        continue
+                    name, extension = os.path.splitext(e.name)
+                    if (extension in THEME_EXTENSIONS and
+                            name.startswith(prefix)):
+                        names.add(name)
+        except OSError:
+            continue
+    return sorted(names)
+
+
+def complete(prefix, names_path=DEFAULT_NAMES_PATH,
+             config_path=DEFAULT_CONFIG_PATH):
+    """Get names of themes starting with the prefix.
+
+    :param prefix: the prefix.
+    :param names_path: a path of the file storing names of themes.
+    :param config_path: a path to the configuration file, used to find
+        the theme directories if there is no saved list of names.
+    :returns: a sorted list of names.
+    """
+    names = load_theme_names(names_path)
+    if names is None:
+        found = set()
+        for path in get_theme_search_paths(config_path):
+            found.update(scan_theme_names(path, prefix))
+        return sorted(found)
+
+    start = bisect.bisect_left(names, prefix)
+    end = start
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return names[start:end]
+
+
+def run(prefix='', script=None, config_path=DEFAULT_CONFIG_PATH):
+    """Print names of themes or a completion script.
+
+    :param prefix: a prefix of names of themes to be printed.
+    :param script: a name of a shell whose completion script is to be
+        printed instead of names of themes, or None.
+    :param config_path: a path to the configuration file of the
+        application.
+    :returns: an exit status.
+    """
+    if script is not None:
+        text = SCRIPTS.get(script)
+        if text is None:
+            sys.stderr.write(
+                'Supported shells: {}\n'.format(', '.join(sorted(SCRIPTS)))
+            )
+            return 2
+        sys.stdout.write(text.replace('{commands}', ' '.join(COMMANDS)))
+        return 0
+
+    names = complete(prefix, config_path=config_path)
+    if names:
+        sys.stdout.write('\n'.join(names) + '\n')
+    return 0
+
+
+def main(args, config_path=DEFAULT_CONFIG_PATH):
+    """Execute the "complete" command.
+
+    :param args: arguments following the command: either a prefix of
+        a theme name, or --script followed by a name of a shell.
+    :param config_path: a path to the configuration file of the
+        application.
+    :returns: an exit status.
+    """
+    if args[:1] == ['--script']:
+        return run(
+            script=args[1] if len(args) > 1 else '', config_path=config_path
+        )
+    return run(args[0] if args else '', config_path=config_path)
@@ -9,6 +9,14 @@ from pathlib import Path
 import configobj
 from ruamel.yaml import YAML
 
+from .inifiles import (
+    IniFileEditor,
+    UnsupportedEditError,
+    find_sections,
+    flatten_sections,
+    replace_atomically,
+)
+
 
 class SetupError(Exception):
     """An error in application setup.
@@ -108,6 +116,100 @@ class ConfigMapping(MutableMapping):
         """
         return len(self._data)
 
+    def snapshot(self):
+        """Get an immutable snapshot of the mapping.
+
+        :returns: an instance of FrozenConfigMapping.
+        """
+        return FrozenConfigMapping(self._data, self._ancestors)
+
+
+def _freeze(value, ancestors):
+    """Get an immutable equivalent of a configuration value.
+
+    :param value: the value.
+    :param ancestors: identifiers used to locate the value.
+    :returns: an instance of FrozenConfigMapping for a mapping, a tuple
+        for a sequence, or the value converted to its built-in type.
+    """
+    if isinstance(value, FrozenConfigMapping):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenConfigMapping(value, ancestors)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v, ancestors) for v in value)
+    for type_ in bool, int, float, str:
+        if isinstance(value, type_):
+            return type_(value)
+    return value
+
+
+class FrozenConfigMapping(Mapping):
+    """An immutable snapshot of a configuration mapping.
+
+    Sections are snapshotted recursively, sequences are converted to
+    tuples, and values of types provided by configuration file parsers
+    are converted to built-in types. The snapshot may be shared by
+    threads without synchronization, it is hashable if all its values
+    are, and it is pickled without any objects of the parsers.
+    """
+
+    def __init__(self, data, ancestors):
+        """Create a snapshot of configuration data.
+
+        :param data: a mapping containing configuration data.
+        :param ancestors: the tuple of identifiers used to locate the
+            mapping, as in ConfigMapping.
+        """
+        self._ancestors = tuple(ancestors)
+        self._data = {
+            k: _freeze(v, self._ancestors + (k,)) for k, v in data.items()
+        }
+        try:
+            self._hash = hash(frozenset(self._data.items()))
+        except TypeError:
+            self._hash = None
+
+    def __getitem__(self, key):
+        """Get a value mapped to the given key.
+
+        :param key: a name of a configuration option or of a section.
+        :returns: a value of the option or a snapshot of the section.
+        :raises ConfigKeyError: if there is no option or section with
+            the name.
+        """
+        try:
+            return self._data[key]
+        except KeyError:
+            raise ConfigKeyError(
+                'A requested configuration option "{}" is missing in {}'
+                ''.format(key, ':'.join(self._ancestors))
+            )
+
+    def __iter__(self):
+        """Iterate on the names of config options or subsections."""
+        return iter(self._data)
+
+    def __len__(self):
+        """Get the number of option and section names in the config."""
+        return len(self._data)
+
+    def __hash__(self):
+        if self._hash is None:
+            # Raises TypeError naming the unhashable value.
+            return hash(frozenset(self._data.items()))
+        return self._hash
+
+    def __reduce__(self):
+        return FrozenConfigMapping, (self._data, self._ancestors)
+
+    def snapshot(self):
+        """Get an immutable snapshot of the mapping.
+
+        :returns: this instance.
+        """
+        return self
+
 
 class RootConfigMapping(ConfigMapping):
     """Represents a configuration mapping with a source or destination."""
@@ -122,6 +224,13 @@ class RootConfigMapping(ConfigMapping):
         data = source.read(fallback_to_empty=True)
         super().__init__(data, (str(source), ))
 
+    def reload(self):
+        """Replace the configuration data with the data of its source.
+
+        Changes that weren't saved are discarded.
+        """
+        self._data = self._source.read(fallback_to_empty=True)
+
     def save(self):
         """Save the configuration data to its destination."""
         self._source.write(self._data)
@@ -309,15 +418,88 @@ class YamlConfigPath(LazilySaveableMappingPath):
 
 
 class CfgConfigPath(LazilySaveableMappingPath):
-    """A path to an ini-type file."""
+    """A path to an ini-type file.
+
+    If only values of existing options are changed, the file is updated
+    in place, preserving its formatting and leaving it untouched if it
+    already contains the values. Other changes are saved by writing the
+    whole file.
+    """
 
     _get_empty_data = configobj.ConfigObj
 
+    def __init__(self, path):
+        """Get a path to an ini-type file.
+
+        :param path: a path object
+        """
+        super().__init__(path)
+        self._editor = IniFileEditor(self._path)
+
     def _do_read(self):
         return configobj.ConfigObj(str(self._path))
 
+    def _update_in_place(self, values):
+        """Change values of existing options without rewriting the file.
+
+        :param values: a mapping of tuples of names of sections and of
+            an option to new values of the options.
+        :returns: True if the file was changed, False if it already
+            contained the values.
+        :raises UnsupportedEditError: if the change requires writing
+            the whole file.
+        """
+        if not self._path.exists():
+            raise UnsupportedEditError('The file doesn\'t exist yet.')
+        return self._editor.update(values)
+
     def _do_write(self, data):
-        self._data.write()
+        values = dict(flatten_sections(data))
+        try:
+            if self._path.exists():
+                index = self._editor.get_index()
+                if (index.locations.keys() == values.keys() and
+                        index.sections == set(find_sections(data))):
+                    self._update_in_place(values)
+                    return
+        except UnsupportedEditError:
+            pass
+        with replace_atomically(self._path) as f:
+            data.write(f)
+
+    def update(self, values):
+        """Change values of options in the file.
+
+        Values of existing options are changed in place, so the rest of
+        the file is neither parsed nor rewritten. If an option is
+        missing or its value is a list, the whole file is read and
+        written instead.
+
+        :param values: a mapping of tuples of names of sections and of
+            an option to new values of the options.
+        :returns: True if the file was changed, False if it already
+            contained the values.
+        :raises ConfiguredPathError: if an operating system error occurs
+            during the operation.
+        """
+        self._logger.info('Updating configuration in %s', self._path)
+        with self:
+            try:
+                return self._update_in_place(values)
+            except UnsupportedEditError:
+                pass
+            data = self.read(fallback_to_empty=True)
+            changed = False
+            for key, value in values.items():
+                section = data
+                for name in key[:-1]:
+                    section = section.setdefault(name, {})
+                if section.get(key[-1]) != value:
+                    section[key[-1]] = value
+                    changed = True
+            if changed:
+                self._do_write(data)
+            return changed
 
 
 class TextConfigPath(LazilySaveablePath):
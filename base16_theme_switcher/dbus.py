@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+"""A minimal D-Bus client used for showing desktop notifications.
+
+Only calling methods of services on a bus is supported: connecting to
+a UNIX socket, EXTERNAL authentication, and marshalling basic types,
+arrays, structs, dictionaries and variants in the wire format described
+by the D-Bus specification. Values of variants are given as tuples of
+their signatures and values.
+"""
+
+import os
+import socket
+import struct
+from collections import namedtuple
+from urllib.parse import unquote
+
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+"""Types of messages."""
+
+PATH = 1
+INTERFACE = 2
+MEMBER = 3
+ERROR_NAME = 4
+REPLY_SERIAL = 5
+DESTINATION = 6
+SENDER = 7
+SIGNATURE = 8
+"""Codes of header fields of messages."""
+
+_HEADER_FIELD_TYPES = {
+    PATH: 'o', INTERFACE: 's', MEMBER: 's', ERROR_NAME: 's',
+    REPLY_SERIAL: 'u', DESTINATION: 's', SENDER: 's', SIGNATURE: 'g'
+}
+
+_FIXED_TYPES = {
+    'y': ('B', 1), 'b': ('I', 4), 'n': ('h', 2), 'q': ('H', 2),
+    'i': ('i', 4), 'u': ('I', 4), 'x': ('q', 8), 't': ('Q', 8),
+    'd': ('d', 8), 'h': ('I', 4)
+}
+"""struct formats and sizes of fixed-size types, by type codes."""
+
+_ALIGNMENTS = dict(
+    {c: size for c, (_, size) in _FIXED_TYPES.items()},
+    s=4, o=4, g=1, v=1, a=4, **{'(': 8, '{': 8}
+)
+
+_BYTE_ORDERS = {b'l': '<', b'B': '>'}
+
+BUS_NAME = 'org.freedesktop.DBus'
+BUS_PATH = '/org/freedesktop/DBus'
+"""A name and an object path of the message bus itself."""
+
+NOTIFICATIONS_NAME = 'org.freedesktop.Notifications'
+NOTIFICATIONS_PATH = '/org/freedesktop/Notifications'
+"""A name and an object path of the desktop notification service."""
+
+DEFAULT_TIMEOUT = 1
+"""The default maximum time of waiting for a bus, in seconds."""
+
+
+class DBusError(Exception):
+    """An error reply to a method call, or an invalid message."""
+
+    def __init__(self, name, message=''):
+        """Create a new instance.
+
+        :param name: a D-Bus name of the error.
+        :param message: a description of the error.
+        """
+        super().__init__('{}: {}'.format(name, message))
+        self.name = name
+
+
+def split_signature(signature):
+    """Split a signature into single complete types.
+
+    :param signature: the signature.
+    :returns: a list of signatures of the types.
+    :raises DBusError: if the signature contains unsupported types or
+        is invalid.
+    """
+    types = []
+    start = 0
+    try:
+        while start < len(signature):
+            end = _find_type_end(signature, start)
+            types.append(signature[start:end])
+            start = end
+    except IndexError:
+        raise DBusError(
+            'org.freedesktop.DBus.Error.InvalidSignature',
+            'Incomplete signature: {}'.format(signature)
+        )
+    return types
+
+
+def _find_type_end(signature, start):
+    code = signature[start]
+    if code == 'a':
+        return _find_type_end(signature, start + 1)
+    if code in '({':
+        end = start + 1
+        while signature[end] != (')' if code == '(' else '}'):
+            end = _find_type_end(signature, end)
+        return end + 1
+    if code not in _ALIGNMENTS:
+        raise DBusError(
+            'org.freedesktop.DBus.Error.InvalidSignature',
+            'Unsupported type "{}" in signature: {}'.format(code, signature)
+        )
+    return start + 1
+
+
+class _Marshaller:
+    """A writer of values in the wire format."""
+
+    def __init__(self, byte_order='<'):
+        self.data = bytearray()
+        self._byte_order = byte_order
+
+    def align(self, alignment):
+        self.data.extend(bytes(-len(self.data) % alignment))
+
+    def _pack(self, fmt, value):
+        self.data.extend(struct.pack(self._byte_order + fmt, value))
+
+    def write(self, signature, values):
+        for type_, value in zip(split_signature(signature), values):
+            self._write(type_, value)
+
+    def _write(self, type_, value):
+        code = type_[0]
+        if code in _FIXED_TYPES:
+            fmt, size = _FIXED_TYPES[code]
+            self.align(size)
+            self._pack(fmt, value)
+        elif code in 'so':
+            data = value.encode('utf-8')
+            self.align(4)
+            self._pack('I', len(data))
+            self.data.extend(data + b'\0')
+        elif code == 'g':
+            data = value.encode('ascii')
+            self._pack('B', len(data))
+            self.data.extend(data + b'\0')
+        elif code == 'v':
+            signature, inner_value = value
+            self._write('g', signature)
+            self._write(signature, inner_value)
+        elif code == 'a':
+            self.align(4)
+            length_offset = len(self.data)
+            self._pack('I', 0)
+            element_type = type_[1:]
+            self.align(_ALIGNMENTS[element_type[0]])
+            start = len(self.data)
+            elements = value.items() if element_type[0] == '{' else value
+            for element in elements:
+                self._write(element_type, element)
+            struct.pack_into(
+                self._byte_order + 'I', self.data, length_offset,
+                len(self.data) - start
+            )
+        else:
+            self.align(8)
+            self.write(type_[1:-1], value)
+
+
+class _Unmarshaller:
+    """A reader of values in the wire format."""
+
+    def __init__(self, data, byte_order):
+        self._data = data
+        self._byte_order = byte_order
+        self._offset = 0
+
+    def _align(self, alignment):
+        self._offset += -self._offset % alignment
+
+    def _unpack(self, fmt, size):
+        value = struct.unpack_from(
+            self._byte_order + fmt, self._data, self._offset
+        )[0]
+        self._offset += size
+        return value
+
+    def read(self, signature):
+        return tuple(self._read(t) for t in split_signature(signature))
+
+    def _read(self, type_):
+        code = type_[0]
+        if code in _FIXED_TYPES:
+            fmt, size = _FIXED_TYPES[code]
+            self._align(size)
+            value = self._unpack(fmt, size)
+            return bool(value) if code == 'b' else value
+        if code in 'sog':
+            if code == 'g':
+                length = self._unpack('B', 1)
+            else:
+                self._align(4)
+                length = self._unpack('I', 4)
+            data = self._data[self._offset:self._offset + length]
+            self._offset += length + 1
+            return bytes(data).decode('utf-8')
+        if code == 'v':
+            signature = self._read('g')
+            return signature, self._read(signature)
+        if code == 'a':
+            self._align(4)
+            length = self._unpack('I', 4)
+            element_type = type_[1:]
+            self._align(_ALIGNMENTS[element_type[0]])
+            end = self._offset + length
+            elements = []
+            while self._offset < end:
+                elements.append(self._read(element_type))
+            return dict(elements) if element_type[0] == '{' else elements
+        self._align(8)
+        return self.read(type_[1:-1])
+
+
+class Message(namedtuple('Message', 'type flags serial fields body')):
+    """A D-Bus message.
+
+    :ivar type: a type of the message, like METHOD_CALL.
+    :ivar flags: flags of the message.
+    :ivar serial: a serial number of the message.
+    :ivar fields: a mapping of codes of header fields to their values.
+    :ivar body: a tuple of values of arguments in the body.
+    """
+
+
+def build_message(message_type, serial, fields, signature='', body=(),
+                  flags=0):
+    """Get a message in the wire format.
+
+    :param message_type: a type of the message, like METHOD_CALL.
+    :param serial: a serial number of the message, greater than zero.
+    :param fields: a mapping of codes of header fields to their values.
+        The signature field is added for a non-empty signature.
+    :param signature: a signature of the body.
+    :param body: a sequence of values of arguments in the body.
+    :param flags: flags of the message.
+    :returns: the message, as bytes.
+    """
+    body_data = _Marshaller()
+    body_data.write(signature, body)
+    fields = dict(fields)
+    if signature:
+        fields[SIGNATURE] = signature
+    header = _Marshaller()
+    header.write('yyyyuua(yv)', (
+        ord('l'), message_type, flags, 1, len(body_data.data), serial,
+        [(c, (_HEADER_FIELD_TYPES[c], v)) for c, v in sorted(fields.items())]
+    ))
+    header.align(8)
+    return bytes(header.data + body_data.data)
+
+
+def read_message(read):
+    """Read a message in the wire format.
+
+    :param read: a callable returning a given number of bytes read
+        from a stream.
+    :returns: an instance of Message.
+    :raises DBusError: if the message is invalid.
+    """
+    fixed = read(16)
+    byte_order = _BYTE_ORDERS.get(bytes(fixed[:1]))
+    if byte_order is None:
+        raise DBusError(
+            'org.freedesktop.DBus.Error.InvalidArgs',
+            'Unknown byte order of a message.'
+        )
+    body_length, _, fields_length = struct.unpack_from(
+        byte_order + 'III', fixed, 4
+    )
+    header_length = 16 + fields_length
+    header_length += -header_length % 8
+    data = bytes(fixed) + read(header_length - 16 + body_length)
+    try:
+        _, message_type, flags, _, _, serial, fields = _Unmarshaller(
+            data, byte_order
+        ).read('yyyyuua(yv)')
+        fields = {code: value for code, (_, value) in fields}
+        body = _Unmarshaller(data[header_length:], byte_order).read(
+            fields.get(SIGNATURE, '')
+        )
+    except (struct.error, UnicodeDecodeError) as e:
+        raise DBusError(
+            'org.freedesktop.DBus.Error.InvalidArgs',
+            'Invalid message: {}'.format(e)
+        )
+    return Message(message_type, flags, serial, fields, body)
+
+
+def get_session_bus_address():
+    """Get an address of the session bus of the user.
+
+    :returns: the address, in the D-Bus address format.
+    """
+    address = os.environ.get('DBUS_SESSION_BUS_ADDRESS')
+    if address:
+        return address
+    return 'unix:path=/run/user/{}/bus'.format(os.getuid())
+
+
+def parse_address(address):
+    """Get addresses of UNIX sockets of a bus.
+
+    :param address: an address of the bus, in the D-Bus address format.
+    :returns: a list of the addresses of the sockets, in the format
+        accepted by socket.connect. Addresses of other transports are
+        skipped.
+    """
+    sockets = []
+    for entry in address.split(';'):
+        transport, _, options = entry.partition(':')
+        if transport != 'unix':
+            continue
+        options = dict(
+            o.partition('=')[::2] for o in options.split(',') if o
+        )
+        if 'path' in options:
+            sockets.append(unquote(options['path']))
+        elif 'abstract' in options:
+            sockets.append('\0' + unquote(options['abstract']))
+    return sockets
+
+
+class Connection:
+    """A connection to a message bus.
+
+    Instances of this class are not thread-safe.
+    """
+
+    def __init__(self, sock):
+        """Create a new instance.
+
+        :param sock: a connected socket.
+        """
+        self._socket = sock
+        self._buffer = bytearray()
+        self._serial = 0
+        self.unique_name = None
+
+    @classmethod
+    def open(cls, address=None, timeout=DEFAULT_TIMEOUT):
+        """Connect and authenticate to a bus.
+
+        :param address: an address of the bus, or None for the session
+            bus.
+        :param timeout: the maximum time of waiting for the bus, in
+            seconds.
+        :returns: an instance of this class.
+        :raises OSError: if the bus can't be connected to.
+        :raises DBusError: if the bus rejected the connection.
+        """
+        if address is None:
+            address = get_session_bus_address()
+        error = OSError('No supported D-Bus address: {}'.format(address))
+        for socket_address in parse_address(address):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(socket_address)
+            except OSError as e:
+                sock.close()
+                error = e
+                continue
+            connection = cls(sock)
+            try:
+                connection._authenticate()
+                connection.unique_name, = connection.call(
+                    BUS_NAME, BUS_PATH, BUS_NAME, 'Hello'
+                )
+            except BaseException:
+                connection.close()
+                raise
+            return connection
+        raise error
+
+    def _authenticate(self):
+        uid = str(os.getuid()).encode('ascii').hex().encode('ascii')
+        self._socket.sendall(b'\0AUTH EXTERNAL ' + uid + b'\r\n')
+        line = self._read_line()
+        if not line.startswith(b'OK '):
+            raise DBusError(
+                'org.freedesktop.DBus.Error.AuthFailed',
+                'The bus rejected authentication: {}'.format(
+                    line.decode('ascii', 'replace')
+                )
+            )
+        self._socket.sendall(b'BEGIN\r\n')
+
+    def _fill_buffer(self):
+        data = self._socket.recv(4096)
+        if not data:
+            raise ConnectionResetError('The bus closed the connection.')
+        self._buffer.extend(data)
+
+    def _read_line(self):
+        while b'\r\n' not in self._buffer:
+            self._fill_buffer()
+        end = self._buffer.index(b'\r\n')
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end + 2]
+        return line
+
+    def _read(self, size):
+        while len(self._buffer) < size:
+            self._fill_buffer()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def call(self, destination, path, interface, member, signature='',
+             body=()):
+        """Call a method and wait for its reply.
+
+        Other messages received before the reply, like signals sent by
+        the bus, are discarded.
+
+        :param destination: a bus name of the service providing the
+            method.
+        :param path: an object path of an object providing the method.
+        :param interface: an interface of the method.
+        :param member: a name of the method.
+        :param signature: a signature of arguments of the method.
+        :param body: a sequence of values of the arguments.
+        :returns: a tuple of values returned by the method.
+        :raises OSError: if the connection fails or times out.
+        :raises DBusError: if the method returned an error.
+        """
+        self._serial += 1
+        serial = self._serial
+        self._socket.sendall(build_message(
+            METHOD_CALL, serial, {
+                PATH: path, INTERFACE: interface, MEMBER: member,
+                DESTINATION: destination
+            }, signature, body
+        ))
+        while True:
+            message = read_message(self._read)
+            if message.fields.get(REPLY_SERIAL) != serial:
+                continue
+            if message.type == ERROR:
+                text = message.body[0] if message.body else ''
+                raise DBusError(
+                    message.fields.get(ERROR_NAME, ''), str(text)
+                )
+            return message.body
+
+    def close(self):
+        """Close the connection."""
+        self._socket.close()
+
+
+def notify(connection, app_name, summary, body='', urgency=1,
+           expire_timeout=-1):
+    """Show a desktop notification.
+
+    :param connection: a connection to the session bus.
+    :param app_name: a name of the application sending the
+        notification.
+    :param summary: a summary of the notification.
+    :param body: a body of the notification.
+    :param urgency: an urgency level: 0 for low, 1 for normal and 2 for
+        critical.
+    :param expire_timeout: the time after which the notification is
+        closed, in milliseconds, or -1 for the default of the server.
+    :returns: an ID of the notification.
+    :raises OSError: if the connection fails or times out.
+    :raises DBusError: if the notification service returned an error.
+    """
+    return connection.call(
+        NOTIFICATIONS_NAME, NOTIFICATIONS_PATH, NOTIFICATIONS_NAME,
+        'Notify', 'susssasa{sv}i', (
+            app_name, 0, '', summary, body, [],
+            {'urgency': ('y', urgency)}, expire_timeout
+        )
+    )[0]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Using theme appliers deferred by a theme switch.
+
+This module is executed in a detached background process by a theme
+switcher whose slow theme appliers exceed the configured latency
+budget. It isn't meant to be executed by users.
+"""
+
+import argparse
+
+
+def get_parser():
+    """Get a parser of command-line arguments of the module.
+
+    :returns: the parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m base16_theme_switcher.deferred',
+        description='Use theme appliers deferred by a theme switch.'
+    )
+    parser.add_argument(
+        '-c', '--config', type=str, required=True,
+        help='A configuration file of the theme switcher.'
+    )
+    parser.add_argument(
+        '-l', '--log', type=str, required=True,
+        help='An output file for latest logs.'
+    )
+    parser.add_argument(
+        '-v', '--verbose', action='store_true',
+        help='Print debug messages in standard output.'
+    )
+    parser.add_argument(
+        '--skip', type=str, action='append', default=[],
+        help=(
+            'A name of a task of a theme applier that was already used. '
+            'May be given several times.'
+        )
+    )
+    parser.add_argument('theme', type=str, help='A name of the theme.')
+    return parser
+
+
+def main(argv=None):
+    """Use the deferred theme appliers.
+
+    :param argv: command-line arguments, or None for the arguments of
+        the process.
+    """
+    from base16_theme_switcher import app
+
+    args = get_parser().parse_args(argv)
+    app.run_deferred(
+        args.config, args.log, args.verbose, args.theme, args.skip
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""Finding theme files in several directory trees.
+
+Directories are read with os.scandir by a small pool of threads, so
+that latency of slow network mounts is overlapped. Ignored directories
+are not entered at all, and each directory is read at most once, so
+symbolic links pointing to their ancestors don't cause infinite loops.
+
+A single theme can also be found without searching whole trees, by
+probing directories known to contain themes since the last search.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatchcase
+
+DEFAULT_IGNORED = '.git', 'node_modules'
+"""Shell-style patterns matching names of directories not searched for
+themes by default."""
+
+DEFAULT_MAX_WORKERS = 4
+"""The default number of directories read at the same time."""
+
+DEFAULT_DIRECTORY_CACHE_PATH = (
+    '~/.cache/base16-theme-switcher/theme-dirs.json'
+)
+"""A default path to the list of directories containing themes."""
+
+CONVENTIONAL_DIRS = 'xresources', 'base16'
+"""Subdirectories containing themes in the base16-xresources and
+base16 scheme repositories, probed if there is no list of directories
+containing themes."""
+
+
+class _Walker:
+    """An object reading directories for a single search."""
+
+    def __init__(self, extensions, ignore):
+        self._extensions = frozenset(extensions)
+        self._ignore = tuple(ignore)
+        self._visited = set()
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def _is_new(self, path):
+        info = os.stat(path)
+        key = info.st_dev, info.st_ino
+        with self._lock:
+            if key in self._visited:
+                return False
+            self._visited.add(key)
+            return True
+
+    def scan(self, path):
+        """Read a directory.
+
+        :param path: a path to the directory.
+        :returns: a tuple containing a list of paths to matching files
+            and a list of paths to subdirectories to be read.
+        """
+        files = []
+        directories = []
+        try:
+            if not self._is_new(path):
+                self._logger.debug('Skipping visited directory %s', path)
+                return files, directories
+            with os.scandir(path) as entries:
+                for e in entries:
+                    try:
+                        is_dir = e.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not any(
+                                fnmatchcase(e.name, p) for p in self._ignore
+                        ):
+                            directories.append(e.path)
+                    elif os.path.splitext(e.name)[1] in self._extensions:
+                        files.append(e.path)
+        except OSError as e:
+            self._logger.warning('Can\'t search %s for themes: %s', path, e)
+        return files, directories
+
+
+def find_files(roots, extensions, ignore=DEFAULT_IGNORED,
+               max_workers=DEFAULT_MAX_WORKERS, on_found=None):
+    """Find files with given extensions in several directory trees.
+
+    Symbolic links to directories are followed, but no directory is
+    read twice, even if it is in several of the trees.
+
+    :param roots: paths to roots of the trees, in priority order.
+    :param extensions: extensions of names of the files, including
+        leading dots.
+    :param ignore: shell-style patterns matching names of directories
+        that are not searched.
+    :param max_workers: the maximum number of directories read at the
+        same time.
+    :param on_found: a callable to be called with a list of paths to
+        files found in each directory as soon as it is read, or None.
+    :returns: a list containing a sorted list of paths to files found
+        in each of the trees, in the order of the roots. Trees are
+        claimed by the roots in this order, too, so a directory shared
+        by several trees is included in the list of the first of them.
+    """
+    walker = _Walker(extensions, ignore)
+    found = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for root in roots:
+            found.append(sorted(
+                _walk_tree(executor, walker, root, on_found)
+            ))
+    return found
+
+
+def _walk_tree(executor, walker, root, on_found=None):
+    found = []
+    pending = {executor.submit(walker.scan, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            files, directories = future.result()
+            found.extend(files)
+            if files and on_found is not None:
+                on_found(files)
+            pending.update(
+                executor.submit(walker.scan, d) for d in directories
+            )
+    return found
+
+
+def probe_files(root, file_names, directories=None, ignore=DEFAULT_IGNORED):
+    """Find files with given names in likely directories of a tree.
+
+    :param root: a path to the root of the tree.
+    :param file_names: names of the files.
+    :param directories: paths to directories known to contain themes,
+        possibly including directories of other trees, or None to probe
+        the root and its conventional subdirectories.
+    :param ignore: shell-style patterns matching names of directories
+        that are not probed.
+    :returns: a list of paths to the found files.
+    """
+    if directories is None:
+        directories = [root] + [
+            os.path.join(root, d) for d in CONVENTIONAL_DIRS
+            if not any(fnmatchcase(d, p) for p in ignore)
+        ]
+    else:
+        prefix = os.path.join(root, '')
+        directories = [
+            d for d in directories if d == root or d.startswith(prefix)
+        ]
+    return [
+        os.path.join(d, n) for d in directories for n in file_names
+        if os.path.isfile(os.path.join(d, n))
+    ]
+
+
+def save_theme_directories(path, roots, ignore, directories):
+    """Save paths to directories containing themes.
+
+    The file is replaced atomically. Errors are ignored, because the
+    list is only an optimization.
+
+    :param path: a path to the file storing the list.
+    :param roots: paths to roots of searched trees.
+    :param ignore: patterns matching names of directories that were not
+        searched.
+    :param directories: paths to the directories.
+    """
+    path = os.path.expanduser(path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix='.theme-dirs-'
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({
+                'roots': list(roots),
+                'ignore': list(ignore),
+                'directories': sorted(directories)
+            }, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.getLogger(__name__).debug(
+            'Can\'t save theme directories to %s: %s', path, e
+        )
+
+
+def load_theme_directories(path, roots, ignore):
+    """Load paths to directories containing themes.
+
+    :param path: a path to the file storing the list.
+    :param roots: paths to roots of the trees to be searched.
+    :param ignore: patterns matching names of directories that are not
+        to be searched.
+    :returns: a list of paths to the directories, or None if there is
+        no list saved for the same roots and ignored directories.
+    """
+    try:
+        with open(os.path.expanduser(path), encoding='utf-8') as f:
+            data = json.load(f)
+        if (data['roots'] != list(roots) or
+                data['ignore'] != list(ignore)):
+            return None
+        return list(data['directories'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
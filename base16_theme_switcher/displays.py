@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Discovering X displays and applying themes to several of them."""
+
+import logging
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import commands
+
+X11_SOCKET_DIR = '/tmp/.X11-unix'
+"""A directory containing UNIX sockets of local X servers."""
+
+DEFAULT_MAX_WORKERS = 4
+"""The default number of displays to which a theme is applied at once."""
+
+_SOCKET_NAME_PATTERN = re.compile(r'X(\d+)$')
+"""A pattern matching a name of a socket of an X server."""
+
+
+def find_displays(socket_dir=X11_SOCKET_DIR):
+    """Find names of displays of local X servers.
+
+    :param socket_dir: a path to a directory containing sockets of
+        X servers, named after numbers of their displays.
+    :returns: a list of display names, like ":0", sorted by the
+        display number. The list is empty if the directory doesn't
+        exist.
+    """
+    try:
+        names = os.listdir(socket_dir)
+    except FileNotFoundError:
+        return []
+    matches = (_SOCKET_NAME_PATTERN.match(n) for n in names)
+    numbers = sorted(int(m.group(1)) for m in matches if m)
+    return [':{}'.format(n) for n in numbers]
+
+
+class DisplayResult(namedtuple('DisplayResult', 'display error')):
+    """A result of applying a theme to an X display.
+
+    The error attribute is None if the theme was applied successfully,
+    otherwise it is the exception that interrupted the operation.
+    """
+
+    @property
+    def succeeded(self):
+        """Check if the theme was applied to the display."""
+        return self.error is None
+
+
+def merge_resources(display, resources, preprocess=True):
+    """Merge resources into the resource database of the display.
+
+    :param display: a name of the X display, or None for the display
+        inherited by the process.
+    :param resources: a string with X resources to be merged, in
+        a format accepted by xrdb.
+    :param preprocess: False if the resources are not to be passed
+        through the C preprocessor by xrdb.
+    :raises subprocess.CalledProcessError: if xrdb fails.
+    """
+    display_args = [] if display is None else ['-display', display]
+    cpp_args = [] if preprocess else ['-nocpp']
+    commands.run(
+        ['xrdb'] + display_args + cpp_args + ['-merge'],
+        input=resources,
+        check=True
+    )
+
+
+def query_resources(display):
+    """Get the content of the resource database of the display.
+
+    :param display: a name of the X display, or None for the display
+        inherited by the process.
+    :returns: the content, as printed by xrdb -query.
+    :raises subprocess.CalledProcessError: if xrdb fails.
+    """
+    display_args = [] if display is None else ['-display', display]
+    return commands.run(
+        ['xrdb'] + display_args + ['-query'],
+        check=True,
+        capture_output=True
+    ).stdout
+
+
+def apply_to_display(theme, display, display_appliers):
+    """Apply the theme to a single X display.
+
+    :param theme: a theme to be applied.
+    :param display: a name of the X display.
+    :param display_appliers: a sequence of display-scoped theme
+        appliers to be used, one after another, for the display. The
+        first of them is usually responsible for merging the theme
+        into the resource database of the display.
+    :returns: a result of the operation.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        for a in display_appliers:
+            a.apply_to_display(theme, display)
+    except Exception as e:
+        logger.debug(
+            'Applying "%s" to %s failed.', theme.name, display, exc_info=True
+        )
+        return DisplayResult(display, e)
+    return DisplayResult(display, None)
+
+
+def apply_to_displays(
+        theme, displays, display_appliers, max_workers=DEFAULT_MAX_WORKERS
+):
+    """Apply the theme to several X displays concurrently.
+
+    The theme file is read and parsed once, before the work is
+    distributed between the workers.
+
+    :param theme: a theme to be applied.
+    :param displays: a sequence of names of X displays.
+    :param display_appliers: a sequence of display-scoped theme
+        appliers to be used for each display, in order.
+    :param max_workers: the maximum number of displays to which the
+        theme is being applied at the same time.
+    :returns: a list of results, in the order of the displays.
+    """
+    _ = theme.definitions
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda d: apply_to_display(theme, d, display_appliers),
+            displays
+        ))
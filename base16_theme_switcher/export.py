@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Exporting palettes of themes in formats used by other tools.
+
+Themes are parsed in parallel by worker processes, but the palettes
+are written one by one, in the order of the themes, as soon as they
+are available. Only a limited number of parsed palettes is kept in
+memory at any time.
+"""
+
+import csv
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+
+from .schemes import COLOR_NAMES
+from .terminals import get_osc_sequences
+from .themes import Base16Theme
+
+
+class JsonLinesFormat:
+    """Palettes as JSON objects, one per line."""
+
+    def __init__(self, stream):
+        """Create a new instance.
+
+        :param stream: a text stream to which palettes are written.
+        """
+        self._stream = stream
+
+    def write_header(self):
+        """Write data preceding all palettes."""
+
+    def write(self, name, colors):
+        """Write a palette of a theme.
+
+        :param name: a name of the theme.
+        :param colors: a mapping of names of colors to their values.
+        """
+        self._stream.write(
+            json.dumps({'name': name, 'colors': colors}) + '\n'
+        )
+
+
+class CsvFormat(JsonLinesFormat):
+    """Palettes as rows of a CSV table with a header."""
+
+    def __init__(self, stream):
+        """Create a new instance.
+
+        :param stream: a text stream to which palettes are written.
+        """
+        super().__init__(stream)
+        self._writer = csv.writer(stream, lineterminator='\n')
+
+    def write_header(self):
+        """Write the header of the table."""
+        self._writer.writerow(('name',) + COLOR_NAMES)
+
+    def write(self, name, colors):
+        """Write a palette of a theme.
+
+        :param name: a name of the theme.
+        :param colors: a mapping of names of colors to their values.
+        """
+        self._writer.writerow([name] + [colors[n] for n in COLOR_NAMES])
+
+
+class CssFormat(JsonLinesFormat):
+    """Palettes as CSS custom properties of theme-specific rules.
+
+    The properties of a theme apply to elements whose data-theme
+    attribute is equal to its name.
+    """
+
+    def write(self, name, colors):
+        """Write a palette of a theme.
+
+        :param name: a name of the theme.
+        :param colors: a mapping of names of colors to their values.
+        """
+        properties = ''.join(
+            '  --{}: {};\n'.format(n, colors[n]) for n in COLOR_NAMES
+        )
+        self._stream.write(
+            '[data-theme={}] {{\n{}}}\n'.format(json.dumps(name), properties)
+        )
+
+
+class OscFormat(JsonLinesFormat):
+    """Palettes as terminal escape sequences, one line per theme.
+
+    The names of themes are not written, so a single exported theme
+    can be applied by writing it to a terminal.
+    """
+
+    def write(self, name, colors):
+        """Write a palette of a theme.
+
+        :param name: a name of the theme.
+        :param colors: a mapping of names of colors to their values.
+        """
+        self._stream.write(get_osc_sequences(colors) + '\n')
+
+
+FORMATS = {
+    'jsonl': JsonLinesFormat,
+    'csv': CsvFormat,
+    'css': CssFormat,
+    'osc': OscFormat
+}
+"""Supported export formats, by their names."""
+
+
+def read_palette(path):
+    """Read all colors of a theme.
+
+    This function is executed by worker processes.
+
+    :param path: a path to the theme file, as a string.
+    :returns: a tuple containing a mapping of names of the colors to
+        their values (or None) and a description of an error that
+        prevented reading them (or None).
+    """
+    try:
+        theme = Base16Theme.from_(path)
+        return {n: theme[n] for n in COLOR_NAMES}, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _map_in_order(executor, function, items, get_argument, window):
+    """Apply a function to items in an executor, keeping their order.
+
+    At most the given number of items is submitted ahead of the item
+    whose result is yielded next.
+
+    :returns: a generator yielding tuples of items and their results.
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(function, get_argument(item))))
+        if len(pending) >= window:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def select_themes(themes, patterns=()):
+    """Select themes whose names match any of shell-style patterns.
+
+    :param themes: themes sorted by name.
+    :param patterns: a sequence of patterns, or an empty sequence to
+        select all themes.
+    :returns: a generator yielding the selected themes.
+    """
+    for theme in themes:
+        if not patterns or any(fnmatchcase(theme.name, p) for p in patterns):
+            yield theme
+
+
+def export_palettes(themes, stream, format_name, max_workers=None):
+    """Write palettes of themes to a stream.
+
+    Invalid themes are logged and skipped.
+
+    :param themes: an iterable of themes, in the order in which they
+        are written.
+    :param stream: a text stream.
+    :param format_name: a name of one of the supported formats.
+    :param max_workers: the maximum number of worker processes, or
+        None for the default of ProcessPoolExecutor.
+    :returns: the number of written palettes.
+    :raises KeyError: if the format isn't supported.
+    """
+    logger = logging.getLogger(__name__)
+    export_format = FORMATS[format_name](stream)
+    export_format.write_header()
+    count = 0
+    window = 4 * (max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = _map_in_order(
+            executor, read_palette, themes, lambda t: str(t.path), window
+        )
+        for theme, (colors, error) in results:
+            if colors is None:
+                logger.warning('Skipping invalid theme %s: %s', theme, error)
+                continue
+            export_format.write(theme.name, colors)
+            count += 1
+    return count
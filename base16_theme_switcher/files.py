@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Creating files that replace configuration files of users.
+
+A new content of a file is written to a temporary file, which is then
+renamed over the file. The temporary file gets the permissions of the
+replaced file, and symbolic links to the file are resolved, so that
+they keep pointing to it instead of being replaced themselves.
+"""
+
+import os
+import stat
+
+
+def create_replacement(path, prefix=None):
+    """Create a temporary file to be renamed over a file.
+
+    The temporary file is created in the directory of the file to which
+    the path resolves. It has the permissions of that file or, if the
+    file doesn't exist, the permissions of a new file, as limited by
+    the umask of the process.
+
+    :param path: a path to the replaced file.
+    :param prefix: a prefix of a name of the temporary file. By
+        default, it is a dot followed by the name of the replaced file.
+    :returns: a tuple containing a file descriptor of the temporary
+        file, open for writing, a path to the temporary file and the
+        path to the replaced file, with symbolic links resolved.
+    :raises OSError: if the temporary file can't be created.
+    """
+    target = os.path.realpath(str(path))
+    directory, name = os.path.split(target)
+    if prefix is None:
+        prefix = '.' + name
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_CLOEXEC', 0)
+    while True:
+        tmp_path = os.path.join(
+            directory, '{}.{}.tmp'.format(prefix, os.urandom(4).hex())
+        )
+        try:
+            fd = os.open(tmp_path, flags, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        os.fchmod(fd, stat.S_IMODE(os.stat(target).st_mode))
+    except FileNotFoundError:
+        pass
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    return fd, tmp_path, target
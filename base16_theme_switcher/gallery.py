@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Rendering a gallery of swatches of all themes.
+
+Each theme is rendered as an SVG image showing all its colors, and
+an HTML index displays all the images. Themes are rendered in parallel
+by worker processes, which write the images as soon as they are ready.
+A manifest stores modification times of theme files, so only new and
+modified themes are rendered again.
+"""
+
+import html
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import quote
+
+from .schemes import COLOR_NAMES
+from .templates import write_atomically
+from .themes import Base16Theme
+
+MANIFEST_NAME = 'gallery.json'
+"""A name of the file storing the state of the gallery."""
+
+INDEX_NAME = 'index.html'
+"""A name of the HTML index of the gallery."""
+
+SWATCH_SIZE = 40
+"""The size of the side of a color square in a swatch, in pixels."""
+
+_INDEX_TEMPLATE = '''\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Base16 themes</title>
+<style>
+body {{ font-family: sans-serif; }}
+figure {{ display: inline-block; margin: 8px; }}
+</style>
+</head>
+<body>
+<h1>Base16 themes ({count})</h1>
+{figures}
+</body>
+</html>
+'''
+
+
+def render_swatch(name, colors):
+    """Render an SVG image showing colors of a theme.
+
+    The colors are shown in two rows of eight squares.
+
+    :param name: a name of the theme.
+    :param colors: a sequence of 16 hexadecimal color values, ordered
+        from base00 to base0F.
+    :returns: the content of the SVG file.
+    """
+    rects = ''.join(
+        '<rect x="{}" y="{}" width="{s}" height="{s}" fill="{}"/>'.format(
+            i % 8 * SWATCH_SIZE, i // 8 * SWATCH_SIZE, c, s=SWATCH_SIZE
+        )
+        for i, c in enumerate(colors)
+    )
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}">'
+        '<title>{}</title>{}</svg>\n'.format(
+            html.escape(name), rects, w=8 * SWATCH_SIZE, h=2 * SWATCH_SIZE
+        )
+    )
+
+
+def render_theme(theme_path, image_path):
+    """Render a swatch of a theme file and write it.
+
+    This function is executed by worker processes.
+
+    :param theme_path: a path to the theme file, as a string.
+    :param image_path: a path to the image file to be written.
+    :returns: None if the image was written, or a description of the
+        error that prevented it.
+    """
+    try:
+        theme = Base16Theme.from_(theme_path)
+        colors = [theme[n] for n in COLOR_NAMES]
+        write_atomically(image_path, render_swatch(theme.name, colors))
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _get_image_name(theme_name):
+    return theme_name + '.svg'
+
+
+def render_index(entries):
+    """Render the HTML index of the gallery.
+
+    :param entries: a mapping of names of successfully rendered themes
+        to modification times of their files, used to make browsers
+        load updated images.
+    :returns: the content of the index.
+    """
+    figures = ''.join(
+        '<figure><img src="{}?v={}" alt="{n}">'
+        '<figcaption>{n}</figcaption></figure>\n'.format(
+            quote(_get_image_name(name)), mtime, n=html.escape(name)
+        )
+        for name, mtime in sorted(entries.items())
+    )
+    return _INDEX_TEMPLATE.format(count=len(entries), figures=figures)
+
+
+class Gallery:
+    """A directory containing swatches of themes and their index."""
+
+    def __init__(self, path):
+        """Create a new instance.
+
+        :param path: a path to the directory. It is created if it
+            doesn't exist. A user directory in the path is expanded.
+        """
+        self._path = Path(path).expanduser()
+        self._logger = logging.getLogger(__name__)
+
+    def _read_manifest(self):
+        try:
+            with open(str(self._path / MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _is_current(self, entry, source, mtime, name):
+        return (
+            entry is not None and
+            entry.get('source') == source and
+            entry.get('mtime') == mtime and
+            (entry.get('error') is not None or
+             (self._path / _get_image_name(name)).exists())
+        )
+
+    def update(self, themes, max_workers=None):
+        """Render new and modified themes and update the index.
+
+        Images of themes that are no longer present are removed.
+
+        :param themes: a collection of themes with unique names.
+        :param max_workers: the maximum number of worker processes, or
+            None for the default of ProcessPoolExecutor.
+        :returns: a tuple containing numbers of rendered, skipped and
+            invalid themes.
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+        old_manifest = self._read_manifest()
+        manifest = {}
+        stale = []
+        for theme in themes:
+            source = str(theme.path)
+            mtime = theme.path.stat().st_mtime_ns
+            entry = old_manifest.get(theme.name)
+            if self._is_current(entry, source, mtime, theme.name):
+                manifest[theme.name] = entry
+            else:
+                stale.append((theme.name, source, mtime))
+
+        for name in old_manifest.keys() - {t.name for t in themes}:
+            try:
+                os.unlink(str(self._path / _get_image_name(name)))
+            except FileNotFoundError:
+                pass
+
+        self._logger.info('Rendering %d themes...', len(stale))
+        for name, source, mtime, error in self._render(stale, max_workers):
+            if error is not None:
+                self._logger.warning(
+                    'Skipping invalid theme %s: %s', source, error
+                )
+            manifest[name] = {
+                'source': source, 'mtime': mtime, 'error': error
+            }
+
+        write_atomically(
+            self._path / INDEX_NAME,
+            render_index({
+                n: e['mtime'] for n, e in manifest.items()
+                if e.get('error') is None
+            })
+        )
+        write_atomically(self._path / MANIFEST_NAME, json.dumps(manifest))
+
+        invalid = sum(1 for e in manifest.values() if e.get('error'))
+        return len(stale), len(manifest) - len(stale), invalid
+
+    def _render(self, stale, max_workers):
+        """Render themes, yielding results as they become available.
+
+        :param stale: a list of tuples containing a name of a theme,
+            a path to its file and its modification time.
+        :param max_workers: the maximum number of worker processes.
+        :returns: a generator yielding the tuples extended with
+            a description of an error, or None.
+        """
+        if len(stale) <= 1:
+            for name, source, mtime in stale:
+                error = render_theme(
+                    source, str(self._path / _get_image_name(name))
+                )
+                yield name, source, mtime, error
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    render_theme,
+                    source,
+                    str(self._path / _get_image_name(name))
+                ): (name, source, mtime)
+                for name, source, mtime in stale
+            }
+            for future in as_completed(futures):
+                yield futures[future] + (future.result(),)
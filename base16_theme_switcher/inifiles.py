@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Changing values of options in INI files in place.
+
+A file in the format read by configobj is indexed once, recording the
+position of the value of each option. Changed values are written by
+copying the file line by line to a temporary file, replacing only the
+changed values, and renaming it over the original. Comments and
+formatting are preserved, and a file is not written at all if it
+already contains the values.
+"""
+
+import os
+import re
+from collections import namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from .files import create_replacement
+
+_SECTION_PATTERN = re.compile(r'\s*(\[+)\s*(.*?)\s*(\]+)\s*(?:#.*)?$')
+_OPTION_PATTERN = re.compile(
+    r'\s*("[^"]*"|\'[^\']*\'|[^\s=#][^=#]*?)\s*=\s*'
+)
+_TRIPLE_QUOTES = "'''", '"""'
+
+
+class UnsupportedEditError(ValueError):
+    """A change that can't be made without rewriting the whole file."""
+
+
+class FileIndex(namedtuple('FileIndex', 'locations sections')):
+    """Positions of values of options and names of sections in a file.
+
+    :ivar locations: a mapping of tuples of names of sections and of an
+        option to instances of ValueLocation, or to None for values that
+        can't be changed in place, like lists and multi-line values.
+    :ivar sections: a set of tuples of names of sections and their
+        parent sections.
+    """
+
+
+class ValueLocation(
+        namedtuple('ValueLocation', 'line start end value')
+):
+    """A position of a value of an option in a file.
+
+    :ivar line: an index of the line containing the value.
+    :ivar start: an offset of the first character of the value, including
+        its quotes, in the line.
+    :ivar end: an offset of the character following the value.
+    :ivar value: the value, without quotes.
+    """
+
+
+def flatten_sections(mapping, sections=()):
+    """Get values of options in nested sections.
+
+    :param mapping: a mapping of names of options and sections to
+        values and mappings representing the sections.
+    :param sections: names of sections containing the mapping.
+    :returns: a generator yielding tuples of keys, which are tuples of
+        names of sections and of an option, and of values.
+    """
+    for name, value in mapping.items():
+        if isinstance(value, Mapping):
+            yield from flatten_sections(value, sections + (name,))
+        else:
+            yield sections + (name,), value
+
+
+def find_sections(mapping, sections=()):
+    """Get names of nested sections.
+
+    :param mapping: a mapping of names of options and sections to
+        values and mappings representing the sections.
+    :param sections: names of sections containing the mapping.
+    :returns: a generator yielding tuples of names of the sections and
+        their parent sections.
+    """
+    for name, value in mapping.items():
+        if isinstance(value, Mapping):
+            yield sections + (name,)
+            yield from find_sections(value, sections + (name,))
+
+
+def _unquote(text):
+    if len(text) > 1 and text[0] == text[-1] and text[0] in '"\'':
+        return text[1:-1]
+    return text
+
+
+def _locate_value(line, start):
+    """Find the end of a single-line value of an option.
+
+    :param line: the line containing the option.
+    :param start: an offset of the value in the line.
+    :returns: the offset of the end of the value, or None if the value
+        is a list or a multi-line value.
+    """
+    if line.startswith(_TRIPLE_QUOTES, start):
+        return None
+    if line[start:start + 1] in ('"', "'"):
+        end = line.find(line[start], start + 1)
+        if end < 0:
+            return None
+        end += 1
+        rest = line[end:].strip()
+        if rest and not rest.startswith('#'):
+            return None
+        return end
+    comment = line.find('#', start)
+    value = line[start:comment if comment >= 0 else len(line)].rstrip()
+    if ',' in value:
+        return None
+    return start + len(value)
+
+
+def index_lines(lines):
+    """Find values of options in lines of an INI file.
+
+    :param lines: an iterable of the lines.
+    :returns: an instance of FileIndex.
+    """
+    locations = {}
+    all_sections = set()
+    sections = ()
+    closing_quotes = None
+    for number, line in enumerate(lines):
+        if closing_quotes is not None:
+            if closing_quotes in line:
+                closing_quotes = None
+            continue
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        match = _SECTION_PATTERN.match(line)
+        if match is not None:
+            depth = len(match.group(1))
+            sections = sections[:depth - 1] + (_unquote(match.group(2)),)
+            all_sections.add(sections)
+            continue
+        match = _OPTION_PATTERN.match(line)
+        if match is None:
+            continue
+        key = sections + (_unquote(match.group(1)),)
+        start = match.end()
+        end = _locate_value(line, start)
+        if end is None:
+            locations[key] = None
+            for quotes in _TRIPLE_QUOTES:
+                if (line.startswith(quotes, start) and
+                        quotes not in line[start + 3:]):
+                    closing_quotes = quotes
+            continue
+        locations[key] = ValueLocation(
+            number, start, end, _unquote(line[start:end])
+        )
+    return FileIndex(locations, all_sections)
+
+
+def format_value(value):
+    """Get a representation of a value in an INI file.
+
+    :param value: the value.
+    :returns: the value, quoted if necessary.
+    :raises UnsupportedEditError: if the value is a list, spans several
+        lines or can't be quoted.
+    """
+    if isinstance(value, (list, tuple, Mapping)):
+        raise UnsupportedEditError('Only single values can be set in place.')
+    text = str(value)
+    if '\n' in text or '\r' in text:
+        raise UnsupportedEditError('Multi-line values can\'t be set in place.')
+    if text and text == text.strip() and not any(c in text for c in '#,"\''):
+        return text
+    for quote in '"\'':
+        if quote not in text:
+            return quote + text + quote
+    raise UnsupportedEditError('The value can\'t be quoted: {}'.format(text))
+
+
+@contextmanager
+def replace_atomically(path):
+    """Write a file replacing another one once it's complete.
+
+    The new file is created by files.create_replacement, so it keeps
+    the permissions of the replaced file and a symbolic link to it is
+    preserved. It's renamed over the replaced file only if the block
+    exits without an error. Otherwise, it's removed.
+
+    :param path: a path to the replaced file.
+    :returns: a context manager providing a binary file object for
+        the new file.
+    :raises OSError: if the file can't be created or renamed.
+    """
+    fd, tmp_path, path = create_replacement(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class IniFileEditor:
+    """An object changing values of options in an INI file in place.
+
+    The file is indexed when it is first edited, and indexed again only
+    if it is changed by another program.
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        """Create a new instance.
+
+        :param path: a path to the file.
+        :param encoding: an encoding of the file.
+        """
+        self._path = str(path)
+        self._encoding = encoding
+        self._index = None
+        self._stamp = None
+
+    def _get_stamp(self):
+        info = os.stat(self._path)
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    def get_index(self):
+        """Get positions of values and names of sections in the file.
+
+        The file is indexed again only if it changed since it was last
+        indexed or written.
+
+        :returns: an instance of FileIndex.
+        :raises OSError: if the file can't be read.
+        """
+        stamp = self._get_stamp()
+        if stamp != self._stamp:
+            with open(self._path, encoding=self._encoding, newline='') as f:
+                self._index = index_lines(f)
+            self._stamp = stamp
+        return self._index
+
+    def update(self, values):
+        """Change values of options, rewriting only the changed values.
+
+        :param values: a mapping of tuples of names of sections and of
+            an option to new values of the options.
+        :returns: True if the file was changed, False if it already
+            contained the values.
+        :raises UnsupportedEditError: if an option doesn't exist in the
+            file, or if its old or new value isn't a single-line value.
+        :raises OSError: if the file can't be read or replaced.
+        """
+        locations = self.get_index().locations
+        changes = {}
+        for key, value in values.items():
+            location = locations.get(tuple(key))
+            if location is None:
+                raise UnsupportedEditError(
+                    'The option {} can\'t be changed in place.'.format(
+                        ':'.join(key)
+                    )
+                )
+            text = format_value(value)
+            if location.value != str(value):
+                changes[location.line] = tuple(key), location, text, value
+        if not changes:
+            return False
+
+        with open(self._path, encoding=self._encoding, newline='') as \
+                source, replace_atomically(self._path) as target:
+            for number, line in enumerate(source):
+                change = changes.get(number)
+                if change is not None:
+                    _, location, text, _ = change
+                    line = (
+                        line[:location.start] + text + line[location.end:]
+                    )
+                target.write(line.encode(self._encoding))
+
+        for key, location, text, value in changes.values():
+            locations[key] = location._replace(
+                end=location.start + len(text), value=str(value)
+            )
+        self._stamp = self._get_stamp()
+        return True
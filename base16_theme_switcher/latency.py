@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""A persistent history of durations of using theme appliers."""
+
+import json
+import logging
+import math
+import os
+import tempfile
+from pathlib import Path
+
+DEFAULT_HISTORY_PATH = '~/.cache/base16-theme-switcher/latency.json'
+"""A default path to a file storing the latency history."""
+
+DEFAULT_CAPACITY = 100
+"""The default number of the most recent durations kept per applier."""
+
+REPORTED_PERCENTILES = 50, 95, 99
+"""Percentiles of durations shown in a summary of the history."""
+
+
+def percentile(samples, q):
+    """Get a percentile of the samples, using the nearest-rank method.
+
+    :param samples: a non-empty sequence of numbers.
+    :param q: the percentile to be calculated, between 0 and 100.
+    :returns: the smallest of the samples such that at least q percent
+        of the samples are less than or equal to it.
+    """
+    ordered = sorted(samples)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class LatencyStore:
+    """A ring buffer of recent durations of each theme applier.
+
+    The durations are kept in a small JSON file. New samples are
+    buffered in memory until the store is saved, and saving merges them
+    with the current content of the file, so that processes applying
+    themes at the same time (like a background worker and its parent)
+    don't lose each other's measurements.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        """Create a new store.
+
+        :param path: a path of the file storing the history. A user
+            directory in the path is expanded.
+        :param capacity: the maximum number of durations kept for each
+            applier. Older ones are discarded first.
+        """
+        self._path = Path(path).expanduser()
+        self._capacity = capacity
+        self._samples = None
+        self._pending = {}
+        self._logger = logging.getLogger(__name__)
+
+    def _read(self):
+        try:
+            with self._path.open(encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self._logger.warning(
+                'Ignoring unreadable latency history %s: %s', self._path, e
+            )
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return data
+
+    def record(self, name, duration):
+        """Add a duration of using a theme applier to the store.
+
+        :param name: a name of the theme applier.
+        :param duration: the duration, in seconds.
+        """
+        duration_ms = round(duration * 1000, 3)
+        self._pending.setdefault(name, []).append(duration_ms)
+        if self._samples is not None:
+            self._append(self._samples, name, [duration_ms])
+
+    def _append(self, samples, name, durations):
+        history = samples.get(name, []) + durations
+        samples[name] = history[-self._capacity:]
+
+    def _get_samples(self):
+        if self._samples is None:
+            self._samples = self._read()
+            for n, durations in self._pending.items():
+                self._append(self._samples, n, durations)
+        return self._samples
+
+    def samples(self, name):
+        """Get the recent durations of using a theme applier.
+
+        :param name: a name of the theme applier.
+        :returns: a list of durations in milliseconds, from the oldest
+            to the most recent one.
+        """
+        return list(self._get_samples().get(name, []))
+
+    def percentile(self, name, q):
+        """Get a percentile of recent durations of a theme applier.
+
+        :param name: a name of the theme applier.
+        :param q: the percentile to be calculated, between 0 and 100.
+        :returns: the percentile in milliseconds, or None if there are
+            no durations recorded for the theme applier.
+        """
+        samples = self.samples(name)
+        return percentile(samples, q) if samples else None
+
+    def summary(self):
+        """Get a summary of durations of all theme appliers.
+
+        :returns: a map of names of theme appliers to tuples containing
+            the number of recorded durations followed by the values of
+            REPORTED_PERCENTILES, in milliseconds.
+        """
+        return {
+            n: (len(s),) + tuple(
+                percentile(s, q) for q in REPORTED_PERCENTILES
+            )
+            for n, s in sorted(self._get_samples().items()) if s
+        }
+
+    def save(self):
+        """Save the recorded durations to the file.
+
+        The file is replaced atomically. Errors are logged instead of
+        being raised, because the history is not essential for setting
+        themes.
+        """
+        if not self._pending:
+            return
+        samples = self._read()
+        for n, durations in self._pending.items():
+            self._append(samples, n, durations)
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=str(self._path.parent), prefix='.latency-'
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(samples, f)
+            os.replace(tmp_path, str(self._path))
+        except OSError as e:
+            self._logger.warning(
+                'Couldn\'t save latency history to %s: %s', self._path, e
+            )
+            return
+        self._samples = samples
+        self._pending = {}
+
+
+def format_summary(summary):
+    """Format a summary of durations of theme appliers as a table.
+
+    :param summary: a summary, as returned by LatencyStore.summary.
+    :returns: a string containing the table.
+    """
+    header = ('applier', 'runs') + tuple(
+        'p{} [ms]'.format(q) for q in REPORTED_PERCENTILES
+    )
+    rows = [header] + [
+        (n, str(s[0])) + tuple('{:.1f}'.format(v) for v in s[1:])
+        for n, s in summary.items()
+    ]
+    name_width = max(len(r[0]) for r in rows)
+    return '\n'.join(
+        r[0].ljust(name_width) + ''.join(c.rjust(10) for c in r[1:])
+        for r in rows
+    )
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Serializing theme switches made by concurrent processes.
+
+A switch is made only by a process holding an advisory lock. Other
+processes record their requests in a pending request file and exit.
+The file holds only the newest request, so after finishing its own
+switch, the lock holder makes at most one more, no matter how many
+requests were made in the meantime.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_LOCK_PATH = '~/.cache/base16-theme-switcher/switch.lock'
+"""A default path to the lock file of theme switches."""
+
+
+class SwitchCoordinator:
+    """An object coordinating theme switches between processes."""
+
+    def __init__(self, lock_path):
+        """Create a new instance.
+
+        :param lock_path: a path to the lock file. The pending request
+            file is stored next to it. A user directory in the path is
+            expanded.
+        """
+        self._lock_path = Path(lock_path).expanduser()
+        self._pending_path = self._lock_path.with_name(
+            self._lock_path.name + '.pending'
+        )
+        self._logger = logging.getLogger(__name__)
+
+    def _try_lock(self, wait=False):
+        """Acquire the lock.
+
+        :param wait: True if the lock is to be waited for.
+        :returns: a descriptor of the locked file, or None if the lock
+            is held by another process and it isn't waited for.
+        :raises OSError: if the lock file can't be created or opened.
+        """
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self._lock_path), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _record(self, request, requested_at):
+        """Replace the pending request atomically.
+
+        :param request: a JSON-serializable request.
+        :param requested_at: the time of the request, in nanoseconds.
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            dir=str(self._pending_path.parent), prefix='.switch-'
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'request': request, 'time': requested_at}, f)
+        os.replace(tmp_path, str(self._pending_path))
+
+    def _take(self, validate=None):
+        """Remove the pending request and get it.
+
+        The file is renamed before being read, so that a request
+        recorded in the meantime is not lost.
+
+        :param validate: a callable returning True for a request that
+            can be handled, or None if all requests can be handled.
+        :returns: a tuple containing the request and its time, or None
+            if there is no valid pending request.
+        """
+        taken_path = str(self._pending_path) + '.taken'
+        try:
+            os.replace(str(self._pending_path), taken_path)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(taken_path, encoding='utf-8') as f:
+                data = json.load(f)
+            request, requested_at = data['request'], data['time']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._logger.warning('Ignoring invalid pending request: %s', e)
+            return None
+        finally:
+            os.unlink(taken_path)
+        if validate is not None and not validate(request):
+            self._logger.warning(
+                'Ignoring invalid pending request: %r', request
+            )
+            return None
+        return request, requested_at
+
+    def submit(self, request, handler, validate=None):
+        """Handle a request, or leave it to a process already switching.
+
+        If the lock is free, the handler is called with the request and
+        then with the newest request recorded by other processes in the
+        meantime, if any. Otherwise, the request is recorded for the
+        lock holder and this method returns immediately.
+
+        Requests recorded before the last handled one are discarded,
+        and so are recorded requests rejected by the validator.
+
+        If the lock file can't be created, the request is handled
+        without coordination.
+
+        :param request: a JSON-serializable request.
+        :param handler: a callable handling a request.
+        :param validate: a callable returning True for a recorded
+            request that can be handled, or None if all of them can be.
+        :returns: True if this process handled any request, or False
+            if the request was left to another one.
+        """
+        requested_at = time.time_ns()
+        try:
+            fd = self._try_lock()
+        except OSError as e:
+            self._logger.warning(
+                'Switching themes without coordination: %s', e
+            )
+            handler(request)
+            return True
+        if fd is None:
+            self._record(request, requested_at)
+            # The holder might have released the lock before the request
+            # was recorded, so it's checked again.
+            fd = self._try_lock()
+            if fd is None:
+                return False
+            pending = self._take(validate)
+            if pending is None:
+                self._unlock(fd)
+                return False
+            request, requested_at = pending
+        return self._handle(fd, request, requested_at, handler, validate)
+
+    def run_exclusively(self, action, handler, validate=None):
+        """Call an action while no process is switching themes.
+
+        The lock is waited for, and the action is called only if no
+        request was recorded by then, because such a request supersedes
+        the work of the action. Recorded requests, including those made
+        while the action runs, are then handled as in submit.
+
+        If the lock file can't be created, the action is called without
+        coordination.
+
+        :param action: a callable taking no arguments.
+        :param handler: a callable handling a request.
+        :param validate: a callable returning True for a recorded
+            request that can be handled, or None if all of them can be.
+        :returns: True if the action was called, False if it was
+            superseded by a recorded request.
+        """
+        try:
+            fd = self._try_lock(wait=True)
+        except OSError as e:
+            self._logger.warning(
+                'Switching themes without coordination: %s', e
+            )
+            action()
+            return True
+        requested_at = time.time_ns()
+        try:
+            pending = self._take(validate)
+            if pending is None:
+                action()
+        except BaseException:
+            self._unlock(fd)
+            raise
+        request, requested_at = pending or (None, requested_at)
+        self._handle(fd, request, requested_at, handler, validate)
+        return pending is None
+
+    def _handle(self, fd, request, requested_at, handler, validate):
+        """Handle requests while holding the lock, then release it.
+
+        :param fd: a descriptor of the locked file.
+        :param request: a request to be handled first, or None.
+        :param requested_at: the time of the request, in nanoseconds.
+            Older recorded requests are discarded.
+        :param handler: a callable handling a request.
+        :param validate: a callable validating recorded requests, or
+            None.
+        :returns: True if any request was handled.
+        """
+        handled = False
+        while fd is not None:
+            try:
+                last_handled_at = requested_at
+                while request is not None:
+                    handler(request)
+                    handled = True
+                    last_handled_at = requested_at
+                    request = None
+                    pending = self._take(validate)
+                    if pending is not None and pending[1] > last_handled_at:
+                        request, requested_at = pending
+            finally:
+                self._unlock(fd)
+
+            # A request recorded after the last check but before the
+            # lock was released would be left unhandled otherwise.
+            if not self._pending_path.exists():
+                break
+            fd = self._try_lock()
+            if fd is not None:
+                pending = self._take(validate)
+                if pending is not None and pending[1] > last_handled_at:
+                    request, requested_at = pending
+        return handled
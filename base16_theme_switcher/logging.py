@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging
-from logging import handlers
 import subprocess
+from logging import handlers
 
+from . import commands, dbus
 from .config_structures import ConfiguredAbsolutePath
 
 
@@ -13,7 +14,9 @@ class NotifySendHandler(logging.Handler):
         """Show the message in the record.
 
         The message is shown using notify-send command provided by
-        libnotify package.
+        libnotify package. If the command can't be executed, the error
+        is passed to handleError instead of being raised to the code
+        logging the message.
 
         :param record: a log record containing a message to be displayed.
         """
@@ -21,11 +24,77 @@ class NotifySendHandler(logging.Handler):
             'normal' if record.levelno <= logging.INFO else 'critical'
         )
 
-        subprocess.call(
-            'notify-send -u "{}" "Base16 Theme Switcher" "{}"'
-            ''.format(urgency_level, record.getMessage()),
-            shell=True
-        )
+        try:
+            commands.run([
+                'notify-send', '-u', urgency_level,
+                'Base16 Theme Switcher', record.getMessage()
+            ])
+        except (OSError, subprocess.SubprocessError):
+            self.handleError(record)
+
+
+class DBusNotificationHandler(NotifySendHandler):
+    """A handler sending desktop notifications directly over D-Bus.
+
+    A single connection to the session bus is opened for the first
+    message and kept for the following ones. If the bus or the
+    notification service is unavailable, messages are shown using
+    notify-send instead.
+    """
+
+    def __init__(self, level=logging.NOTSET, address=None):
+        """Create a new instance.
+
+        :param level: the level of the handler.
+        :param address: an address of the bus, or None for the session
+            bus.
+        """
+        super().__init__(level)
+        self._address = address
+        self._connection = None
+        self._unavailable = False
+
+    def emit(self, record):
+        """Show the message in the record.
+
+        Errors that aren't caused by the bus being unavailable, and
+        errors of the fallback, are passed to handleError instead of
+        being raised to the code logging the message.
+
+        :param record: a log record containing a message to be displayed.
+        """
+        if not self._unavailable:
+            try:
+                if self._connection is None:
+                    self._connection = dbus.Connection.open(self._address)
+                dbus.notify(
+                    self._connection,
+                    'base16-theme-switcher',
+                    'Base16 Theme Switcher',
+                    record.getMessage(),
+                    urgency=1 if record.levelno <= logging.INFO else 2
+                )
+                return
+            except (OSError, dbus.DBusError):
+                self._unavailable = True
+                self._close_connection()
+            except Exception:
+                self.handleError(record)
+                return
+        super().emit(record)
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+            self._connection = None
+
+    def close(self):
+        """Close the connection to the bus and the handler."""
+        self._close_connection()
+        super().close()
 
 
 def configure_root_logger(log_path, verbose=False):
@@ -58,7 +127,7 @@ def configure_b16ts_root_logger(log_path, verbose):
     :param verbose: set the level of the logger to logging.DEBUG if True,
         otherwise set the level to logging.ERROR
     """
-    path = ConfiguredAbsolutePath.from_path_str(log_path)
+    path = ConfiguredAbsolutePath.from_(log_path)
     configure_root_logger(path, verbose)
 
 
@@ -74,7 +143,7 @@ def get_info_logger(name, use_gui):
     logger.setLevel(logging.INFO)
 
     if use_gui:
-        desktop_notification_handler = NotifySendHandler(logging.INFO)
+        desktop_notification_handler = DBusNotificationHandler(logging.INFO)
         logger.addHandler(desktop_notification_handler)
 
     return logger
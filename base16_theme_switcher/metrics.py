@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Metrics of the application, exported for the Prometheus textfile
+collector of node_exporter.
+
+Metrics are collected in memory during a run of the application. If
+a metrics file is configured, they are added to the totals of previous
+runs, kept in a JSON state file next to it, and the metrics file is
+replaced atomically, so the collector never reads a partial file.
+"""
+
+import fcntl
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf
+)
+"""Upper bounds of histogram buckets, in seconds."""
+
+METRICS = {
+    'b16ts_runs_total': (
+        'counter', 'Runs of the application, by command.'
+    ),
+    'b16ts_switches_total': (
+        'counter', 'Themes set successfully.'
+    ),
+    'b16ts_failures_total': (
+        'counter', 'Failed runs, by the class of the exception.'
+    ),
+    'b16ts_cache_requests_total': (
+        'counter', 'Cache lookups, by cache and result.'
+    ),
+    'b16ts_run_duration_seconds': (
+        'histogram', 'End-to-end durations of runs, by command.'
+    ),
+    'b16ts_phase_duration_seconds': (
+        'histogram', 'Durations of phases of runs, by phase.'
+    ),
+    'b16ts_applier_duration_seconds': (
+        'histogram', 'Durations of using theme appliers, by task name.'
+    ),
+    'b16ts_themes': (
+        'gauge', 'The number of themes found by the last discovery.'
+    ),
+    'b16ts_last_run_timestamp_seconds': (
+        'gauge', 'The time at which the last run finished.'
+    ),
+}
+"""Types and descriptions of all metrics, by their names."""
+
+
+def _get_key(name, labels):
+    """Get a metric sample name with labels, in exposition format.
+
+    :param name: a name of the metric.
+    :param labels: a mapping of names of labels to their values.
+    :returns: the sample name.
+    """
+    if not labels:
+        return name
+    return '{}{{{}}}'.format(name, ','.join(
+        '{}="{}"'.format(
+            k, str(v).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for k, v in sorted(labels.items())
+    ))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Metrics collected during a run of the application.
+
+    All methods may be called from any thread.
+    """
+
+    def __init__(self):
+        """Create a new, empty collection."""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def increment(self, name, amount=1, **labels):
+        """Increase a counter.
+
+        :param name: a name of the counter.
+        :param amount: a non-negative number added to the counter.
+        :param labels: labels of the counter.
+        """
+        key = _get_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Set a value of a gauge.
+
+        :param name: a name of the gauge.
+        :param value: the value.
+        :param labels: labels of the gauge.
+        """
+        with self._lock:
+            self._gauges[_get_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        """Add an observation to a histogram.
+
+        :param name: a name of the histogram.
+        :param value: the observed value.
+        :param labels: labels of the histogram.
+        """
+        key = _get_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0}
+            )
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the duration of a block of code in a histogram.
+
+        The duration is observed even if the block raises an error.
+
+        :param name: a name of the histogram.
+        :param labels: labels of the histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_to(self, state):
+        """Add the collected metrics to the totals of previous runs.
+
+        :param state: a mapping of totals, as returned by a previous
+            call. It isn't modified.
+        :returns: a new mapping of totals.
+        """
+        counters = dict(state.get('counters', {}))
+        histograms = {
+            k: {'buckets': list(v['buckets']), 'sum': v['sum']}
+            for k, v in state.get('histograms', {}).items()
+            if len(v.get('buckets', ())) == len(DEFAULT_BUCKETS)
+        }
+        gauges = dict(state.get('gauges', {}))
+        with self._lock:
+            for key, value in self._counters.items():
+                counters[key] = counters.get(key, 0) + value
+            for key, value in self._histograms.items():
+                total = histograms.setdefault(
+                    key, {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0}
+                )
+                total['buckets'] = [
+                    a + b for a, b in zip(total['buckets'], value['buckets'])
+                ]
+                total['sum'] += value['sum']
+            gauges.update(self._gauges)
+        return {
+            'counters': counters, 'histograms': histograms, 'gauges': gauges
+        }
+
+
+def render(state):
+    """Render metrics in the Prometheus text exposition format.
+
+    :param state: a mapping of totals of metrics.
+    :returns: the text.
+    """
+    samples = {}
+    for kind in 'counters', 'gauges':
+        for key, value in state.get(kind, {}).items():
+            samples.setdefault(key.partition('{')[0], []).append(
+                '{} {}\n'.format(key, _format_value(value))
+            )
+    for key, histogram in state.get('histograms', {}).items():
+        name, _, labels = key.partition('{')
+        labels = labels.rstrip('}')
+        lines = samples.setdefault(name, [])
+        for bound, count in zip(DEFAULT_BUCKETS, histogram['buckets']):
+            bucket_labels = 'le="{}"'.format(_format_value(bound))
+            if labels:
+                bucket_labels = labels + ',' + bucket_labels
+            lines.append('{}_bucket{{{}}} {}\n'.format(
+                name, bucket_labels, count
+            ))
+        suffix = '{' + labels + '}' if labels else ''
+        lines.append('{}_sum{} {}\n'.format(
+            name, suffix, _format_value(histogram['sum'])
+        ))
+        lines.append('{}_count{} {}\n'.format(
+            name, suffix, histogram['buckets'][-1]
+        ))
+
+    chunks = []
+    for name in sorted(samples):
+        kind, description = METRICS.get(name, ('untyped', name))
+        chunks.append('# HELP {} {}\n# TYPE {} {}\n'.format(
+            name, description, name, kind
+        ))
+        chunks.extend(sorted(samples[name]))
+    return ''.join(chunks)
+
+
+def _write_atomically(path, text):
+    fd, tmp_path = tempfile.mkstemp(
+        dir=str(path.parent), prefix='.' + path.name + '-'
+    )
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _load_state(state_path):
+    logger = logging.getLogger(__name__)
+    try:
+        with state_path.open(encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning('Ignoring invalid metrics state %s: %s', state_path, e)
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save(metrics, path):
+    """Add metrics to totals of previous runs and write them.
+
+    The totals are kept in a JSON file with the same name as the
+    metrics file, with .json appended. They are read, updated and
+    written while holding a lock on a file with .lock appended to the
+    name, so concurrent runs don't lose each other's metrics. Errors
+    are logged instead of being raised, because metrics aren't
+    necessary for the application.
+
+    :param metrics: an instance of Metrics.
+    :param path: a path to the metrics file, usually with .prom
+        extension. A user directory in the path is expanded.
+    """
+    path = Path(path).expanduser()
+    state_path = path.with_name(path.name + '.json')
+    lock_path = path.with_name(path.name + '.lock')
+
+    metrics.set('b16ts_last_run_timestamp_seconds', time.time())
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_path.open('a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = metrics.add_to(_load_state(state_path))
+            _write_atomically(state_path, json.dumps(state))
+            _write_atomically(path, render(state))
+    except OSError as e:
+        logging.getLogger(__name__).warning(
+            'Couldn\'t save metrics to %s: %s', path, e
+        )
+
+
+collected = Metrics()
+"""Metrics collected by the current process."""
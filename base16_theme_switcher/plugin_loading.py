@@ -1,16 +1,132 @@
 # -*- coding: utf-8 -*-
-"""Components of plugin discovery and loading system."""
+"""Components of plugin discovery and loading system.
 
+A plugin module may declare roles it provides to the application in
+a module-level PLUGIN_ROLES tuple of string literals, for example:
+
+    PLUGIN_ROLES = ('prompt',)
+
+Such a declaration is read from the source of the module without
+importing it, and the module is imported and applied only when one of
+its roles is used for the first time. Modules without the declaration
+are imported and applied at startup.
+"""
+
+import ast
 import importlib
+import importlib.util
 import logging
 import pkgutil
 
 from .config_structures import ConfigValueError, SetupError
 
+PLUGIN_ROLES_NAME = 'PLUGIN_ROLES'
+"""A name of a module-level variable declaring roles of a plugin."""
+
+
+def read_plugin_roles(module_name):
+    """Read roles declared by a plugin module without importing it.
+
+    :param module_name: a name of the module.
+    :returns: a tuple of names of the declared roles, or None if the
+        module doesn't declare them or its source can't be read.
+    """
+    try:
+        spec = importlib.util.find_spec(module_name)
+        if spec is None or spec.loader is None:
+            return None
+        source = spec.loader.get_source(module_name)
+        if source is None:
+            return None
+        tree = ast.parse(source)
+    except (ImportError, SyntaxError, ValueError):
+        return None
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        if not any(
+                isinstance(t, ast.Name) and t.id == PLUGIN_ROLES_NAME
+                for t in node.targets
+        ):
+            continue
+        try:
+            roles = ast.literal_eval(node.value)
+        except ValueError:
+            return None
+        if isinstance(roles, str):
+            roles = (roles,)
+        return tuple(roles)
+    return None
+
+
+class LazyPlugin:
+    """A plugin whose module is imported when it is first activated.
+
+    Instead of applying the plugin module, apply_to registers the
+    plugin with the plugin API implementation, by passing it to its
+    add_lazy_plugin method. The implementation is responsible for
+    activating the plugin when one of its roles is first used.
+    A plugin may be registered with several implementations, for
+    example after the configuration is reloaded.
+    """
+
+    def __init__(self, name, module_name, roles):
+        """Create a new instance.
+
+        :param name: a name of the plugin.
+        :param module_name: a name of the plugin module.
+        :param roles: a sequence of names of roles declared by the
+            plugin.
+        """
+        self.name = name
+        self.module_name = module_name
+        self.roles = tuple(roles)
+
+    def apply_to(self, plugin_api_impl):
+        """Register the plugin for lazy activation.
+
+        :param plugin_api_impl: an object providing an application
+            specific part of plugin system API.
+        :raises SetupError: if the object doesn't support the declared
+            roles of the plugin.
+        """
+        plugin_api_impl.add_lazy_plugin(self)
+
+    def activate(self, plugin_api_impl):
+        """Import the plugin module and apply it.
+
+        The plugin API implementation is responsible for activating
+        the plugin only once.
+
+        :param plugin_api_impl: an object to which the plugin module is
+            applied.
+        :raises SetupError: if the module can't be imported or if there
+            was an error with setting up the plugin.
+        """
+        logger = logging.getLogger(__name__)
+        logger.info('Activating "%s" plugin...', self.name)
+        try:
+            module = importlib.import_module(self.module_name)
+        except ImportError as e:
+            raise SetupError(
+                'Couldn\'t import "{}" plugin.'.format(self.name)
+            ) from e
+        try:
+            module.apply_to(plugin_api_impl)
+        except SetupError as e:
+            raise SetupError(
+                'Error while setting up "{}" plugin.'.format(self.name)
+            ) from e
+        logger.info('The "%s" plugin was activated.', self.name)
+
 
 def get_modules_by_name_prefix(prefix):
     """Get modules whose name starts with the prefix.
 
+    Modules declaring their roles are not imported. Instances of
+    LazyPlugin are returned for them instead.
+
     :param prefix: a prefix used to select modules to be returned.
     :returns: a map of the modules to their names, with the prefix
         stripped.
@@ -21,9 +137,18 @@ def get_modules_by_name_prefix(prefix):
     for _, module_name, _ in pkgutil.iter_modules():
         if not module_name.startswith(prefix):
             continue
+        name = module_name[len(prefix):]
+        roles = read_plugin_roles(module_name)
+        if roles is not None:
+            name_module_map[name] = LazyPlugin(name, module_name, roles)
+            logger.info(
+                'Found "%s" module providing: %s.',
+                module_name, ', '.join(roles)
+            )
+            continue
         try:
             module = importlib.import_module(module_name)
-            name_module_map[module_name[len(prefix):]] = module
+            name_module_map[name] = module
             logger.info('Successfully imported "%s" module.', module_name)
         except ImportError:
             logger.exception(
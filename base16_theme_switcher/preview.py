@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Previewing themes while a user browses them in a prompt.
+
+Themes are applied by a background thread, so a prompt reporting its
+selection is never blocked. Selections are debounced: a theme is
+applied only after the selection stays on it for a short delay, so
+quickly moving through a long list applies just the theme the
+selection stops at.
+"""
+
+import logging
+import threading
+import time
+
+DEFAULT_PREVIEW_DELAY = 0.03
+"""The default time a selection has to stay on a theme before it is
+previewed, in seconds."""
+
+
+class ThemePreview:
+    """A previewer of themes selected in a prompt."""
+
+    def __init__(self, apply, original_name, delay=DEFAULT_PREVIEW_DELAY):
+        """Create a new instance and start previewing.
+
+        :param apply: a callable applying a theme with a given name
+            for preview purposes.
+        :param original_name: a name of the theme that was set before
+            previewing, restored on cancel.
+        :param delay: the time a selection has to stay on a theme
+            before it is applied, in seconds.
+        """
+        self._apply = apply
+        self._original_name = original_name
+        self._delay = delay
+        self._condition = threading.Condition()
+        self._selected = None
+        self._selected_at = 0
+        self._applied = None
+        self._closed = False
+        self._logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def select(self, theme_name):
+        """Report a theme selected in a prompt.
+
+        :param theme_name: a name of the theme.
+        """
+        with self._condition:
+            self._selected = theme_name
+            self._selected_at = time.monotonic()
+            self._condition.notify()
+
+    def _wait_for_selection(self):
+        """Wait until a selected theme is to be applied.
+
+        :returns: a name of the theme, or None if the preview was
+            closed.
+        """
+        with self._condition:
+            while not self._closed:
+                if self._selected in (None, self._applied):
+                    self._condition.wait()
+                    continue
+                remaining = self._selected_at + self._delay - time.monotonic()
+                if remaining <= 0:
+                    return self._selected
+                self._condition.wait(remaining)
+        return None
+
+    def _run(self):
+        while True:
+            theme_name = self._wait_for_selection()
+            if theme_name is None:
+                return
+            self._preview(theme_name)
+
+    def _preview(self, theme_name):
+        try:
+            self._apply(theme_name)
+        except Exception as e:
+            self._logger.warning(
+                'Couldn\'t preview the theme "%s": %s', theme_name, e
+            )
+        with self._condition:
+            self._applied = theme_name
+
+    def close(self):
+        """Stop previewing, keeping the last previewed theme applied.
+
+        Selections that weren't applied yet are dropped. A theme being
+        applied when the method is called is applied completely before
+        it returns.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def cancel(self):
+        """Stop previewing and restore the original theme."""
+        self.close()
+        if self._applied not in (None, self._original_name):
+            self._preview(self._original_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.cancel()
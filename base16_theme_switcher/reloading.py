@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Rebuilding a theme switcher after its configuration file changes.
+
+A long-running process may keep a ConfigReloader and ask it for a new
+theme switcher whenever the configuration file is modified. Only the
+parts of the application affected by the change are set up again:
+themes are searched for only if their directory changed, and plugins
+are applied again only if their configuration sections changed. The
+components provided by other plugins are reused as they are.
+"""
+
+import logging
+import os
+from collections import namedtuple
+
+from .app import ThemeSwitcherBuilder, find_themes
+from .config_structures import ConfiguredAbsolutePath, YamlConfigPath
+from .plugin_loading import apply_configured_plugins
+
+THEME_OPTIONS = (
+    'theme-search-dir-path', 'theme-search-ignore', 'scheme-cache-path'
+)
+"""Options whose change requires searching for themes again."""
+
+
+class ConfigDiff(namedtuple('ConfigDiff', 'options plugins')):
+    """Differences between two versions of the configuration.
+
+    :ivar options: a set of names of top-level options and sections
+        that were added, removed or changed.
+    :ivar plugins: a set of names of plugins whose sections were added,
+        removed or changed.
+    """
+
+    def requires_theme_search(self):
+        """Check if themes have to be searched for again.
+
+        :returns: True if any option concerning themes changed.
+        """
+        return not self.options.isdisjoint(THEME_OPTIONS)
+
+
+def _get_changed_keys(old, new):
+    return {k for k in set(old) | set(new) if old.get(k) != new.get(k)}
+
+
+def diff_configs(old, new):
+    """Compare two versions of the configuration.
+
+    :param old: the previous configuration mapping.
+    :param new: the current configuration mapping.
+    :returns: an instance of ConfigDiff.
+    """
+    return ConfigDiff(
+        _get_changed_keys(old, new),
+        _get_changed_keys(old.get('plugins', {}), new.get('plugins', {}))
+    )
+
+
+class PluginRecorder:
+    """A plugin API implementation recording calls made by a plugin.
+
+    All calls are forwarded to a builder. The recorded calls can be
+    replayed on another builder later, without applying the plugin
+    again, so the same components are reused.
+    """
+
+    def __init__(self, builder, name):
+        """Create a new instance.
+
+        :param builder: a builder to which calls are forwarded.
+        :param name: a name of the recorded plugin.
+        """
+        self._builder = builder
+        self._name = name
+        self._calls = []
+
+    @property
+    def plugins_to_activate(self):
+        """Get a list containing the name of the recorded plugin."""
+        return [self._name]
+
+    @property
+    def config(self):
+        """Configuration mapping to be used by theme switcher."""
+        return self._builder.config
+
+    def _record(self, call):
+        call(self._builder)
+        self._calls.append(call)
+
+    def add_theme_applier(self, *args, **kwargs):
+        """Add a theme applier to the builder and record the call."""
+        self._record(lambda b: b.add_theme_applier(*args, **kwargs))
+
+    def add_lazy_plugin(self, plugin):
+        """Add a lazy plugin to the builder and record the call."""
+        self._record(lambda b: b.add_lazy_plugin(plugin))
+
+    @property
+    def prompt(self):
+        """Get theme prompt to be used by the theme switcher."""
+        return self._builder.prompt
+
+    @prompt.setter
+    def prompt(self, value):
+        """Set a prompt of the builder and record the call.
+
+        :param value: a callable to be used as the prompt.
+        """
+        self._record(lambda b: setattr(b, 'prompt', value))
+
+    def replay(self, builder):
+        """Make the recorded calls on another builder.
+
+        :param builder: the builder.
+        :returns: a new recorder for the builder, containing the same
+            calls.
+        """
+        recorder = PluginRecorder(builder, self._name)
+        for call in self._calls:
+            recorder._record(call)
+        return recorder
+
+
+class ConfigReloader:
+    """An object rebuilding a theme switcher when its config changes."""
+
+    def __init__(self, config_path, available_plugins):
+        """Create a new instance.
+
+        :param config_path: a path to the YAML configuration file.
+        :param available_plugins: a mapping of available plugins to
+            their names.
+        """
+        self._path = ConfiguredAbsolutePath.from_(config_path)
+        self._available_plugins = available_plugins
+        self._stamp = None
+        self._config = None
+        self._themes = None
+        self._recorders = {}
+        self._logger = logging.getLogger(__name__)
+
+    def _get_stamp(self):
+        try:
+            with self._path as path:
+                stat = os.stat(str(path))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def has_changed(self):
+        """Check if the configuration file changed since it was loaded.
+
+        :returns: True if it did, or if it wasn't loaded yet.
+        """
+        return self._config is None or self._get_stamp() != self._stamp
+
+    def load(self):
+        """Build a theme switcher from the current configuration.
+
+        :returns: the theme switcher.
+        :raises SetupError: if the configuration or a plugin is invalid.
+        """
+        stamp = self._get_stamp()
+        config = YamlConfigPath.get_config_mapping(str(self._path))
+        if self._config is None:
+            diff = None
+        else:
+            diff = diff_configs(self._config, config)
+            self._logger.info(
+                'Changed configuration options: %s.',
+                ', '.join(sorted(diff.options)) or 'none'
+            )
+
+        themes = self._themes
+        if diff is None or diff.requires_theme_search():
+            themes = find_themes(config)
+
+        builder = ThemeSwitcherBuilder(config, themes)
+        recorders = {}
+        for name in builder.plugins_to_activate:
+            previous = self._recorders.get(name)
+            if previous is not None and name not in diff.plugins:
+                self._logger.info('Reusing "%s" plugin.', name)
+                recorders[name] = previous.replay(builder)
+                continue
+            recorder = PluginRecorder(builder, name)
+            apply_configured_plugins(recorder, self._available_plugins)
+            recorders[name] = recorder
+        theme_switcher = builder.build()
+
+        self._stamp = stamp
+        self._config = config
+        self._themes = themes
+        self._recorders = recorders
+        return theme_switcher
+
+    def reload_if_changed(self):
+        """Rebuild the theme switcher if the configuration changed.
+
+        :returns: a new theme switcher, or None if the configuration
+            file didn't change.
+        :raises SetupError: if the configuration or a plugin is invalid.
+            In this case, the state of the previous configuration is
+            kept, and a later call retries loading the new one.
+        """
+        if not self.has_changed():
+            return None
+        return self.load()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Scheduling theme appliers according to their dependencies."""
+
+import heapq
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config_structures import SetupError
+
+
+class DependencyCycleError(SetupError):
+    """Theme appliers depend on each other in a cycle."""
+
+
+class ApplierTask(namedtuple('ApplierTask', 'name applier dependencies cost')):
+    """A theme applier registered for scheduling.
+
+    :ivar name: a unique name of the task, used by other tasks to
+        declare their dependencies.
+    :ivar applier: the theme applier.
+    :ivar dependencies: a tuple of names of tasks that must finish
+        before the applier is used.
+    :ivar cost: an estimated, relative duration of applying a theme.
+    """
+
+
+def is_two_phase(applier):
+    """Check if a theme applier prepares its changes before a switch.
+
+    :param applier: the theme applier.
+    :returns: True if the applier has a prepare method returning
+        changes to be committed or aborted later, False otherwise.
+    """
+    return any('prepare' in C.__dict__ for C in type(applier).__mro__)
+
+
+class ApplierScheduler:
+    """A directed acyclic graph of theme appliers.
+
+    Theme appliers whose dependencies are satisfied are used in
+    parallel, and if there are more of them than available workers, the
+    ones starting the longest (most costly) path through the graph are
+    started first.
+
+    Changes of two-phase theme appliers are prepared in parallel before
+    any applier is used, and such appliers are used by committing the
+    changes, so the visible part of a switch is short.
+    """
+
+    def __init__(self, tasks, max_workers=None):
+        """Create a new scheduler.
+
+        :param tasks: a sequence of applier tasks.
+        :param max_workers: the maximum number of theme appliers used
+            at the same time, or None for the default of
+            concurrent.futures.ThreadPoolExecutor.
+        :raises SetupError: if a task depends on a task that wasn't
+            registered or if two tasks share a name.
+        :raises DependencyCycleError: if tasks depend on each other in
+            a cycle.
+        """
+        self._tasks = {}
+        for t in tasks:
+            if t.name in self._tasks:
+                raise SetupError(
+                    'A theme applier named "{}" is already registered.'
+                    ''.format(t.name)
+                )
+            self._tasks[t.name] = t
+        self._dependents = {n: [] for n in self._tasks}
+        for t in self._tasks.values():
+            for d in t.dependencies:
+                if d not in self._tasks:
+                    raise SetupError(
+                        'The "{}" theme applier depends on an unknown '
+                        'theme applier: "{}".'.format(t.name, d)
+                    )
+                self._dependents[d].append(t.name)
+        self._order = self._sort_topologically()
+        self._positions = {n: i for i, n in enumerate(self._order)}
+        self._priorities = self._get_critical_path_costs()
+        self.max_workers = max_workers
+
+    def _sort_topologically(self):
+        in_degrees = {n: len(t.dependencies) for n, t in self._tasks.items()}
+        ready = [n for n, d in in_degrees.items() if not d]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for d in self._dependents[name]:
+                in_degrees[d] -= 1
+                if not in_degrees[d]:
+                    ready.append(d)
+        if len(order) != len(self._tasks):
+            cyclic = [n for n in self._tasks if n not in order]
+            raise DependencyCycleError(
+                'Theme appliers depend on each other in a cycle: {}.'
+                ''.format(', '.join(cyclic))
+            )
+        return order
+
+    def _get_critical_path_costs(self):
+        costs = {}
+        for name in reversed(self._order):
+            costs[name] = self._tasks[name].cost + max(
+                (costs[d] for d in self._dependents[name]), default=0
+            )
+        return costs
+
+    @property
+    def tasks(self):
+        """Get all tasks in an order satisfying their dependencies."""
+        return [self._tasks[n] for n in self._order]
+
+    @staticmethod
+    def _apply_timed(task, theme, on_applied, change=None, prepared_in=0):
+        start = time.perf_counter()
+        try:
+            if change is None:
+                task.applier.apply(theme)
+                return
+            try:
+                change.commit()
+            except BaseException:
+                change.abort()
+                raise
+        finally:
+            if on_applied is not None:
+                on_applied(
+                    task.name, time.perf_counter() - start + prepared_in
+                )
+
+    @staticmethod
+    def _prepare_timed(task, theme):
+        start = time.perf_counter()
+        change = task.applier.prepare(theme)
+        return change, time.perf_counter() - start
+
+    def _prepare(self, executor, theme, names):
+        """Prepare changes of two-phase theme appliers in parallel.
+
+        If any of the appliers fails, the prepared changes are aborted
+        and the error is re-raised.
+
+        :returns: a map of names of the tasks to tuples containing their
+            prepared changes and durations of preparing them.
+        """
+        futures = {
+            n: executor.submit(self._prepare_timed, self._tasks[n], theme)
+            for n in names
+        }
+        wait(futures.values())
+        prepared = {
+            n: f.result() for n, f in futures.items()
+            if f.exception() is None
+        }
+        for name, future in futures.items():
+            if future.exception() is not None:
+                for change, _ in prepared.values():
+                    change.abort()
+                raise future.exception()
+        return prepared
+
+    def run(self, theme, skip=(), on_applied=None):
+        """Apply a theme using all scheduled theme appliers.
+
+        If one of the appliers fails, no more appliers are started,
+        and the error is re-raised after the running ones finish.
+
+        :param theme: the theme to be applied.
+        :param skip: names of tasks to be treated as already finished.
+        :param on_applied: a callable to be called with a name of each
+            task and its duration in seconds, after the task finishes.
+            The duration of a two-phase task includes preparing its
+            changes. It is called from worker threads.
+        """
+        done = set(skip)
+        waiting_for = {
+            n: set(t.dependencies) - done
+            for n, t in self._tasks.items() if n not in done
+        }
+        ready = []
+
+        def make_ready(name):
+            heapq.heappush(
+                ready,
+                (-self._priorities[name], self._positions[name], name)
+            )
+
+        for name, dependencies in waiting_for.items():
+            if not dependencies:
+                make_ready(name)
+
+        errors = []
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            prepared = self._prepare(executor, theme, [
+                n for n in self._order
+                if n in waiting_for and is_two_phase(self._tasks[n].applier)
+            ])
+            try:
+                while running or (ready and not errors):
+                    while ready and not errors:
+                        name = heapq.heappop(ready)[2]
+                        future = executor.submit(
+                            self._apply_timed, self._tasks[name], theme,
+                            on_applied, *prepared.pop(name, ())
+                        )
+                        running[future] = name
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for f in finished:
+                        name = running.pop(f)
+                        if f.exception() is not None:
+                            errors.append(f.exception())
+                            continue
+                        for d in self._dependents[name]:
+                            if d not in waiting_for:
+                                continue
+                            waiting_for[d].discard(name)
+                            if not waiting_for[d]:
+                                make_ready(d)
+            finally:
+                for change, _ in prepared.values():
+                    change.abort()
+        if errors:
+            raise errors[0]
+
+    @classmethod
+    def sequential(cls, appliers, first=None):
+        """Create a scheduler using appliers one after another.
+
+        :param appliers: a sequence of theme appliers, in the order in
+            which they are going to be used.
+        :param first: an instance of ApplierTask to be run before all
+            the appliers, or None.
+        :returns: the new scheduler.
+        """
+        tasks = [] if first is None else [first]
+        for i, a in enumerate(appliers):
+            dependencies = (tasks[-1].name,) if tasks else ()
+            tasks.append(ApplierTask(str(i), a, dependencies, 1))
+        return cls(tasks, max_workers=1)
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""Reading base16 scheme YAML files and caching their palettes.
+
+Upstream base16 schemes are distributed as YAML files mapping names of
+colors (base00 to base0F) to hexadecimal values without a leading "#".
+Palettes of valid schemes are kept in a compact binary cache, so that
+a scheme file is parsed again only after it is modified.
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from . import metrics
+from .colors import DerivedColors
+
+try:
+    from yaml import CBaseLoader as _Loader, load as _load
+
+    def _parse_yaml(text):
+        return _load(text, Loader=_Loader)
+except ImportError:
+    from ruamel.yaml import YAML
+
+    _parse_yaml = YAML(typ='base', pure=False).load
+
+COLOR_NAMES = tuple('base0' + c for c in '0123456789ABCDEF')
+"""Names of all colors of a base16 scheme."""
+
+DEFAULT_CACHE_PATH = '~/.cache/base16-theme-switcher/schemes.cache'
+"""A default path to the cache of palettes of schemes."""
+
+_XRESOURCES_TEMPLATE = '''\
+*foreground:   base05
+#ifdef background_opacity
+*background:   [background_opacity]base00
+#else
+*background:   base00
+#endif
+*cursorColor:  base05
+
+*color0:       base00
+*color1:       base08
+*color2:       base0B
+*color3:       base0A
+*color4:       base0D
+*color5:       base0E
+*color6:       base0C
+*color7:       base05
+
+*color8:       base03
+*color9:       base08
+*color10:      base0B
+*color11:      base0A
+*color12:      base0D
+*color13:      base0E
+*color14:      base0C
+*color15:      base07
+
+*color16:      base09
+*color17:      base0F
+*color18:      base01
+*color19:      base02
+*color20:      base04
+*color21:      base06
+'''
+"""Resources of the base16-xresources 256-color template."""
+
+_VALUE_PATTERN = re.compile(r'#[0-9a-f]{6}$')
+"""A pattern matching a valid, normalized color value."""
+
+_MAGIC = b'B16SC\x02'
+"""The first bytes of a cache file, identifying its format version."""
+
+_ENTRY_HEADER = struct.Struct('<Hq?')
+"""A header of a cache entry.
+
+It contains the length of a path, the modification time of the file in
+nanoseconds and a flag telling if the scheme is valid. The path is
+followed by the palette and derived colors only for a valid scheme.
+"""
+
+_PALETTE_SIZE = 48
+_DERIVED_SIZE = len(
+    DerivedColors.from_hex(COLOR_NAMES, ['#000000'] * 16).to_bytes()
+)
+
+
+def load_scheme(path):
+    """Read colors defined in a scheme file.
+
+    :param path: a path to the scheme file.
+    :returns: a map of names of base16 colors defined in the scheme to
+        their values, prefixed with "#". Values are not validated.
+    :raises OSError: if the file can't be read.
+    """
+    with open(str(path), encoding='utf-8') as f:
+        return parse_scheme(f.read())
+
+
+def parse_scheme(text):
+    """Get colors defined in a content of a scheme file.
+
+    :param text: the content.
+    :returns: a map of names of base16 colors defined in the scheme to
+        their values, prefixed with "#". Values are not validated.
+    """
+    data = _parse_yaml(text)
+    if not isinstance(data, dict):
+        return {}
+    return {
+        n: '#' + str(data[n]).lstrip('#').lower()
+        for n in COLOR_NAMES if n in data
+    }
+
+
+def to_xresources(definitions):
+    """Get a content of an .Xresources file for the color definitions.
+
+    :param definitions: a map of names of base16 colors to their values.
+    :returns: the content.
+    """
+    defines = ''.join(
+        '#define {} {}\n'.format(n, definitions[n])
+        for n in COLOR_NAMES if n in definitions
+    )
+    return defines + '\n' + _XRESOURCES_TEMPLATE
+
+
+def _get_palette(definitions):
+    """Get a binary palette for valid color definitions.
+
+    :param definitions: a map of names of base16 colors to their values.
+    :returns: 48 bytes containing RGB components of all colors, or None
+        if any color is missing or invalid.
+    """
+    values = [definitions.get(n, '') for n in COLOR_NAMES]
+    if not all(_VALUE_PATTERN.match(v) for v in values):
+        return None
+    return bytes.fromhex(''.join(v[1:] for v in values))
+
+
+def is_valid_scheme(definitions):
+    """Check if color definitions of a scheme are complete and valid.
+
+    :param definitions: a map of names of base16 colors to their values,
+        as returned by parse_scheme.
+    :returns: True if all base16 colors have valid values.
+    """
+    return _get_palette(definitions) is not None
+
+
+def convert_scheme(path):
+    """Convert a scheme file to a cache entry.
+
+    This function is executed by worker processes.
+
+    :param path: a path to the scheme file, as a string.
+    :returns: a tuple containing the path, the modification time of the
+        file in nanoseconds (or None if the file is missing), the binary
+        palette and the binary derived colors. The last two are None if
+        the scheme is invalid or unreadable.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        definitions = load_scheme(path)
+    except Exception:
+        return path, None, None, None
+    palette = _get_palette(definitions)
+    if palette is None:
+        return path, mtime, None, None
+    derived = DerivedColors.from_hex(
+        COLOR_NAMES, [definitions[n] for n in COLOR_NAMES]
+    )
+    return path, mtime, palette, derived.to_bytes()
+
+
+class CachedScheme(namedtuple('CachedScheme', 'definitions derived_colors')):
+    """Colors of a valid scheme, read from the cache.
+
+    :ivar definitions: a map of names of colors to their values.
+    :ivar derived_colors: an instance of DerivedColors for the scheme.
+    """
+
+
+class SchemeCache:
+    """A compact binary cache of palettes of scheme files.
+
+    Entries are keyed by a path of a scheme file and are valid as long
+    as the modification time of the file doesn't change. Each entry
+    stores RGB components of all colors and their derived
+    representations, so valid schemes don't have to be parsed again.
+    """
+
+    def __init__(self, path):
+        """Create a new cache.
+
+        :param path: a path to the cache file. A user directory in the
+            path is expanded.
+        """
+        self._path = Path(path).expanduser()
+        self._entries = None
+        self._modified = False
+        self._logger = logging.getLogger(__name__)
+
+    def _read(self):
+        entries = {}
+        try:
+            data = self._path.read_bytes()
+        except FileNotFoundError:
+            return entries
+        except OSError as e:
+            self._logger.warning('Ignoring unreadable %s: %s', self._path, e)
+            return entries
+        if not data.startswith(_MAGIC):
+            return entries
+        offset = len(_MAGIC)
+        entry_size = _PALETTE_SIZE + _DERIVED_SIZE
+        while offset + _ENTRY_HEADER.size <= len(data):
+            path_size, mtime, valid = _ENTRY_HEADER.unpack_from(data, offset)
+            offset += _ENTRY_HEADER.size
+            path = data[offset:offset + path_size].decode('utf-8')
+            offset += path_size
+            if not valid:
+                entries[path] = mtime, None, None
+                continue
+            entry = data[offset:offset + entry_size]
+            offset += entry_size
+            if len(entry) < entry_size:
+                break
+            entries[path] = (
+                mtime, entry[:_PALETTE_SIZE], entry[_PALETTE_SIZE:]
+            )
+        return entries
+
+    @property
+    def _loaded_entries(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def is_valid(self, path):
+        """Check if a scheme file was recorded as valid.
+
+        :param path: a path to the scheme file.
+        :returns: True or False if there is an entry for the current
+            version of the file, telling if the scheme is valid, or None
+            if there is no such entry.
+        :raises OSError: if the scheme file can't be accessed.
+        """
+        key = str(path)
+        entry = self._loaded_entries.get(key)
+        if entry is None or entry[0] != os.stat(key).st_mtime_ns:
+            return None
+        return entry[1] is not None
+
+    def get(self, path):
+        """Get cached colors of a scheme.
+
+        :param path: a path to the scheme file.
+        :returns: an instance of CachedScheme, or None if there is no
+            entry for the current version of the file, or if the file
+            is known to be invalid.
+        :raises OSError: if the scheme file can't be accessed.
+        """
+        key = str(path)
+        entry = self._loaded_entries.get(key)
+        if entry is None or entry[0] != os.stat(key).st_mtime_ns:
+            metrics.collected.increment(
+                'b16ts_cache_requests_total', cache='scheme', result='miss'
+            )
+            return None
+        metrics.collected.increment(
+            'b16ts_cache_requests_total', cache='scheme', result='hit'
+        )
+        _, palette, derived = entry
+        if palette is None:
+            return None
+        definitions = {
+            n: '#' + palette[i * 3:i * 3 + 3].hex()
+            for i, n in enumerate(COLOR_NAMES)
+        }
+        return CachedScheme(
+            definitions, DerivedColors.from_bytes(COLOR_NAMES, derived)
+        )
+
+    def update(self, paths, max_workers=None):
+        """Convert new and modified scheme files and save the cache.
+
+        The files are converted in parallel, by worker processes started
+        by a fork server, so the cache may be updated by any thread.
+        Invalid schemes are recorded as such, so they are not converted
+        again until they are modified. Entries of missing files are
+        removed.
+
+        :param paths: paths to scheme files.
+        :param max_workers: the maximum number of worker processes, or
+            None for the default of ProcessPoolExecutor.
+        """
+        entries = self._loaded_entries
+        stale = []
+        for p in map(str, paths):
+            entry = entries.get(p)
+            try:
+                mtime = os.stat(p).st_mtime_ns
+            except OSError:
+                mtime = None
+            if entry is None or entry[0] != mtime:
+                stale.append(p)
+        if not stale:
+            return
+
+        self._logger.info('Converting %d scheme files...', len(stale))
+        if len(stale) == 1:
+            results = [convert_scheme(stale[0])]
+        else:
+            # The cache may be updated by a thread streaming themes to
+            # a prompt, and forking a process running other threads
+            # could copy their locks in a held state.
+            with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('forkserver')
+            ) as executor:
+                results = list(executor.map(
+                    convert_scheme, stale,
+                    chunksize=max(len(stale) // 64, 1)
+                ))
+        for path, mtime, palette, derived in results:
+            if mtime is None:
+                entries.pop(path, None)
+            else:
+                entries[path] = mtime, palette, derived
+        self._modified = True
+        self.save()
+
+    def save(self):
+        """Save the cache atomically, if it was modified.
+
+        Errors are logged instead of being raised, because the cache
+        isn't necessary for using schemes.
+        """
+        if not self._modified:
+            return
+        chunks = [_MAGIC]
+        for path, (mtime, palette, derived) in self._entries.items():
+            encoded = path.encode('utf-8')
+            valid = palette is not None
+            chunks.extend((
+                _ENTRY_HEADER.pack(len(encoded), mtime, valid), encoded
+            ))
+            if valid:
+                chunks.extend((palette, derived))
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=str(self._path.parent), prefix='.schemes-'
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b''.join(chunks))
+            os.replace(tmp_path, str(self._path))
+        except OSError as e:
+            self._logger.warning(
+                'Couldn\'t save scheme cache to %s: %s', self._path, e
+            )
+            return
+        self._modified = False
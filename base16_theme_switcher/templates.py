@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Compiled templates of configuration files containing theme colors.
+
+A template is a text containing placeholders like {base05}, replaced
+with colors of a theme when the template is rendered. All other text,
+including braces that are not part of a placeholder, is copied as it is.
+"""
+
+import os
+import re
+
+from . import metrics
+from .app import PreparedChange, TwoPhaseThemeApplier
+from .config_structures import ConfiguredAbsolutePath
+from .files import create_replacement
+
+_PLACEHOLDER_PATTERN = re.compile(r'\{(base0[0-9A-F])\}')
+"""A pattern matching a color placeholder."""
+
+
+class CompiledTemplate:
+    """A template split into literal segments and color slots."""
+
+    def __init__(self, text):
+        """Compile a template.
+
+        :param text: the text of the template.
+        """
+        segments = _PLACEHOLDER_PATTERN.split(text)
+        self._segments = segments
+        self._slots = [(i, segments[i]) for i in range(1, len(segments), 2)]
+
+    @property
+    def color_names(self):
+        """Get a set of names of colors used in the template."""
+        return {name for _, name in self._slots}
+
+    def render(self, colors):
+        """Render the template.
+
+        :param colors: a mapping of color names to their values.
+        :returns: the rendered text.
+        :raises KeyError: if the template contains a placeholder for
+            a color not provided by the mapping.
+        """
+        segments = list(self._segments)
+        for index, name in self._slots:
+            segments[index] = colors[name]
+        return ''.join(segments)
+
+
+class TemplateCache:
+    """A cache of compiled templates read from files.
+
+    A template is compiled again only if the modification time of its
+    file has changed.
+    """
+
+    def __init__(self):
+        """Create a new, empty cache."""
+        self._templates = {}
+
+    def get(self, path):
+        """Get a compiled template.
+
+        :param path: a path to a file containing the template.
+        :returns: the compiled template.
+        :raises OSError: if the file can't be read.
+        """
+        key = str(path)
+        mtime = os.stat(key).st_mtime_ns
+        cached = self._templates.get(key)
+        result = 'hit'
+        if cached is None or cached[0] != mtime:
+            with open(key, encoding='utf-8') as f:
+                cached = mtime, CompiledTemplate(f.read())
+            self._templates[key] = cached
+            result = 'miss'
+        metrics.collected.increment(
+            'b16ts_cache_requests_total', cache='template', result=result
+        )
+        return cached[1]
+
+
+_DEFAULT_CACHE = TemplateCache()
+
+
+def write_atomically(path, text):
+    """Replace the content of a file with given text atomically.
+
+    :param path: a path to the file.
+    :param text: the new content of the file.
+    :raises OSError: if the file can't be written.
+    """
+    change = StagedFiles()
+    change.stage(path, text)
+    try:
+        change.commit()
+    except BaseException:
+        change.abort()
+        raise
+
+
+class StagedFiles(PreparedChange):
+    """New contents of files, staged in temporary files next to them."""
+
+    def __init__(self):
+        """Create a new instance, with no files staged."""
+        self._staged = []
+
+    def stage(self, path, text):
+        """Write a new content of a file to a temporary file.
+
+        The temporary file has the permissions of the file, and
+        replaces the target of the path if it is a symbolic link.
+
+        :param path: a path to the file.
+        :param text: the new content of the file.
+        :raises OSError: if the temporary file can't be written.
+        """
+        fd, tmp_path, path = create_replacement(path, '.b16ts-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._staged.append((tmp_path, path))
+
+    def commit(self):
+        """Replace the files with the temporary ones.
+
+        :raises OSError: if a file can't be replaced.
+        """
+        while self._staged:
+            tmp_path, path = self._staged[0]
+            os.replace(tmp_path, path)
+            self._staged.pop(0)
+
+    def abort(self):
+        """Remove the temporary files that were not committed."""
+        for tmp_path, _ in self._staged:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        self._staged = []
+
+
+class TemplateThemeApplier(TwoPhaseThemeApplier):
+    """A theme applier rendering templates into configuration files."""
+
+    def __init__(self, outputs, cache=_DEFAULT_CACHE):
+        """Create a new instance.
+
+        :param outputs: a mapping of paths of template files to paths
+            of files to which the rendered templates are written. User
+            directories in the paths are expanded.
+        :param cache: a cache of compiled templates.
+        """
+        self._outputs = [
+            (ConfiguredAbsolutePath.from_(t), ConfiguredAbsolutePath.from_(o))
+            for t, o in outputs.items()
+        ]
+        self._cache = cache
+
+    def prepare(self, theme):
+        """Render all templates using colors of the theme.
+
+        Each color used by any of the templates is requested from the
+        theme only once. The rendered templates replace the output
+        files when the returned change is committed.
+
+        :param theme: a theme to be set.
+        :returns: an instance of StagedFiles.
+        :raises ConfiguredFileNotFoundError: if a template or a parent
+            directory of an output file doesn't exist.
+        :raises ConfiguredPathError: if another system error occurs.
+        """
+        templates = []
+        for template_path, output_path in self._outputs:
+            with template_path as path:
+                templates.append((self._cache.get(path), output_path))
+
+        names = set().union(*(t.color_names for t, _ in templates))
+        colors = {n: theme[n] for n in names}
+        change = StagedFiles()
+        try:
+            for template, output_path in templates:
+                with output_path as path:
+                    change.stage(path, template.render(colors))
+        except BaseException:
+            change.abort()
+            raise
+        return change
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Changing colors of running terminals with escape sequences.
+
+Terminal emulators supporting OSC 4, 10, 11 and 12 sequences change
+their colors as soon as the sequences are written to their
+pseudo-terminals, so they don't have to be restarted to use a new
+theme.
+"""
+
+import os
+import selectors
+import stat
+import time
+
+DEFAULT_PTS_DIR = '/dev/pts'
+"""A directory containing pseudo-terminal devices."""
+
+OSC_COLORS = (
+    'base00', 'base08', 'base0B', 'base0A', 'base0D', 'base0E', 'base0C',
+    'base05', 'base03', 'base08', 'base0B', 'base0A', 'base0D', 'base0E',
+    'base0C', 'base07', 'base09', 'base0F', 'base01', 'base02', 'base04',
+    'base06'
+)
+"""Names of colors set as colors 0-21 of a terminal.
+
+The mapping is the same as the one used by base16-shell.
+"""
+
+OSC_DYNAMIC_COLORS = (10, 'base05'), (11, 'base00'), (12, 'base05')
+"""Numbers of OSC commands setting the foreground, background and
+cursor colors of a terminal, with names of colors used for them."""
+
+
+def _to_osc_rgb(value):
+    return 'rgb:{}/{}/{}'.format(value[1:3], value[3:5], value[5:7])
+
+
+def get_osc_sequences(colors):
+    """Get escape sequences changing colors of a terminal.
+
+    :param colors: a mapping of names of base16 colors to their values.
+    :returns: a string containing OSC 4 sequences for colors 0-21 and
+        OSC 10, 11 and 12 sequences for the foreground, background and
+        cursor colors.
+    """
+    sequences = [
+        '\033]4;{};{}\033\\'.format(i, _to_osc_rgb(colors[n]))
+        for i, n in enumerate(OSC_COLORS)
+    ]
+    sequences.extend(
+        '\033]{};{}\033\\'.format(c, _to_osc_rgb(colors[n]))
+        for c, n in OSC_DYNAMIC_COLORS
+    )
+    return ''.join(sequences)
+
+
+def find_terminals(pts_dir=DEFAULT_PTS_DIR, uid=None):
+    """Find pseudo-terminals owned by a user.
+
+    :param pts_dir: a directory containing pseudo-terminal devices.
+    :param uid: an identifier of the user, or None for the user of the
+        current process.
+    :returns: a sorted list of paths to the pseudo-terminals.
+    """
+    if uid is None:
+        uid = os.getuid()
+    terminals = []
+    try:
+        entries = list(os.scandir(pts_dir))
+    except OSError:
+        return terminals
+    for e in entries:
+        if not e.name.isdigit():
+            continue
+        try:
+            info = e.stat()
+        except OSError:
+            continue
+        if stat.S_ISCHR(info.st_mode) and info.st_uid == uid:
+            terminals.append(e.path)
+    return sorted(terminals, key=lambda p: int(os.path.basename(p)))
+
+
+def write_to_terminals(paths, data, timeout):
+    """Write data to several terminals at the same time.
+
+    The terminals are opened in non-blocking mode, and the data is
+    written to each of them whenever it can accept more, so a terminal
+    that isn't read doesn't delay the others.
+
+    :param paths: paths to the terminals.
+    :param data: bytes to be written to each terminal.
+    :param timeout: the maximum time of writing to a terminal, in
+        seconds.
+    :returns: a map of paths of terminals to which the data couldn't
+        be written to errors that occurred.
+    """
+    errors = {}
+    with selectors.DefaultSelector() as selector:
+        for path in paths:
+            try:
+                fd = os.open(
+                    path, os.O_WRONLY | os.O_NONBLOCK | os.O_NOCTTY
+                )
+            except OSError as e:
+                errors[path] = e
+                continue
+            selector.register(fd, selectors.EVENT_WRITE, [path, 0])
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                path, offset = key.data
+                try:
+                    offset += os.write(key.fd, data[offset:])
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    errors[path] = e
+                    offset = len(data)
+                key.data[1] = offset
+                if offset >= len(data):
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+
+        for key in list(selector.get_map().values()):
+            errors[key.data[0]] = TimeoutError(
+                'Writing to the terminal timed out.'
+            )
+            selector.unregister(key.fd)
+            os.close(key.fd)
+    return errors
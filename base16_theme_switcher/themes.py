@@ -1,11 +1,43 @@
 # -*- coding: utf-8 -*-
+import glob
 import logging
+import os
 import re
+import threading
+from collections import namedtuple
 from collections.abc import Mapping
 from os.path import basename, splitext
+from pathlib import Path
 from string import ascii_uppercase, digits
-
+from types import MappingProxyType
+
+from .archives import (
+    ArchiveMember,
+    find_members,
+    is_archive,
+    resolve_path,
+)
+from .colors import DerivedColors
 from .config_structures import ConfiguredAbsolutePath
+from .discovery import DEFAULT_IGNORED, find_files, probe_files
+from .schemes import (
+    is_valid_scheme,
+    load_scheme,
+    parse_scheme,
+    to_xresources,
+)
+
+
+def get_search_paths(theme_search_path):
+    """Get paths to be searched for themes.
+
+    :param theme_search_path: a path to be searched for themes, or
+        a sequence of such paths in priority order.
+    :returns: a list of instances of ConfiguredAbsolutePath.
+    """
+    if isinstance(theme_search_path, (str, os.PathLike)):
+        theme_search_path = [theme_search_path]
+    return [ConfiguredAbsolutePath.from_(p) for p in theme_search_path]
 
 
 class InvalidThemeError(ValueError):
@@ -70,7 +102,23 @@ class Base16Theme:
         """
         self.path = path
         self.name = splitext(basename(str(path)))[0]
+        self._content = None
         self._definitions = {}
+        self._derived_colors = None
+
+    @property
+    def content(self):
+        """Get the content of the theme file.
+
+        The file is read only once, so the content may be shared by
+        all consumers of the theme, like xrdb processes started for
+        several X displays.
+
+        :returns: the content as a string.
+        """
+        if self._content is None:
+            self._content = self.path.read_text()
+        return self._content
 
     @property
     def definitions(self):
@@ -80,9 +128,7 @@ class Base16Theme:
             values.
         """
         if not self._definitions:
-            self._definitions = dict(
-                self._DEF_PATTERN.findall(self.path.read_text())
-            )
+            self._definitions = dict(self._DEF_PATTERN.findall(self.content))
         return self._definitions
 
     def __getitem__(self, name):
@@ -112,9 +158,39 @@ class Base16Theme:
 
         return value
 
+    @property
+    def derived_colors(self):
+        """Get other representations of all colors of the theme.
+
+        The representations are computed for all colors at once, when
+        they are first requested, and reused afterwards.
+
+        :returns: an instance of DerivedColors.
+        :raises InvalidThemeError: if any of the colors is missing or
+            invalid.
+        """
+        if self._derived_colors is None:
+            self._derived_colors = DerivedColors.from_hex(
+                self._EXPECTED_COLORS,
+                [self[n] for n in self._EXPECTED_COLORS]
+            )
+        return self._derived_colors
+
     def _raise_invalid_theme_error(self, descr, color_name):
         raise InvalidThemeError(self.path, descr, color_name)
 
+    def snapshot(self):
+        """Get an immutable, fully loaded snapshot of the theme.
+
+        :returns: an instance of FrozenTheme.
+        :raises InvalidThemeError: if any of the colors is missing or
+            invalid.
+        """
+        return FrozenTheme(
+            self.name, str(self.path), self.definitions, self.content,
+            self.derived_colors
+        )
+
     def __str__(self):
         """Get a string representation of the theme.
 
@@ -123,16 +199,308 @@ class Base16Theme:
         return str(self.path)
 
     @classmethod
-    def find_all_in(cls, path):
-        """Find all themes in a directory.
-
-        :param path: an object representing a path to a directory to be
-            searched for themes.
+    def find_all_in(cls, paths, scheme_cache=None, ignore=DEFAULT_IGNORED,
+                    on_found=None):
+        """Find all themes in directories or in zip or tar archives.
+
+        The themes are loaded from .Xresources files and from base16
+        scheme files with .yaml extension. Themes found in the first
+        of the paths are yielded first, and themes loaded from
+        .Xresources files precede scheme files found in the same path.
+        Files in an archive are read from it on demand, and the scheme
+        cache isn't used for them.
+
+        :param paths: objects representing paths to directories or
+            archives to be searched for themes, in priority order.
+        :param scheme_cache: a cache of palettes of scheme files, or
+            None if scheme files are always parsed.
+        :param ignore: shell-style patterns matching names of
+            directories that are not searched.
+        :param on_found: a callable to be called with lists of paths to
+            theme files as soon as they are found, before the themes
+            are yielded, or None.
         :returns: a generator yielding themes.
         """
-        with path:
-            for f in path.rglob('*.Xresources'):
-                yield cls(f)
+        roots = []
+        for path in paths:
+            with path as root:
+                if is_archive(root) and root.is_file():
+                    members = (
+                        find_members(root, '*.Xresources') +
+                        find_members(root, '*.yaml')
+                    )
+                    if members and on_found is not None:
+                        on_found([str(m) for m in members])
+                    roots.append(members)
+                else:
+                    roots.append(str(root))
+        found = iter(find_files(
+            [r for r in roots if isinstance(r, str)],
+            ('.Xresources', '.yaml'),
+            ignore,
+            on_found=on_found
+        ))
+
+        for root in roots:
+            if not isinstance(root, str):
+                for m in root:
+                    if m.suffix == '.Xresources':
+                        yield cls(m)
+                    else:
+                        yield Base16SchemeTheme(m)
+                continue
+            files = next(found)
+            for f in files:
+                if f.endswith('.Xresources'):
+                    yield cls(Path(f))
+            for f in files:
+                if f.endswith('.yaml'):
+                    yield Base16SchemeTheme(Path(f), scheme_cache)
+
+    @classmethod
+    def probe_in(cls, paths, name, scheme_cache=None, directories=None,
+                 ignore=DEFAULT_IGNORED):
+        """Find a theme with a name in likely locations.
+
+        The paths are probed in priority order, and the search stops at
+        the first of them containing files of themes with the name.
+
+        :param paths: objects representing paths to directories or
+            archives to be searched for the theme, in priority order.
+        :param name: the name.
+        :param scheme_cache: a cache of palettes of scheme files, or
+            None if scheme files are always parsed.
+        :param directories: paths to directories known to contain
+            themes, or None to probe only the roots of the directories
+            and their conventional subdirectories.
+        :param ignore: shell-style patterns matching names of
+            directories that are not probed.
+        :returns: the theme, or None if no theme with the name was
+            found, if a path contains several of them, or if the file
+            found is a YAML file that isn't a base16 scheme.
+        """
+        file_names = name + '.Xresources', name + '.yaml'
+        for path in paths:
+            with path as root:
+                if is_archive(root) and root.is_file():
+                    found = [
+                        m for n in file_names
+                        for m in find_members(root, glob.escape(n))
+                    ]
+                else:
+                    found = [Path(f) for f in probe_files(
+                        str(root), file_names, directories, ignore
+                    )]
+            if len(found) > 1:
+                return None
+            if found:
+                if found[0].suffix == '.Xresources':
+                    return cls(found[0])
+                if isinstance(found[0], ArchiveMember):
+                    scheme_cache = None
+                theme = Base16SchemeTheme(found[0], scheme_cache)
+                return theme if theme.is_scheme() else None
+        return None
+
+    @staticmethod
+    def from_(path, scheme_cache=None):
+        """Create a theme of a type matching the extension of its file.
+
+        :param path: an object representing a path to a theme file,
+            acceptable as an argument of pathlib.Path. The file may be
+            in an archive.
+        :param scheme_cache: a cache of palettes of scheme files, or
+            None.
+        :returns: an instance of Base16SchemeTheme for a .yaml file,
+            or an instance of Base16Theme for any other file.
+        :raises OSError: if the file is in an archive that can't be
+            read.
+        """
+        path = resolve_path(path)
+        if not isinstance(path, Path):
+            scheme_cache = None
+        if path.suffix == '.yaml':
+            return Base16SchemeTheme(path, scheme_cache)
+        return Base16Theme(path)
+
+
+class Base16SchemeTheme(Base16Theme):
+    """Represents a base16 color theme loaded from a scheme YAML file.
+
+    Base16 scheme file format specification:
+        https://github.com/chriskempson/base16/blob/master/file.md
+
+    The colors are taken from a scheme cache if it contains an entry for
+    the current version of the file. Otherwise, the file is parsed.
+    The content of the theme is an equivalent of an .Xresources file
+    provided by the base16-xresources project for the scheme.
+    """
+
+    def __init__(self, path, cache=None):
+        """Create a new instance.
+
+        :param path: a path to a scheme file.
+        :param cache: a cache of palettes of scheme files, or None.
+        """
+        super().__init__(path)
+        self._cache = cache
+
+    def _load(self):
+        cached = None
+        if self._cache is not None:
+            cached = self._cache.get(self.path)
+        if cached is None and isinstance(self.path, ArchiveMember):
+            self._definitions = parse_scheme(
+                self.path.read_text(encoding='utf-8')
+            )
+        elif cached is None:
+            self._definitions = load_scheme(self.path)
+        else:
+            self._definitions = cached.definitions
+            self._derived_colors = cached.derived_colors
+
+    def is_scheme(self):
+        """Check if the file is a valid base16 scheme.
+
+        Other YAML files, like configuration files of base16 templates,
+        may be stored next to schemes. The scheme cache is used if it
+        has an entry for the file. Otherwise, the file is parsed.
+
+        :returns: True if the file defines valid values of all base16
+            colors, False otherwise, including if it can't be read or
+            parsed.
+        """
+        try:
+            if self._cache is not None and isinstance(self.path, Path):
+                valid = self._cache.is_valid(self.path)
+                if valid is not None:
+                    return valid
+            return is_valid_scheme(self.definitions)
+        except Exception:
+            return False
+
+    @property
+    def definitions(self):
+        """Get colors defined in the scheme.
+
+        :returns: a map of names of colors to their values, prefixed
+            with "#".
+        """
+        if not self._definitions:
+            self._load()
+        return self._definitions
+
+    @property
+    def content(self):
+        """Get the scheme as a content of an .Xresources file.
+
+        :returns: the content as a string.
+        """
+        if self._content is None:
+            self._content = to_xresources(self.definitions)
+        return self._content
+
+
+class FrozenTheme:
+    """An immutable snapshot of a theme, with everything loaded.
+
+    The colors are validated and their other representations are
+    computed before the snapshot is created, so it may be shared by
+    threads without synchronization. Snapshots are hashable, and they
+    are pickled in a compact form, to be sent to worker processes.
+    """
+
+    __slots__ = (
+        'name', 'path', 'content', 'derived_colors', '_definitions', '_hash'
+    )
+
+    def __init__(self, name, path, definitions, content, derived_colors):
+        """Create a new instance.
+
+        :param name: a name of the theme.
+        :param path: a path to the theme file, as a string.
+        :param definitions: a mapping of names defined in the theme to
+            their values, including valid values of all base16 colors.
+        :param content: the theme as a content of an .Xresources file.
+        :param derived_colors: an instance of DerivedColors containing
+            other representations of the base16 colors.
+        """
+        set_attribute = super().__setattr__
+        set_attribute('name', name)
+        set_attribute('path', path)
+        set_attribute('content', content)
+        set_attribute('derived_colors', derived_colors)
+        set_attribute('_definitions', dict(definitions))
+        set_attribute('_hash', hash((
+            name, path, content, frozenset(self._definitions.items())
+        )))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Snapshots of themes are immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Snapshots of themes are immutable.')
+
+    @property
+    def definitions(self):
+        """Get definitions provided by the theme.
+
+        :returns: a read-only map of names defined in the theme to
+            their respective values.
+        """
+        return MappingProxyType(self._definitions)
+
+    def __getitem__(self, name):
+        """Get a color defined in the theme.
+
+        :param name: a name of a color value to be returned.
+        :returns: the requested color.
+        :raises KeyError: if the name is not expected for a base16 color
+            theme (see specification).
+        """
+        if name not in Base16Theme._EXPECTED_COLORS:
+            raise KeyError(
+                'An unsupported color was requested: {}'.format(name)
+            )
+        return self._definitions[name]
+
+    def snapshot(self):
+        """Get an immutable snapshot of the theme.
+
+        :returns: this instance.
+        """
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenTheme):
+            return NotImplemented
+        return (
+            (self.name, self.path, self.content, self._definitions) ==
+            (other.name, other.path, other.content, other._definitions)
+        )
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return _restore_frozen_theme, (
+            self.name, self.path, tuple(self._definitions.items()),
+            self.content, self.derived_colors.to_bytes()
+        )
+
+    def __str__(self):
+        """Get a string representation of the theme.
+
+        :returns: the path of the theme file.
+        """
+        return self.path
+
+
+def _restore_frozen_theme(name, path, definitions, content, derived_colors):
+    return FrozenTheme(
+        name, path, definitions, content,
+        DerivedColors.from_bytes(Base16Theme._EXPECTED_COLORS, derived_colors)
+    )
 
 
 class Base16ThemeNameMap(Mapping):
@@ -219,16 +587,244 @@ class Base16ThemeNameMap(Mapping):
         return unique_themes
 
     @classmethod
-    def from_unique_in(cls, theme_search_path):
-        """Create a collection of themes stored in the directory.
-
-        :param theme_search_path: a path to be searched for themes.
-            For all themes found in the directory and sharing a name,
-            only the first encountered theme is added and the presence
-            of the rest is logged.
+    def from_unique_in(cls, theme_search_path, scheme_cache=None,
+                       ignore=DEFAULT_IGNORED, on_found=None):
+        """Create a collection of themes stored in directories.
+
+        :param theme_search_path: a path to be searched for themes, or
+            a sequence of such paths in priority order. For all themes
+            found in the paths and sharing a name, only the first
+            encountered theme is added and the presence of the rest is
+            logged.
+        :param scheme_cache: a cache of palettes of scheme files, or
+            None. New and modified scheme files found in the directories
+            are converted and added to the cache in parallel. YAML files
+            that aren't valid base16 schemes are left out.
+        :param ignore: shell-style patterns matching names of
+            directories that are not searched.
+        :param on_found: a callable to be called with lists of paths to
+            theme files as soon as they are found, or None.
         :returns: an instance of this class containing the unique themes.
         """
-        themes = Base16Theme.find_all_in(
-            ConfiguredAbsolutePath.from_path_str(theme_search_path)
-        )
-        return cls.from_unique(themes)
+        themes = list(Base16Theme.find_all_in(
+            get_search_paths(theme_search_path), scheme_cache, ignore,
+            on_found
+        ))
+        if scheme_cache is not None:
+            scheme_cache.update(
+                t.path for t in themes
+                if isinstance(t, Base16SchemeTheme) and
+                isinstance(t.path, Path)
+            )
+        logger = logging.getLogger(__name__)
+        kept = []
+        for t in themes:
+            if isinstance(t, Base16SchemeTheme) and not t.is_scheme():
+                logger.debug('Ignoring %s, which is not a base16 scheme.', t)
+                continue
+            kept.append(t)
+        return cls.from_unique(kept)
+
+
+class ProbedThemeNameMap(Mapping):
+    """A mapping of themes to their names, searched for when needed.
+
+    A theme found by probing its likely locations is available without
+    searching for the other themes. Requesting any other theme, or all
+    of them, triggers the search.
+    """
+
+    def __init__(self, theme, find_all):
+        """Create a new collection.
+
+        :param theme: the theme found by probing.
+        :param find_all: a callable returning an instance of
+            Base16ThemeNameMap containing all themes.
+        """
+        self._theme = theme
+        self._find_all = find_all
+        self._all_themes = None
+
+    @property
+    def _themes(self):
+        if self._all_themes is None:
+            self._all_themes = self._find_all()
+        return self._all_themes
+
+    def __getitem__(self, name):
+        """Get a base16 color theme by its name.
+
+        :param name: a name of the theme to be returned.
+        :returns: the requested theme.
+        :raises KeyError: if there is no theme with given name.
+        """
+        if self._all_themes is None and name == self._theme.name:
+            return self._theme
+        return self._themes[name]
+
+    def __iter__(self):
+        """Iterate over names of all themes."""
+        return iter(self._themes)
+
+    def __len__(self):
+        """Get the number of all themes."""
+        return len(self._themes)
+
+    @property
+    def sorted_by_name(self):
+        """Get all themes sorted by their names.
+
+        :returns: a list of the themes.
+        """
+        return self._themes.sorted_by_name
+
+    def __bool__(self):
+        """Check if the collection contains anything.
+
+        :returns: True, because it contains the probed theme.
+        """
+        return True
+
+
+class ThemeNameChange(namedtuple('ThemeNameChange', 'name available')):
+    """A change of the set of names of available themes.
+
+    :ivar name: a name of a theme.
+    :ivar available: True if the theme was found, False if a theme
+        reported earlier turned out to be unavailable.
+    """
+
+
+class StreamedThemeNameMap(Mapping):
+    """A mapping of themes to their names, searched for in the background.
+
+    Names of themes are available as soon as their files are found,
+    before the themes are loaded. Accessing the themes waits for the
+    search to finish.
+    """
+
+    def __init__(self, find_all, cached_names=()):
+        """Create a new collection and start searching for themes.
+
+        :param find_all: a callable returning an instance of
+            Base16ThemeNameMap containing all themes. It is called in
+            a background thread, with a callable to be called with
+            lists of paths to theme files as soon as they are found.
+        :param cached_names: names of themes found by an earlier
+            search, reported before any new names.
+        """
+        self._find_all = find_all
+        self._cached_names = list(cached_names)
+        self._found_names = []
+        self._finished = False
+        self._all_themes = None
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._all_themes = self._find_all(self._add_found)
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def _add_found(self, paths):
+        names = sorted({splitext(basename(str(p)))[0] for p in paths})
+        with self._condition:
+            self._found_names.extend(names)
+            self._condition.notify_all()
+
+    @property
+    def _themes(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._all_themes
+
+    def changes(self):
+        """Iterate over changes of names of available themes.
+
+        Cached names are reported first, then names of newly found
+        themes, as they are found. After the search finishes, names of
+        themes that weren't found are reported as unavailable.
+
+        :returns: a generator yielding instances of ThemeNameChange,
+            each name at most once as available. An error of the
+            search is raised by the generator after the names found
+            before it.
+        """
+        reported = set()
+        for name in self._cached_names:
+            if name not in reported:
+                reported.add(name)
+                yield ThemeNameChange(name, True)
+
+        position = 0
+        finished = False
+        while not finished:
+            with self._condition:
+                while (position == len(self._found_names) and
+                        not self._finished):
+                    self._condition.wait()
+                names = self._found_names[position:]
+                position = len(self._found_names)
+                finished = self._finished
+            for name in names:
+                if name not in reported:
+                    reported.add(name)
+                    yield ThemeNameChange(name, True)
+
+        themes = self._themes
+        for name in sorted(reported.difference(themes)):
+            yield ThemeNameChange(name, False)
+        for name in sorted(set(themes).difference(reported)):
+            yield ThemeNameChange(name, True)
+
+    def __getitem__(self, name):
+        """Get a base16 color theme by its name.
+
+        :param name: a name of the theme to be returned.
+        :returns: the requested theme.
+        :raises KeyError: if there is no theme with given name.
+        """
+        return self._themes[name]
+
+    def __iter__(self):
+        """Iterate over names of all themes."""
+        return iter(self._themes)
+
+    def __len__(self):
+        """Get the number of all themes."""
+        return len(self._themes)
+
+    @property
+    def sorted_by_name(self):
+        """Get all themes sorted by their names.
+
+        :returns: a list of the themes.
+        """
+        return self._themes.sorted_by_name
+
+    def __bool__(self):
+        """Check if the collection contains anything.
+
+        :returns: True, because a search that doesn't find any themes
+            fails.
+        """
+        return True
+
+
+def stream_theme_names(themes):
+    """Get changes of names of available themes of a collection.
+
+    :param themes: a mapping of themes indexed by their names.
+    :returns: an iterator of instances of ThemeNameChange.
+    """
+    if isinstance(themes, StreamedThemeNameMap):
+        return themes.changes()
+    return (ThemeNameChange(n, True) for n in sorted(themes))
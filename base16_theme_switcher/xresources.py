@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""Merging only the changed resources into X resource databases.
+
+Clients watching the RESOURCE_MANAGER property of an X display reload
+their resources whenever the property changes, so merging resources
+that already have the right values isn't free. A model of the
+resource database of each display is kept instead: it is populated by
+a single xrdb -query and then updated with the resources merged by the
+application, and only the resources whose values differ from the model
+are merged.
+
+The model of a local display is also saved after each merge, together
+with the identity of the socket of its X server, so that the next
+process switching themes starts from it instead of querying the
+database again. It's discarded once the server is restarted.
+
+Themes are usually .Xresources files using a small subset of the C
+preprocessor, which is expanded here. Themes using other features of
+the preprocessor are merged whole, as before.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+from .displays import X11_SOCKET_DIR, merge_resources, query_resources
+
+DEFAULT_STATE_DIR = '~/.cache/base16-theme-switcher/xresources'
+"""A default directory storing models of resource databases of local
+X displays."""
+
+_LOCAL_DISPLAY_PATTERN = re.compile(r'(?:unix)?:(\d+)(?:\.\d+)?$')
+"""A pattern matching a name of a display of a local X server."""
+
+_DIRECTIVE_PATTERN = re.compile(r'#\s*(\w+)\s*(.*)$')
+"""A pattern matching a preprocessor directive and its argument."""
+
+_DEFINE_PATTERN = re.compile(r'([A-Za-z_]\w*)(?:\s+(.*))?$')
+"""A pattern matching an argument of a define directive of an object-like
+macro."""
+
+_IDENTIFIER_PATTERN = re.compile(r'\b[A-Za-z_]\w*\b')
+"""A pattern matching an identifier that may be a name of a macro."""
+
+_PREDEFINED_SYMBOL_PATTERN = re.compile(r'[A-Z][A-Z0-9_]*$')
+"""A pattern matching names of symbols that may be defined by xrdb, like
+COLOR or SRVR_name. Their values depend on the display."""
+
+_LOOSE_BINDING_PATTERN = re.compile(r'\*[.*]*')
+"""A pattern matching a sequence of bindings equivalent to a loose
+binding."""
+
+
+def _normalize_name(name):
+    return _LOOSE_BINDING_PATTERN.sub('*', name.strip()).lstrip('.')
+
+
+def _expand_macros(line, macros):
+    for _ in range(len(macros) + 1):
+        expanded = _IDENTIFIER_PATTERN.sub(
+            lambda m: macros.get(m.group(), m.group()), line
+        )
+        if expanded == line:
+            return line
+        line = expanded
+    return None
+
+
+def _parse_line(line, resources):
+    if not line.strip() or line.lstrip().startswith('!'):
+        return
+    name, separator, value = line.partition(':')
+    if separator and name.strip():
+        resources[_normalize_name(name)] = value.strip()
+
+
+def expand_resources(content):
+    """Get resources defined by the content of an .Xresources file.
+
+    Only object-like macros, defined and undefined in the file, and
+    conditions depending on whether they are defined are supported.
+
+    :param content: the content.
+    :returns: a mapping of names of the resources to their values, or
+        None if the content uses unsupported preprocessor features.
+    """
+    if '/*' in content:
+        return None
+    content = content.replace('\\\n', '')
+    macros = {}
+    resources = {}
+    active = [True]
+    for line in content.splitlines():
+        match = _DIRECTIVE_PATTERN.match(line.strip())
+        if match is None:
+            if all(active):
+                line = _expand_macros(line, macros)
+                if line is None:
+                    return None
+                _parse_line(line, resources)
+            continue
+
+        directive, argument = match.groups()
+        if directive in ('ifdef', 'ifndef'):
+            if (argument not in macros and
+                    _PREDEFINED_SYMBOL_PATTERN.match(argument)):
+                return None
+            active.append((argument in macros) == (directive == 'ifdef'))
+        elif directive == 'else' and len(active) > 1:
+            active[-1] = not active[-1]
+        elif directive == 'endif' and len(active) > 1:
+            active.pop()
+        elif not all(active) and directive in ('define', 'undef'):
+            continue
+        elif directive == 'define':
+            define = _DEFINE_PATTERN.match(argument)
+            if define is None:
+                return None
+            macros[define.group(1)] = (define.group(2) or '').strip()
+        elif directive == 'undef':
+            macros.pop(argument.strip(), None)
+        else:
+            return None
+    return resources if len(active) == 1 else None
+
+
+def parse_resources(text):
+    """Parse resources printed by xrdb -query.
+
+    :param text: the printed resources.
+    :returns: a mapping of names of the resources to their values.
+    """
+    resources = {}
+    for line in text.splitlines():
+        _parse_line(line, resources)
+    return resources
+
+
+def format_resources(resources):
+    """Format resources to be merged by xrdb without preprocessing.
+
+    :param resources: a mapping of names of resources to their values.
+    :returns: the resources in the format of an .Xresources file.
+    """
+    return ''.join(
+        '{}:\t{}\n'.format(n, v) for n, v in sorted(resources.items())
+    )
+
+
+def get_changed_resources(current, new):
+    """Get resources whose values are to be changed.
+
+    :param current: a mapping of names of resources to their current
+        values.
+    :param new: a mapping of names of resources to their new values.
+    :returns: a mapping of names of the resources whose current values
+        differ from the new ones to the new values.
+    """
+    return {n: v for n, v in new.items() if current.get(n) != v}
+
+
+def get_server_stamp(display, socket_dir=X11_SOCKET_DIR):
+    """Identify the running X server of a local display.
+
+    :param display: a name of the X display, or None for the display
+        inherited by the process.
+    :param socket_dir: a path to a directory containing sockets of
+        X servers, named after numbers of their displays.
+    :returns: a tuple containing the number of the display and
+        a string that changes when the server is restarted, or None
+        if the display isn't local or its socket can't be found.
+    """
+    if display is None:
+        display = os.environ.get('DISPLAY', '')
+    match = _LOCAL_DISPLAY_PATTERN.match(display)
+    if match is None:
+        return None
+    number = match.group(1)
+    try:
+        info = os.stat(os.path.join(socket_dir, 'X' + number))
+    except OSError:
+        return None
+    return number, '{}:{}'.format(info.st_ino, info.st_mtime_ns)
+
+
+class ResourceDatabase:
+    """A model of the resource database of an X display.
+
+    The model is populated the first time resources are merged, from
+    the saved model if the display is local and its server wasn't
+    restarted since it was saved, or by querying the database
+    otherwise. It is updated with the merged resources afterwards.
+    Changes made to the database by other programs after it was
+    populated are not detected.
+
+    All methods may be called from any thread.
+    """
+
+    def __init__(self, display=None, state_dir=None, socket_dir=None):
+        """Create a new instance.
+
+        :param display: a name of the X display, or None for the display
+            inherited by the process.
+        :param state_dir: a path to a directory storing saved models,
+            or None if models are not to be saved. A user directory
+            in the path is expanded.
+        :param socket_dir: a path to a directory containing sockets of
+            X servers, or None for the default directory.
+        """
+        self.display = display
+        self._state_dir = (
+            None if state_dir is None else os.path.expanduser(state_dir)
+        )
+        self._socket_dir = X11_SOCKET_DIR if socket_dir is None else socket_dir
+        self._resources = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def _get_state(self):
+        """Get a path to the saved model and the stamp of its server.
+
+        :returns: a tuple containing the path and the stamp, or None if
+            the model of the display isn't to be saved.
+        """
+        if self._state_dir is None:
+            return None
+        stamp = get_server_stamp(self.display, self._socket_dir)
+        if stamp is None:
+            return None
+        number, server = stamp
+        return os.path.join(self._state_dir, number + '.json'), server
+
+    def _load(self, state):
+        """Load the saved model.
+
+        :param state: a tuple returned by _get_state.
+        :returns: a mapping of names of resources to their values, or
+            None if there is no model saved for the running server.
+        """
+        path, server = state
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['server'] != server:
+                return None
+            return {str(n): str(v) for n, v in data['resources'].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _save(self, state):
+        """Save the model, replacing the saved one atomically.
+
+        Errors are ignored, because the saved model is only an
+        optimization.
+
+        :param state: a tuple returned by _get_state.
+        """
+        path, server = state
+        try:
+            os.makedirs(self._state_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self._state_dir, prefix='.xresources-'
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'server': server, 'resources': self._resources}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._logger.debug('Can\'t save X resources to %s: %s', path, e)
+
+    def _discard(self, state):
+        self._resources = None
+        if state is not None:
+            try:
+                os.unlink(state[0])
+            except OSError:
+                pass
+
+    def merge(self, content):
+        """Merge the changed resources of an .Xresources file.
+
+        If the file can't be expanded, it is merged whole and the model
+        is populated again the next time, by querying the database.
+
+        :param content: the content of the file.
+        :returns: a mapping of names of the merged resources to their
+            values, or None if the file was merged whole.
+        :raises subprocess.CalledProcessError: if xrdb fails.
+        """
+        resources = expand_resources(content)
+        with self._lock:
+            state = self._get_state()
+            try:
+                if resources is None:
+                    self._discard(state)
+                    merge_resources(self.display, content)
+                    return None
+                populated = self._resources is None
+                if populated and state is not None:
+                    self._resources = self._load(state)
+                    populated = self._resources is None
+                if populated:
+                    self._resources = parse_resources(
+                        query_resources(self.display)
+                    )
+                changed = get_changed_resources(self._resources, resources)
+                if changed:
+                    merge_resources(
+                        self.display,
+                        format_resources(changed),
+                        preprocess=False
+                    )
+                    self._resources.update(changed)
+                if state is not None and (changed or populated):
+                    self._save(state)
+                return changed
+            except BaseException:
+                self._discard(state)
+                raise
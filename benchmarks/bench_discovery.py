@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Compare finding themes with scandir and with pathlib's rglob.
+
+Usage: python -m benchmarks.bench_discovery [DIRECTORIES [FILES]]
+
+A temporary tree with the given number of theme directories, each
+containing the given number of files, is created first. Half of the
+files are themes. The tree also contains a .git directory as large as
+all theme directories together, which is pruned by scandir discovery.
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from base16_theme_switcher.discovery import find_files
+
+EXTENSIONS = '.Xresources', '.yaml'
+
+
+def make_tree(root, directories, files):
+    """Create a tree of empty files.
+
+    :param root: a path to the root of the tree.
+    :param directories: the number of directories with themes.
+    :param files: the number of files in each directory.
+    """
+    for parent in 'themes', '.git/objects':
+        for d in range(directories):
+            path = os.path.join(root, parent, 'd{}'.format(d))
+            os.makedirs(path)
+            for f in range(files):
+                extension = EXTENSIONS[f % 2] if f % 4 < 2 else '.txt'
+                name = 'f{}{}'.format(f, extension)
+                open(os.path.join(path, name), 'w').close()
+
+
+def find_with_rglob(root):
+    """Find themes the way they were found before scandir discovery.
+
+    :param root: a path to the root of the tree.
+    :returns: a list of paths to themes.
+    """
+    directory = Path(root)
+    return (
+        list(directory.rglob('*.Xresources')) +
+        list(directory.rglob('*.yaml'))
+    )
+
+
+def main(directories, files):
+    """Print durations of finding themes in several ways.
+
+    :param directories: the number of directories with themes.
+    :param files: the number of files in each directory.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, directories, files)
+        expected = len(find_files([root], EXTENSIONS)[0])
+        assert expected == directories * files // 2
+
+        candidates = [
+            ('rglob', lambda: find_with_rglob(root)),
+            ('scandir, 1 worker', lambda: find_files(
+                [root], EXTENSIONS, max_workers=1
+            )),
+            ('scandir, 4 workers', lambda: find_files(
+                [root], EXTENSIONS, max_workers=4
+            )),
+        ]
+        print('Directories: {}, files per directory: {}'.format(
+            directories, files
+        ))
+        for name, function in candidates:
+            timer = timeit.Timer(function)
+            number, _ = timer.autorange()
+            best = min(timer.repeat(5, number)) / number
+            print('{:<20}{:>12.2f} ms'.format(name, best * 1e3))
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    )
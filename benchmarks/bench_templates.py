@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Compare compiled templates with re-formatting templates on each use.
+
+Usage: python -m benchmarks.bench_templates [LINES]
+"""
+
+import re
+import sys
+import timeit
+
+from base16_theme_switcher.templates import CompiledTemplate
+
+NAMES = ['base0' + c for c in '0123456789ABCDEF']
+COLORS = {n: '#{0}{0}{0}'.format(n[-1] * 2) for n in NAMES}
+PATTERN = re.compile(r'\{(base0[0-9A-F])\}')
+
+
+def get_template(lines):
+    """Get a template with a placeholder and some text in each line.
+
+    :param lines: the number of lines of the template.
+    :returns: the text of the template.
+    """
+    return ''.join(
+        'option_{} = {{{}}}  # a comment\n'.format(i, NAMES[i % 16])
+        for i in range(lines)
+    )
+
+
+def main(lines):
+    """Print durations of rendering a template in several ways.
+
+    :param lines: the number of lines of the rendered template.
+    """
+    text = get_template(lines)
+    compiled = CompiledTemplate(text)
+    assert compiled.render(COLORS) == text.format(**COLORS)
+
+    candidates = [
+        ('str.format', lambda: text.format(**COLORS)),
+        ('re.sub', lambda: PATTERN.sub(lambda m: COLORS[m.group(1)], text)),
+        ('compile + render', lambda: CompiledTemplate(text).render(COLORS)),
+        ('render (cached)', lambda: compiled.render(COLORS)),
+    ]
+    print('Template lines: {}'.format(lines))
+    for name, function in candidates:
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(5, number)) / number
+        print('{:<20}{:>12.1f} us'.format(name, best * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -43,6 +43,11 @@ setup(
     author_email=email,
     url='https://github.com/piotr-rusin/base16-theme-switcher',
     packages=['base16_theme_switcher', 'test'],
+    entry_points={
+        'console_scripts': [
+            'base16-theme-switcher = base16_theme_switcher.__main__:main'
+        ]
+    },
     install_requires=install_requires,
     license=_license,
     classifiers=(
@@ -59,6 +64,7 @@ setup(
     keywords='themes theming base16',
     tests_require=tests_require,
     extras_require={
-        'test': tests_require
+        'test': tests_require,
+        'numpy': ['numpy']
     },
 )
@@ -1,31 +1,53 @@
 # -*- coding: utf-8 -*-
 """Tests for the application's root components."""
 
+import os
+import sys
+import tempfile
+import threading
 import unittest
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import ANY, Mock, MagicMock, PropertyMock, call, patch
 
 from parameterized import parameterized
 
+from base16_theme_switcher import metrics
 from base16_theme_switcher.app import (
     ConfigValueError,
+    DisplayThemeApplier,
     SetupError,
+    StreamingPrompt,
     ThemeApplier,
     ThemeSwitcher,
-    ThemeSwitcherBuilder
+    ThemeSwitcherBuilder,
+    XRDB_MERGE,
+    TwoPhaseThemeApplier,
+    run_deferred,
 )
+from base16_theme_switcher.plugin_loading import LazyPlugin
+from base16_theme_switcher.scheduling import DependencyCycleError
 
 
 class ThemeSwitcherBuilderTest(unittest.TestCase):
     """Tests for ThemeSwitcherBuilder class."""
 
     def setUp(self):
+        self.history_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            'latency-history-path': os.path.join(
+                self.history_dir.name, 'latency.json'
+            )
+        }
         self.config_mock = MagicMock()
+        self.config_mock.get.side_effect = self.config.get
         self.themes_mock = MagicMock()
         self.tested = ThemeSwitcherBuilder(
             self.config_mock,
             self.themes_mock
         )
 
+    def tearDown(self):
+        self.history_dir.cleanup()
+
     def test_init_raises_SetupError(self):
         """Test if empty themes parameter triggers the error."""
         with self.assertRaisesRegex(
@@ -42,6 +64,143 @@ class ThemeSwitcherBuilderTest(unittest.TestCase):
         ):
             self.tested.add_theme_applier(not_applier)
 
+    def test_build_raises_DependencyCycleError(self):
+        """Test if theme appliers depending on each other trigger the error."""
+        self.tested.add_theme_applier(
+            Mock(spec=ThemeApplier), 'first', ['second']
+        )
+        self.tested.add_theme_applier(
+            Mock(spec=ThemeApplier), 'second', ['first']
+        )
+        self.tested.prompt = Mock()
+        with self.assertRaisesRegex(
+            DependencyCycleError,
+            'Theme appliers depend on each other in a cycle: first, second.'
+        ):
+            self.tested.build()
+
+    def test_build_uses_theme_appliers_after_merging_resources(self):
+        """Test if theme appliers depend on the xrdb merge by default."""
+        order = []
+        merge_applier = Mock()
+        merge_applier.apply.side_effect = lambda t: order.append('merge')
+        theme_applier = Mock(spec=ThemeApplier)
+        theme_applier.apply.side_effect = lambda t: order.append('applier')
+        self.tested.add_theme_applier(theme_applier, cost=100)
+        self.tested.prompt = Mock()
+
+        with patch(
+            'base16_theme_switcher.app.XrdbMergeApplier.apply',
+            merge_applier.apply
+        ):
+            self.tested.build()._apply('example')
+
+        self.assertEqual(['merge', 'applier'], order)
+
+    def test_build_keeps_order_of_appliers_without_dependencies(self):
+        """Test if theme appliers are used in the order of registration."""
+        order = []
+        for name in 'first', 'second', 'third':
+            theme_applier = Mock(spec=ThemeApplier)
+            theme_applier.apply.side_effect = (
+                lambda t, n=name: order.append(n)
+            )
+            self.tested.add_theme_applier(theme_applier, cost=len(order))
+        costly_applier = Mock(spec=ThemeApplier)
+        costly_applier.apply.side_effect = lambda t: order.append('costly')
+        self.tested.add_theme_applier(costly_applier, cost=100)
+        self.tested.prompt = Mock()
+
+        with patch('base16_theme_switcher.app.XrdbMergeApplier.apply'):
+            self.tested.build()._apply('example')
+
+        self.assertEqual(['first', 'second', 'third', 'costly'], order)
+
+    def _get_lazy_plugin(self, roles, apply_to):
+        """Get a lazy plugin applying a module mock on activation.
+
+        :param roles: roles declared by the plugin.
+        :param apply_to: a function applying the plugin module.
+        :returns: the lazy plugin.
+        """
+        plugin = LazyPlugin('lazy', 'b16ts_lazy', roles)
+        module = Mock(apply_to=Mock(side_effect=apply_to))
+        importlib_patcher = patch(
+            'base16_theme_switcher.plugin_loading.importlib'
+        )
+        importlib_mock = importlib_patcher.start()
+        self.addCleanup(importlib_patcher.stop)
+        importlib_mock.import_module.return_value = module
+        self.import_mock = importlib_mock.import_module
+        return plugin
+
+    def test_lazy_prompt_activates_plugin_on_first_call(self):
+        """Test if a prompt plugin is imported only when prompting."""
+        real_prompt = Mock(return_value='example')
+
+        def apply_to(plugin_api_impl):
+            plugin_api_impl.prompt = real_prompt
+
+        self.tested.add_lazy_plugin(self._get_lazy_plugin(
+            ['prompt'], apply_to
+        ))
+        self.import_mock.assert_not_called()
+
+        self.assertEqual('example', self.tested.prompt())
+        self.assertEqual('example', self.tested.prompt())
+        self.import_mock.assert_called_once_with('b16ts_lazy')
+
+    def test_lazy_streaming_prompt_uses_prompt_of_plugin(self):
+        """Test if a streaming prompt plugin is used when prompting."""
+        real_prompt = StreamingPromptStub('example')
+
+        def apply_to(plugin_api_impl):
+            plugin_api_impl.prompt = real_prompt
+
+        self.tested.add_lazy_plugin(self._get_lazy_plugin(
+            ['streaming-prompt'], apply_to
+        ))
+
+        self.assertIsInstance(self.tested.prompt, StreamingPrompt)
+        self.import_mock.assert_not_called()
+        self.assertEqual(
+            'example', self.tested.prompt.prompt_from(iter(['a']))
+        )
+        self.assertEqual(['a'], real_prompt.names)
+
+    def test_lazy_applier_uses_theme_appliers_of_plugin(self):
+        """Test if a lazy applier uses appliers added by the plugin."""
+        theme_appliers = [Mock(spec=ThemeApplier) for _ in range(2)]
+
+        def apply_to(plugin_api_impl):
+            for theme_applier in theme_appliers:
+                plugin_api_impl.add_theme_applier(theme_applier)
+
+        self.tested.add_lazy_plugin(self._get_lazy_plugin(
+            ['applier'], apply_to
+        ))
+        self.tested.prompt = Mock()
+        tested_switcher = self.tested.build()
+        self.import_mock.assert_not_called()
+
+        with patch('base16_theme_switcher.app.XrdbMergeApplier.apply'):
+            tested_switcher._apply('example')
+
+        for theme_applier in theme_appliers:
+            theme_applier.apply.assert_called_once_with(ANY)
+
+    @parameterized.expand([
+        ('unknown', ['prompt', 'unknown']),
+        ('none', [])
+    ])
+    def test_add_lazy_plugin_raises_SetupError(self, _, roles):
+        """Test if unsupported roles of a plugin trigger the error.
+
+        :param roles: roles declared by the plugin.
+        """
+        with self.assertRaisesRegex(SetupError, 'unsupported roles'):
+            self.tested.add_lazy_plugin(LazyPlugin('lazy', 'lazy', roles))
+
     def test_prompt_setter_raises_SetupError(self):
         """Test if re-assigning a prompt triggers the error."""
         self.tested.prompt = Mock()
@@ -75,6 +234,74 @@ class ThemeSwitcherBuilderTest(unittest.TestCase):
         ):
             ThemeSwitcherBuilder.from_('/home/example/.config/b16ts/conf.yaml')
 
+    @parameterized.expand([
+        ('probed', {}, 1, 0),
+        ('duplicates_detected', {'detect-duplicate-themes': True}, 0, 1)
+    ])
+    @patch('base16_theme_switcher.app.find_themes')
+    @patch('base16_theme_switcher.app.probe_theme')
+    @patch('base16_theme_switcher.app.YamlConfigPath')
+    def test_from_probes_named_theme(
+            self, _, options, probe_count, find_count, ycp_class, probe_mock,
+            find_mock
+    ):
+        """Test if a named theme is probed for instead of a search.
+
+        :param options: configuration options.
+        :param probe_count: the expected number of probes.
+        :param find_count: the expected number of searches for themes.
+        """
+        ycp_class.get_config_mapping.return_value = options
+
+        ThemeSwitcherBuilder.from_('conf.yaml', 'probed')
+
+        self.assertEqual(probe_count, probe_mock.call_count)
+        self.assertEqual(find_count, find_mock.call_count)
+
+    @patch('base16_theme_switcher.app.load_theme_names')
+    @patch('base16_theme_switcher.app.find_themes')
+    @patch('base16_theme_switcher.app.YamlConfigPath')
+    def test_from_streams_themes_found_in_background(
+            self, ycp_class, find_mock, load_mock
+    ):
+        """Test if themes are searched for while a prompt is shown."""
+        ycp_class.get_config_mapping.return_value = self.config_mock
+        load_mock.return_value = ['cached']
+        find_mock.side_effect = lambda config, on_found: (
+            on_found(['/themes/new.yaml']) or
+            {'new': theme_mock('new')}
+        )
+        prompt = StreamingPromptStub('new')
+
+        builder = ThemeSwitcherBuilder.from_('conf.yaml', in_background=True)
+        builder.prompt = prompt
+
+        self.assertEqual('new', builder.build()._call_prompt())
+        self.assertEqual(
+            [('cached', True), ('new', True), ('cached', False)],
+            prompt.names
+        )
+        find_mock.assert_called_once_with(self.config_mock, ANY)
+
+
+class StreamingPromptStub:
+    """A streaming prompt choosing a given theme."""
+
+    def __init__(self, choice):
+        self.choice = choice
+        self.names = None
+
+    def prompt_from(self, theme_names, **kwargs):
+        self.names = list(theme_names)
+        return self.choice
+
+
+class DisplayThemeApplierStub(DisplayThemeApplier):
+    """A display-scoped theme applier doing nothing."""
+
+    def apply_to_display(self, theme, display):
+        pass
+
 
 def theme_mock(name):
     """Get a mock object representing a theme.
@@ -83,6 +310,7 @@ def theme_mock(name):
     """
     theme = Mock()
     theme.name = name
+    theme.snapshot.return_value = theme
     return theme
 
 
@@ -99,10 +327,59 @@ def get_command_args_mock(theme_name):
     command_args = Mock()
     command_args.reload = False
     command_args.theme = theme_name
+    command_args.all_displays = False
+    command_args.displays = None
+    command_args.display_jobs = 4
 
     return command_args
 
 
+class TwoPhaseThemeApplierStub(TwoPhaseThemeApplier):
+    """A two-phase theme applier preparing a mock change."""
+
+    def __init__(self):
+        self.change = Mock()
+
+    def prepare(self, theme):
+        return self.change
+
+
+class TwoPhaseThemeApplierTest(unittest.TestCase):
+    """Tests for TwoPhaseThemeApplier class."""
+
+    def test_apply_commits_prepared_change(self):
+        """Test if applying a theme commits its prepared change."""
+        tested = TwoPhaseThemeApplierStub()
+
+        tested.apply(Mock())
+
+        tested.change.commit.assert_called_once_with()
+        tested.change.abort.assert_not_called()
+
+    def test_apply_aborts_change_failed_to_commit(self):
+        """Test if a change is aborted if committing it fails."""
+        tested = TwoPhaseThemeApplierStub()
+        tested.change.commit.side_effect = OSError
+
+        with self.assertRaises(OSError):
+            tested.apply(Mock())
+
+        tested.change.abort.assert_called_once_with()
+
+    def test_is_subclass_of_class_with_prepare(self):
+        """Test if classes with prepare method are recognized."""
+        class Applier:
+            def apply(self, theme):
+                pass
+
+            def prepare(self, theme):
+                pass
+
+        self.assertTrue(issubclass(Applier, TwoPhaseThemeApplier))
+        self.assertFalse(issubclass(DisplayThemeApplierStub,
+                                    TwoPhaseThemeApplier))
+
+
 class ThemeSwitcherTest(unittest.TestCase):
     """Tests for ThemeSwitcher class."""
 
@@ -112,6 +389,9 @@ class ThemeSwitcherTest(unittest.TestCase):
         name_to_theme = {t.name: t for t in self.themes}
         themes_param_mock = MagicMock()
         themes_param_mock.__getitem__.side_effect = name_to_theme.__getitem__
+        themes_param_mock.__contains__.side_effect = (
+            name_to_theme.__contains__
+        )
         themes_param_mock.sorted_by_name = [
             name_to_theme[n] for n in theme_names
         ]
@@ -120,12 +400,20 @@ class ThemeSwitcherTest(unittest.TestCase):
         self.config_mock = MagicMock()
         self.config_mock.__getitem__.side_effect = self.config.__getitem__
         self.config_mock.get.side_effect = self.config.get
+        self.config_mock.__contains__.side_effect = self.config.__contains__
 
+        self.themes_param_mock = themes_param_mock
+        merge_patcher = patch('base16_theme_switcher.app.XrdbMergeApplier')
+        self.merge_applier_mock = merge_patcher.start().return_value
+        self.addCleanup(merge_patcher.stop)
         self.theme_applier_mocks = [Mock() for _ in range(3)]
         self.prompt_mock = Mock()
-        self.tested = ThemeSwitcher(
+        self.tested = self._create_tested()
+
+    def _create_tested(self):
+        return ThemeSwitcher(
             self.config_mock,
-            themes_param_mock,
+            self.themes_param_mock,
             self.theme_applier_mocks,
             self.prompt_mock
         )
@@ -169,6 +457,21 @@ class ThemeSwitcherTest(unittest.TestCase):
         for m in self.theme_applier_mocks:
             m.apply.assert_called_once_with(theme)
 
+    def test_current_theme_name_doesnt_sort_themes_if_configured(self):
+        """Test if the configured name is returned without the themes."""
+        type(self.themes_param_mock).sorted_by_name = PropertyMock(
+            side_effect=AssertionError('Themes were sorted.')
+        )
+
+        self.assertEqual('first', self.tested.current_theme_name)
+
+    def test_current_theme_name_returns_first_theme_if_not_configured(self):
+        """Test if the first theme by name is used by default."""
+        del self.config['theme']
+        self.themes_param_mock.sorted_by_name.reverse()
+
+        self.assertEqual('third', self.tested.current_theme_name)
+
     @parameterized.expand([
         ('sets_a_theme', assert_was_set),
         ('applies_a_theme', assert_was_applied)
@@ -181,6 +484,137 @@ class ThemeSwitcherTest(unittest.TestCase):
 
         assertion(self, theme)
 
+    def test_current_theme_name_setter_merges_resources_first(self):
+        """Test if a sequence of appliers is used after the xrdb merge."""
+        order = []
+        self.merge_applier_mock.apply.side_effect = (
+            lambda t: order.append('merge')
+        )
+        for i, m in enumerate(self.theme_applier_mocks):
+            m.apply.side_effect = lambda t, i=i: order.append(i)
+
+        self.tested.current_theme_name = self.themes[0].name
+
+        self.assertEqual(['merge', 0, 1, 2], order)
+
+    def test_current_theme_name_setter_applies_snapshot(self):
+        """Test if theme appliers share a snapshot of the theme."""
+        theme = self.themes[1]
+        snapshot = theme_mock(theme.name)
+        theme.snapshot.return_value = snapshot
+
+        self.tested.current_theme_name = theme.name
+
+        for m in self.theme_applier_mocks:
+            m.apply.assert_called_once_with(snapshot)
+
+    def _create_tested_with_slow_applier(self):
+        """Create a theme switcher whose second applier is too slow.
+
+        The theme appliers are used one after another, so all appliers
+        after the slow one depend on it.
+
+        :returns: the theme switcher and its latency store.
+        """
+        latency_store = Mock()
+        latency_store.percentile.side_effect = (
+            lambda name, q: 500 if name == '1' else 10
+        )
+        tested = ThemeSwitcher(
+            self.config_mock,
+            self.themes_param_mock,
+            self.theme_applier_mocks,
+            self.prompt_mock,
+            latency_store,
+            latency_budget=100
+        )
+        return tested, latency_store
+
+    @patch('base16_theme_switcher.app.subprocess.Popen')
+    def test_current_theme_name_setter_defers_slow_appliers(self, popen):
+        """Test if slow appliers and their dependents are deferred."""
+        tested, latency_store = self._create_tested_with_slow_applier()
+        tested.background_args = ['--config', 'config.yml']
+        theme = self.themes[0]
+
+        tested.current_theme_name = theme.name
+
+        self.theme_applier_mocks[0].apply.assert_called_once_with(theme)
+        for m in self.theme_applier_mocks[1:]:
+            m.apply.assert_not_called()
+        popen.assert_called_once_with(
+            [
+                sys.executable, '-m', 'base16_theme_switcher.deferred',
+                '--config', 'config.yml', '--skip', XRDB_MERGE, '--skip', '0',
+                '--', theme.name
+            ],
+            stdin=ANY, stdout=ANY, stderr=ANY, start_new_session=True
+        )
+        self.assertEqual(
+            [call(XRDB_MERGE, ANY), call('0', ANY)],
+            latency_store.record.mock_calls
+        )
+        latency_store.save.assert_called_once_with()
+
+    @patch('base16_theme_switcher.app.subprocess.Popen')
+    def test_deferred_appliers_run_in_process_without_background_args(
+            self, popen
+    ):
+        """Test if appliers are used after the others as a fallback."""
+        tested, _ = self._create_tested_with_slow_applier()
+
+        tested.current_theme_name = self.themes[0].name
+
+        for m in self.theme_applier_mocks:
+            m.apply.assert_called_once_with(self.themes[0])
+        popen.assert_not_called()
+
+    def test_apply_deferred_skips_used_appliers(self):
+        """Test if only appliers that weren't used are used."""
+        self.config['theme'] = 'second'
+
+        self.tested.apply_deferred('second', [XRDB_MERGE, '0'])
+
+        self.merge_applier_mock.apply.assert_not_called()
+        self.theme_applier_mocks[0].apply.assert_not_called()
+        for m in self.theme_applier_mocks[1:]:
+            m.apply.assert_called_once_with(self.themes[1])
+
+    def test_apply_deferred_skips_theme_that_is_no_longer_set(self):
+        """Test if appliers aren't used after another theme was set."""
+        self.tested.apply_deferred('second', [XRDB_MERGE, '0'])
+
+        for m in self.theme_applier_mocks:
+            m.apply.assert_not_called()
+
+    def test_apply_deferred_uses_appliers_exclusively(self):
+        """Test if appliers are used while holding the switch lock."""
+        coordinator_mock = Mock()
+        coordinator_mock.run_exclusively.side_effect = (
+            lambda action, h, v: action() or True
+        )
+        self.tested._switch_coordinator = coordinator_mock
+
+        self.tested.apply_deferred('first', [XRDB_MERGE, '0'])
+
+        coordinator_mock.run_exclusively.assert_called_once_with(
+            ANY, ANY, ANY
+        )
+        for m in self.theme_applier_mocks[1:]:
+            m.apply.assert_called_once_with(self.themes[0])
+
+    def test_apply_deferred_skips_superseded_theme(self):
+        """Test if a theme waiting to be set supersedes the appliers."""
+        coordinator_mock = Mock()
+        coordinator_mock.run_exclusively.return_value = False
+        self.tested._switch_coordinator = coordinator_mock
+
+        with self.assertLogs('base16_theme_switcher.app', 'INFO'):
+            self.tested.apply_deferred('first', [XRDB_MERGE, '0'])
+
+        for m in self.theme_applier_mocks:
+            m.apply.assert_not_called()
+
     def test_current_theme_name_setter_raises_KeyError(self):
         """Test if the error is raised for an unknown theme."""
         name = 'unknown-theme'
@@ -199,9 +633,50 @@ class ThemeSwitcherTest(unittest.TestCase):
         """Test if an already set theme is applied."""
         self._test_reloads_configured_theme(self.tested.reload)
 
+    def test_main_sets_background_args(self):
+        """Test if deferred appliers would get the same configuration."""
+        command_args = get_command_args_mock(self.themes[1].name)
+        command_args.config = 'config.yml'
+        command_args.log = 'latest.log'
+        command_args.verbose = False
+
+        self.tested.main(command_args)
+
+        self.assertEqual(
+            ['--config', 'config.yml', '--log', 'latest.log'],
+            self.tested.background_args
+        )
+
     def test_main_reloads_a_theme(self):
         """Test if an already set theme is applied."""
-        self._test_reloads_configured_theme(self.tested.main, Mock())
+        command_args = get_command_args_mock(None)
+        command_args.reload = True
+        self._test_reloads_configured_theme(self.tested.main, command_args)
+
+    @patch('base16_theme_switcher.app.apply_to_displays')
+    def test_main_applies_theme_to_displays(self, apply_to_displays_mock):
+        """Test if a theme is applied to each of requested displays.
+
+        Display-scoped theme appliers are expected to be passed on to
+        be used for each display, while the others are expected to be
+        used once.
+        """
+        display_applier = DisplayThemeApplierStub()
+        self.theme_applier_mocks.append(display_applier)
+        self.tested = self._create_tested()
+        theme = self.themes[0]
+        displays = [':0', ':1']
+        command_args = get_command_args_mock(theme.name)
+        command_args.displays = displays
+        command_args.display_jobs = 2
+
+        self.tested.main(command_args)
+
+        apply_to_displays_mock.assert_called_once_with(
+            theme, displays, [display_applier], 2
+        )
+        for m in self.theme_applier_mocks[:-1]:
+            m.apply.assert_called_once_with(theme)
 
     @parameterized.expand([
         ['sets_theme_from_prompt'],
@@ -232,3 +707,155 @@ class ThemeSwitcherTest(unittest.TestCase):
         if name_suffix.startswith('sets'):
             assertion = self.assert_was_set
         assertion(theme)
+
+    def configure_preview(self):
+        """Enable previews and let only the first theme applier support
+        them."""
+        self.config.update({'preview-themes': True, 'preview-delay': 0})
+        for i, m in enumerate(self.theme_applier_mocks):
+            m.supports_preview = i == 0
+
+    def test_main_previews_themes_selected_in_prompt(self):
+        """Test if themes are previewed only with supporting appliers."""
+        self.configure_preview()
+        applied = threading.Event()
+        self.theme_applier_mocks[0].apply.side_effect = (
+            lambda t: applied.set()
+        )
+
+        def prompt(preview):
+            preview.select(self.themes[1].name)
+            self.assertTrue(applied.wait(5))
+            return self.themes[2].name
+
+        self.prompt_mock.side_effect = prompt
+
+        self.tested.main(get_command_args_mock(None))
+
+        self.assertEqual(
+            [call(self.themes[1]), call(self.themes[2])],
+            self.theme_applier_mocks[0].apply.mock_calls
+        )
+        for m in self.theme_applier_mocks[1:]:
+            m.apply.assert_called_once_with(self.themes[2])
+        self.assert_was_set(self.themes[2])
+
+    def test_main_restores_theme_if_none_was_chosen(self):
+        """Test if a cancelled prompt restores the configured theme."""
+        self.configure_preview()
+        applied = threading.Event()
+        self.theme_applier_mocks[0].apply.side_effect = (
+            lambda t: applied.set()
+        )
+
+        def prompt(preview):
+            preview.select(self.themes[1].name)
+            self.assertTrue(applied.wait(5))
+            return None
+
+        self.prompt_mock.side_effect = prompt
+
+        self.tested.main(get_command_args_mock(None))
+
+        self.assertEqual(
+            [call(self.themes[1]), call(self.themes[0])],
+            self.theme_applier_mocks[0].apply.mock_calls
+        )
+        for m in self.theme_applier_mocks[1:]:
+            m.apply.assert_not_called()
+        self.config_mock.__setitem__.assert_not_called()
+        self.config_mock.save.assert_not_called()
+
+    def test_switch_to_leaves_theme_to_switching_process(self):
+        """Test if a theme isn't set while another process switches."""
+        coordinator_mock = Mock()
+        coordinator_mock.submit.return_value = False
+        self.tested._switch_coordinator = coordinator_mock
+
+        self.tested.switch_to(self.themes[1].name)
+
+        coordinator_mock.submit.assert_called_once_with(
+            self.themes[1].name, ANY, ANY
+        )
+        self.config_mock.__setitem__.assert_not_called()
+
+    def test_switch_to_sets_theme_through_coordinator(self):
+        """Test if a theme is set by a handler of a coordinator."""
+        coordinator_mock = Mock()
+        coordinator_mock.submit.side_effect = lambda n, h, v: h(n)
+        self.tested._switch_coordinator = coordinator_mock
+
+        self.tested.switch_to(self.themes[1].name)
+
+        self.assert_was_set(self.themes[1])
+
+    def test_switch_to_rejects_unknown_pending_names(self):
+        """Test if names left by other processes are validated."""
+        coordinator_mock = Mock()
+        coordinator_mock.submit.return_value = False
+        self.tested._switch_coordinator = coordinator_mock
+
+        self.tested.switch_to(self.themes[1].name)
+
+        validate = coordinator_mock.submit.call_args[0][2]
+        self.assertEqual(
+            (True, False, False),
+            (validate(self.themes[0].name), validate('unknown'),
+             validate(['list']))
+        )
+
+
+class RunDeferredTest(unittest.TestCase):
+    """Tests for run_deferred function."""
+
+    def setUp(self):
+        self.patchers = {
+            name: patch('base16_theme_switcher.app.' + name)
+            for name in (
+                'ThemeSwitcherBuilder', 'apply_configured_prefixed_plugins',
+                'configure_b16ts_root_logger', 'save_metrics'
+            )
+        }
+        self.mocks = {n: p.start() for n, p in self.patchers.items()}
+        for patcher in self.patchers.values():
+            self.addCleanup(patcher.stop)
+        collected_patcher = patch.object(
+            metrics, 'collected', metrics.Metrics()
+        )
+        self.collected = collected_patcher.start()
+        self.addCleanup(collected_patcher.stop)
+        self.switcher = self.mocks[
+            'ThemeSwitcherBuilder'
+        ].from_.return_value.build.return_value
+
+    def get_counters(self):
+        """Get counters collected by the tested function.
+
+        :returns: a mapping of keys of the counters to their values.
+        """
+        return self.collected.add_to({})['counters']
+
+    def test_applies_deferred_appliers(self):
+        """Test if the switcher uses appliers that weren't used."""
+        run_deferred('config.yml', 'latest.log', False, 'ocean', ['0'])
+
+        self.mocks['ThemeSwitcherBuilder'].from_.assert_called_once_with(
+            'config.yml', 'ocean'
+        )
+        self.switcher.apply_deferred.assert_called_once_with('ocean', ['0'])
+        self.mocks['save_metrics'].assert_called_once_with('config.yml')
+        self.assertEqual(
+            {'b16ts_runs_total{command="deferred"}': 1}, self.get_counters()
+        )
+
+    def test_logs_errors_and_saves_metrics(self):
+        """Test if a failure is counted instead of being raised."""
+        self.switcher.apply_deferred.side_effect = OSError
+
+        with self.assertLogs('base16_theme_switcher.app', 'ERROR'):
+            run_deferred('config.yml', 'latest.log', False, 'ocean', [])
+
+        self.mocks['save_metrics'].assert_called_once_with('config.yml')
+        self.assertEqual(
+            1, self.get_counters()['b16ts_failures_total{exception="OSError"}']
+        )
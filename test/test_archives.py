@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Tests for reading themes from archives."""
+
+import io
+import os
+import tarfile
+import zipfile
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.archives import ArchiveMember, resolve_path
+from base16_theme_switcher.config_structures import ConfiguredPathError
+from base16_theme_switcher.schemes import COLOR_NAMES, to_xresources
+from base16_theme_switcher.themes import (
+    Base16SchemeTheme,
+    Base16Theme,
+    Base16ThemeNameMap,
+)
+
+from .test_schemes import SchemeFileTestCase, get_scheme_text
+
+COLORS = {n: '#{0}{0}{0}'.format(n[-1].lower() * 2) for n in COLOR_NAMES}
+
+MEMBERS = {
+    'themes/dark.yaml': get_scheme_text([v[1:] for v in COLORS.values()]),
+    'themes/xresources/light.Xresources': to_xresources(COLORS),
+    'README.md': 'Themes.\n'
+}
+
+
+class ArchiveTestCase(SchemeFileTestCase):
+    """A base for tests using archives of themes."""
+
+    def write_archive(self, name):
+        """Write an archive containing theme files.
+
+        :param name: a name of the archive, with an extension of
+            a supported format.
+        :returns: a path to the archive.
+        """
+        path = os.path.join(self.dir.name, name)
+        if name.endswith('.zip'):
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as f:
+                for member, text in MEMBERS.items():
+                    f.writestr(member, text)
+            return path
+        mode = 'w:' + name.rpartition('.tar')[2].lstrip('.')
+        with tarfile.open(path, mode) as f:
+            for member, text in MEMBERS.items():
+                data = text.encode('utf-8')
+                info = tarfile.TarInfo('./' + member)
+                info.size = len(data)
+                f.addfile(info, io.BytesIO(data))
+        return path
+
+
+class FindThemesInArchiveTest(ArchiveTestCase):
+    """Tests for finding themes in archives."""
+
+    @parameterized.expand([
+        ('zip', 'themes.zip'),
+        ('tar', 'themes.tar'),
+        ('tar_gz', 'themes.tar.gz'),
+        ('tar_xz', 'themes.tar.xz')
+    ])
+    def test_finds_themes(self, _, name):
+        """Test if themes are found and read from an archive.
+
+        :param name: a name of the archive.
+        """
+        themes = Base16ThemeNameMap.from_unique_in(self.write_archive(name))
+
+        self.assertEqual(['dark', 'light'], sorted(themes))
+        self.assertIsInstance(themes['dark'], Base16SchemeTheme)
+        self.assertEqual(COLORS['base0D'], themes['dark']['base0D'])
+        self.assertEqual(COLORS['base03'], themes['light']['base03'])
+
+    def test_raises_error_for_invalid_archive(self):
+        """Test if an invalid archive is reported as a path error."""
+        path = self.write('themes.zip', 'not an archive')
+
+        with self.assertRaises(ConfiguredPathError):
+            Base16ThemeNameMap.from_unique_in(path)
+
+    def test_reads_only_requested_zip_member(self):
+        """Test if other members of a zip archive are not read again.
+
+        Scheme files are read when themes are found, to leave out YAML
+        files that aren't schemes, and .Xresources files are read when
+        they are used.
+        """
+        themes = Base16ThemeNameMap.from_unique_in(
+            self.write_archive('themes.zip')
+        )
+
+        with patch.object(
+                zipfile.ZipFile, 'read', wraps=themes['light'].path.archive
+                ._file.read
+        ) as read_mock:
+            themes['dark'].content
+            themes['light'].content
+
+        read_mock.assert_called_once_with(
+            'themes/xresources/light.Xresources'
+        )
+
+
+class ResolvePathTest(ArchiveTestCase):
+    """Tests for resolve_path function."""
+
+    def test_resolves_archive_member(self):
+        """Test if a path to a file in an archive is resolved."""
+        path = os.path.join(
+            self.write_archive('themes.tar.gz'), 'themes/dark.yaml'
+        )
+
+        resolved = resolve_path(path)
+
+        self.assertIsInstance(resolved, ArchiveMember)
+        self.assertEqual(path, str(resolved))
+
+    def test_creates_theme_from_archive_member(self):
+        """Test if a theme is created for a path to an archived file."""
+        path = os.path.join(
+            self.write_archive('themes.zip'),
+            'themes/xresources/light.Xresources'
+        )
+
+        theme = Base16Theme.from_(path)
+
+        self.assertEqual('light', theme.name)
+        self.assertEqual(COLORS['base00'], theme['base00'])
+
+    def test_keeps_other_paths(self):
+        """Test if a path to a regular file isn't changed."""
+        path = self.write('dark.yaml', get_scheme_text())
+
+        self.assertEqual(path, str(resolve_path(path)))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tests for representations of theme colors."""
+
+import unittest
+
+from parameterized import parameterized
+
+from base16_theme_switcher import colors
+from base16_theme_switcher.colors import DerivedColors
+
+NAMES = ['base0' + c for c in '0123456789ABCDEF']
+HEX_VALUES = [
+    '#000000', '#ffffff', '#ff0000', '#00ff00',
+    '#0000ff', '#808080', '#ffff00', '#00ffff',
+    '#ff00ff', '#282828', '#d8d8d8', '#ab4642',
+    '#dc9656', '#a1b56c', '#7cafc2', '#ba8baf'
+]
+
+
+class DerivedColorsTest(unittest.TestCase):
+    """Tests for DerivedColors class."""
+
+    def setUp(self):
+        self.tested = DerivedColors.from_hex(
+            NAMES, HEX_VALUES, use_numpy=False
+        )
+
+    @parameterized.expand([
+        ('base00', (0, 0, 0)),
+        ('base0B', (171, 70, 66)),
+        ('base0F', (186, 139, 175))
+    ])
+    def test_rgb(self, name, expected):
+        """Test if the expected RGB representation is returned.
+
+        :param name: a name of a color.
+        :param expected: the expected representation.
+        """
+        self.assertEqual(expected, self.tested.rgb(name))
+
+    @parameterized.expand([
+        ('base01', (0, 0, 1)),
+        ('base02', (0, 1, 0.5)),
+        ('base04', (240, 1, 0.5)),
+        ('base05', (0, 0, 128 / 255))
+    ])
+    def test_hsl(self, name, expected):
+        """Test if the expected HSL representation is returned.
+
+        :param name: a name of a color.
+        :param expected: the expected representation.
+        """
+        for e, a in zip(expected, self.tested.hsl(name)):
+            self.assertAlmostEqual(e, a)
+
+    @parameterized.expand([
+        ('base00', 16),
+        ('base01', 231),
+        ('base02', 196),
+        ('base05', 244),
+        ('base09', 235)
+    ])
+    def test_xterm256(self, name, expected):
+        """Test if the index of the nearest xterm color is returned.
+
+        :param name: a name of a color.
+        :param expected: the expected index.
+        """
+        self.assertEqual(expected, self.tested.xterm256(name))
+
+    def test_rgb_raises_KeyError(self):
+        """Test if the error is raised for an unknown color."""
+        with self.assertRaises(KeyError):
+            self.tested.rgb('base10')
+
+    def test_from_bytes_restores_representations(self):
+        """Test if the binary representation preserves all values."""
+        restored = DerivedColors.from_bytes(NAMES, self.tested.to_bytes())
+
+        for n in NAMES:
+            self.assertEqual(self.tested.rgb(n), restored.rgb(n))
+            self.assertEqual(self.tested.xterm256(n), restored.xterm256(n))
+            self.assertEqual(self.tested.hsl(n), restored.hsl(n))
+
+    @unittest.skipIf(colors.numpy is None, 'NumPy is not available.')
+    def test_from_hex_with_numpy_matches_pure_python(self):
+        """Test if both implementations give the same results."""
+        vectorized = DerivedColors.from_hex(NAMES, HEX_VALUES)
+
+        for n in NAMES:
+            self.assertEqual(self.tested.rgb(n), vectorized.rgb(n))
+            self.assertEqual(self.tested.xterm256(n), vectorized.xterm256(n))
+            for e, a in zip(self.tested.hsl(n), vectorized.hsl(n)):
+                self.assertAlmostEqual(e, a)
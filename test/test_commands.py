@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import unittest
+from unittest.mock import Mock
+
+from parameterized import parameterized
+
+from base16_theme_switcher import commands
+from base16_theme_switcher.commands import SpawnHelper
+
+
+class RunTest(unittest.TestCase):
+    """Tests for run function."""
+
+    def setUp(self):
+        self.listener = Mock()
+        commands.add_listener(self.listener)
+
+    def tearDown(self):
+        commands.remove_listener(self.listener)
+
+    def test_returns_exit_status(self):
+        """Test if the exit status of the command is returned."""
+        result = commands.run(['sh', '-c', 'exit 3'])
+
+        self.assertEqual(3, result.returncode)
+        self.assertIsNone(result.stdout)
+
+    def test_passes_arguments_without_shell(self):
+        """Test if arguments are not interpreted by a shell."""
+        result = commands.run(
+            ['echo', '$HOME; "quoted"'], capture_output=True
+        )
+
+        self.assertEqual('$HOME; "quoted"\n', result.stdout)
+
+    def test_passes_input(self):
+        """Test if the input is passed to the command."""
+        result = commands.run(['cat'], input='text', capture_output=True)
+
+        self.assertEqual('text', result.stdout)
+
+    def test_raises_error_for_failure_if_checked(self):
+        """Test if CalledProcessError is raised for a failed command."""
+        with self.assertRaises(subprocess.CalledProcessError):
+            commands.run(['false'], check=True)
+
+    def test_notifies_listeners(self):
+        """Test if listeners receive the result of the command."""
+        result = commands.run(['true'])
+
+        self.listener.assert_called_once_with(result)
+        self.assertEqual(['true'], result.args)
+        self.assertGreaterEqual(result.duration, 0)
+
+    def test_notifies_listeners_about_missing_command(self):
+        """Test if listeners are notified about a command not found."""
+        with self.assertRaises(OSError):
+            commands.run(['b16ts-missing-command'])
+
+        result = self.listener.call_args[0][0]
+        self.assertIsNone(result.returncode)
+
+
+class SpawnHelperTest(unittest.TestCase):
+    """Tests for SpawnHelper class."""
+
+    def setUp(self):
+        self.tested = SpawnHelper()
+        self.tested.start()
+        commands.use_spawn_helper(self.tested)
+
+    def tearDown(self):
+        commands.use_spawn_helper(None)
+        self.tested.close()
+
+    @parameterized.expand([
+        ('success', ['true'], 0),
+        ('failure', ['sh', '-c', 'exit 3'], 3)
+    ])
+    def test_returns_exit_status(self, _, args, expected):
+        """Test if the exit status of a command is returned.
+
+        :param args: arguments of the command.
+        :param expected: the expected exit status.
+        """
+        self.assertEqual(expected, commands.run(args).returncode)
+
+    def test_returns_captured_output(self):
+        """Test if output and input of the command are passed."""
+        result = commands.run(['cat'], input='text', capture_output=True)
+
+        self.assertEqual('text', result.stdout)
+
+    def test_keeps_protocol_intact_for_uncaptured_output(self):
+        """Test if output not captured doesn't corrupt messages."""
+        commands.run(['echo', 'noise'])
+
+        self.assertEqual(0, commands.run(['true']).returncode)
+
+    def test_raises_error_of_helper(self):
+        """Test if an error of executing a command is raised."""
+        with self.assertRaises(OSError):
+            commands.run(['b16ts-missing-command'])
+
+    def test_raises_error_when_closed(self):
+        """Test if OSError is raised after the helper is stopped."""
+        self.tested.close()
+
+        with self.assertRaises(OSError):
+            commands.run(['true'])
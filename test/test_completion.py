@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Tests for completing names of themes in shells."""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.completion import (
+    SCRIPTS,
+    complete,
+    get_theme_search_paths,
+    main,
+    save_theme_names,
+    scan_theme_names,
+)
+
+
+class CompletionTestCase(unittest.TestCase):
+    """A base for tests using a temporary directory."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.names_path = os.path.join(self.dir.name, 'cache', 'names')
+        self.config_path = os.path.join(self.dir.name, 'config.yml')
+        self.theme_dir = os.path.join(self.dir.name, 'themes')
+        for name in ('a/monokai.Xresources', 'b/mocha.yaml',
+                     'b/c/ocean.Xresources', 'README.md'):
+            path = os.path.join(self.theme_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+        with open(self.config_path, 'w') as f:
+            f.write(
+                'theme: ocean\n'
+                'theme-search-dir-path: "{}"\n'.format(self.theme_dir)
+            )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+class CompleteTest(CompletionTestCase):
+    """Tests for complete function."""
+
+    @parameterized.expand([
+        ('', ['default-dark', 'mocha', 'monokai', 'ocean']),
+        ('mo', ['mocha', 'monokai']),
+        ('mon', ['monokai']),
+        ('x', [])
+    ])
+    def test_returns_saved_names_starting_with(self, prefix, expected):
+        """Test if names are taken from the saved list.
+
+        :param prefix: a prefix of names.
+        :param expected: the expected names.
+        """
+        save_theme_names(
+            ['ocean', 'monokai', 'mocha', 'default-dark'], self.names_path
+        )
+        actual = complete(prefix, self.names_path, self.config_path)
+        self.assertEqual(expected, actual)
+
+    def test_scans_theme_directory_without_saved_names(self):
+        """Test if the theme directory is scanned as a fallback."""
+        actual = complete('mo', self.names_path, self.config_path)
+        self.assertEqual(['mocha', 'monokai'], actual)
+
+    def test_scans_all_configured_directories(self):
+        """Test if names are found in each of several directories."""
+        other_dir = os.path.join(self.dir.name, 'other')
+        os.makedirs(other_dir)
+        open(os.path.join(other_dir, 'mint.yaml'), 'w').close()
+        with open(self.config_path, 'w') as f:
+            f.write('theme-search-dir-path: ["{}", "{}"]\n'.format(
+                self.theme_dir, other_dir
+            ))
+
+        actual = complete('m', self.names_path, self.config_path)
+        self.assertEqual(['mint', 'mocha', 'monokai'], actual)
+
+    def test_returns_nothing_without_configuration(self):
+        """Test if no names are returned if themes can't be found."""
+        actual = complete('', self.names_path, self.names_path)
+        self.assertEqual([], actual)
+
+
+class GetThemeSearchPathsTest(CompletionTestCase):
+    """Tests for get_theme_search_paths function."""
+
+    def test_returns_configured_path(self):
+        """Test if the path is read from the configuration file."""
+        self.assertEqual(
+            [self.theme_dir], get_theme_search_paths(self.config_path)
+        )
+
+    def test_returns_configured_list_of_paths(self):
+        """Test if a list of paths is read from the configuration file."""
+        with open(self.config_path, 'w') as f:
+            f.write(
+                'theme-search-dir-path:\n'
+                '  - "{}"\n'
+                '  - ~/themes\n'.format(self.theme_dir)
+            )
+
+        self.assertEqual(
+            [self.theme_dir, os.path.expanduser('~/themes')],
+            get_theme_search_paths(self.config_path)
+        )
+
+    @parameterized.expand([
+        ('missing_file', None),
+        ('invalid_yaml', 'theme-search-dir-path: [\n'),
+        ('missing_option', 'theme: ocean\n')
+    ])
+    def test_returns_nothing_for(self, _, content):
+        """Test if no paths are returned for an unusable configuration.
+
+        :param content: content of the configuration file, or None if
+            it doesn't exist.
+        """
+        os.remove(self.config_path)
+        if content is not None:
+            with open(self.config_path, 'w') as f:
+                f.write(content)
+
+        self.assertEqual([], get_theme_search_paths(self.config_path))
+
+
+class ScanThemeNamesTest(CompletionTestCase):
+    """Tests for scan_theme_names function."""
+
+    def test_stops_after_max_entries(self):
+        """Test if the number of checked entries is limited."""
+        self.assertEqual(
+            [], scan_theme_names(self.theme_dir, max_entries=3)
+        )
+        self.assertEqual(
+            ['mocha', 'monokai', 'ocean'],
+            scan_theme_names(self.theme_dir, max_entries=10)
+        )
+
+
+class MainTest(unittest.TestCase):
+    """Tests for main function."""
+
+    @parameterized.expand(['bash', 'zsh', 'fish'])
+    def test_prints_script_for(self, shell):
+        """Test if a completion script is printed.
+
+        :param shell: a name of the shell.
+        """
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            status = main(['--script', shell])
+
+        self.assertEqual(0, status)
+        self.assertIn('base16-theme-switcher complete', stdout.getvalue())
+        self.assertIn('set reload stats', stdout.getvalue())
+
+    def test_rejects_unknown_shell(self):
+        """Test if an error status is returned for an unknown shell."""
+        with patch('sys.stderr', new_callable=io.StringIO):
+            self.assertEqual(2, main(['--script', 'csh']))
+
+
+@unittest.skipIf(shutil.which('bash') is None, 'Bash is not available.')
+class BashScriptTest(unittest.TestCase):
+    """Tests for the bash completion script using a fake application."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        fake = os.path.join(self.directory, 'base16-theme-switcher')
+        with open(fake, 'w') as f:
+            f.write(
+                '#!/bin/sh\n'
+                'printf "monokai\\nmocha\\nocean\\n" | grep "^$2"\n'
+            )
+        os.chmod(fake, 0o755)
+
+    def complete(self, *words):
+        """Complete the last of the words of a command line.
+
+        :param words: the words following the name of the application.
+        :returns: a sorted list of the completions.
+        """
+        words = ('base16-theme-switcher',) + words
+        script = SCRIPTS['bash'].replace('{commands}', 'set reload stats')
+        output = subprocess.run(
+            ['bash', '-c', script + (
+                'COMP_WORDS=("$@"); COMP_CWORD=$(($# - 1))\n'
+                '_base16_theme_switcher\n'
+                'printf "%s\\n" "${COMPREPLY[@]}"\n'
+            ), 'bash'] + list(words),
+            env=dict(os.environ, PATH=self.directory + os.pathsep +
+                     os.environ['PATH']),
+            stdout=subprocess.PIPE, universal_newlines=True, check=True
+        ).stdout
+        return sorted(output.split())
+
+    @parameterized.expand([
+        ('theme_name', ('mo',), ['mocha', 'monokai']),
+        ('command', ('re',), ['reload']),
+        ('both', ('s',), ['set', 'stats']),
+        ('theme_name_after_set', ('set', 'o'), ['ocean'])
+    ])
+    def test_completes(self, _, words, expected):
+        """Test if commands and names of themes are completed.
+
+        :param words: the words following the name of the application.
+        :param expected: the expected completions.
+        """
+        self.assertEqual(expected, self.complete(*words))
@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 """Tests for classes representing configuration data and sources."""
 
+import os
+import pickle
+import tempfile
 import unittest
 from unittest.mock import MagicMock, Mock
 
 from parameterized import parameterized
 
 from base16_theme_switcher.config_structures import (
+    CfgConfigPath,
     ConfigKeyError,
     ConfigMapping,
     ConfiguredAbsolutePath,
     ConfiguredFileNotFoundError,
     ConfiguredPathError,
+    FrozenConfigMapping,
     LazilySaveablePath,
     RootConfigMapping,
 )
@@ -134,8 +139,81 @@ class RootConfigMappingTest(ConfigMappingTest):
         source.__str__.return_value = 'root'
         self.initial_ancestors = str(source),
         source.read.return_value = self.data
+        self.source = source
         self.tested = RootConfigMapping(source)
 
+    def test_reload_reads_source_again(self):
+        """Test if data saved by another process replaces the data."""
+        self.source.read.return_value = {'first': 'changed'}
+
+        self.tested.reload()
+
+        self.assertEqual({'first': 'changed'}, dict(self.tested))
+
+
+class FrozenConfigMappingTest(unittest.TestCase):
+    """Tests for snapshots of configuration mappings."""
+
+    def setUp(self):
+        self.data = {
+            'first': 123,
+            'third': {'third.first': [1, {'x': 'y'}], 'third.second': 'pp'}
+        }
+        self.tested = ConfigMapping(self.data, ('root',)).snapshot()
+
+    def test_snapshot_contains_frozen_values(self):
+        """Test if sections and sequences are converted recursively."""
+        section = self.tested['third']
+
+        self.assertIsInstance(section, FrozenConfigMapping)
+        self.assertEqual(1, section['third.first'][0])
+        self.assertEqual({'x': 'y'}, dict(section['third.first'][1]))
+        self.assertIsInstance(section['third.first'], tuple)
+
+    def test_snapshot_doesnt_change_with_data(self):
+        """Test if changes of the source data aren't visible."""
+        self.data['first'] = 0
+        self.data['third']['third.second'] = 'changed'
+
+        self.assertEqual(123, self.tested['first'])
+        self.assertEqual('pp', self.tested['third']['third.second'])
+
+    def test_snapshot_is_immutable(self):
+        """Test if values can't be assigned to a snapshot."""
+        with self.assertRaises(TypeError):
+            self.tested['first'] = 0
+
+    def test_getitem_raises_ConfigKeyError(self):
+        """Test if a missing option is reported with its location."""
+        with self.assertRaisesRegex(ConfigKeyError, 'root:third'):
+            self.tested['third']['missing']
+
+    def test_snapshot_is_hashable_and_picklable(self):
+        """Test if equal snapshots have equal hashes after pickling."""
+        restored = pickle.loads(pickle.dumps(self.tested))
+
+        self.assertEqual(self.tested, restored)
+        self.assertEqual(hash(self.tested), hash(restored))
+        self.assertEqual(
+            hash(self.tested),
+            hash(ConfigMapping(self.data, ('root',)).snapshot())
+        )
+
+    def test_hash_doesnt_change_snapshot(self):
+        """Test if hashing a snapshot doesn't assign any attributes."""
+        state = dict(vars(self.tested))
+
+        hash(self.tested)
+
+        self.assertEqual(state, vars(self.tested))
+
+    def test_hash_raises_TypeError_for_unhashable_value(self):
+        """Test if a snapshot with an unhashable value isn't hashable."""
+        tested = FrozenConfigMapping({'first': bytearray()}, ('root',))
+
+        with self.assertRaises(TypeError):
+            hash(tested)
+
 
 class ConfiguredAbsolutePathTest(unittest.TestCase):
     """Tests for ConfiguredAbsolutePath class."""
@@ -332,3 +410,87 @@ class LazilySaveablePathTest(ConfiguredAbsolutePathTest):
             self.tested.do_write_mock.assert_not_called()
         else:
             self.tested.do_write_mock.assert_called_once_with(data)
+
+
+class CfgConfigPathTest(unittest.TestCase):
+    """Tests for CfgConfigPath class."""
+
+    CONTENT = (
+        '# Colors\n[colors]\nbackground = "#181818"  # dark\nfont = a, b\n'
+    )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'plugin.ini')
+        with open(self.path, 'w') as f:
+            f.write(self.CONTENT)
+        self.tested = CfgConfigPath.from_(self.path)
+
+    def read(self):
+        """Read the file under the tested path.
+
+        :returns: the content of the file.
+        """
+        with open(self.path) as f:
+            return f.read()
+
+    def test_write_changes_values_in_place(self):
+        """Test if the given data is saved, preserving formatting."""
+        content = self.CONTENT.replace('font = a, b\n', '')
+        with open(self.path, 'w') as f:
+            f.write(content)
+        data = self.tested.read()
+        data['colors']['background'] = '#000000'
+
+        self.tested.write(data)
+
+        self.assertEqual(content.replace('#181818', '#000000'), self.read())
+
+    def test_write_saves_new_options(self):
+        """Test if the whole file is written for new options."""
+        data = self.tested.read()
+        data['colors']['foreground'] = '#d8d8d8'
+        data['other'] = {}
+
+        self.tested.write(data)
+
+        self.assertEqual(data, CfgConfigPath.from_(self.path).read())
+
+    def test_write_creates_file(self):
+        """Test if data is saved to a file that doesn't exist yet."""
+        os.remove(self.path)
+        data = self.tested.read(fallback_to_empty=True)
+        data['a'] = 'b'
+
+        self.tested.write(data)
+
+        self.assertEqual({'a': 'b'}, CfgConfigPath.from_(self.path).read())
+
+    @parameterized.expand([
+        ('existing_options', {('colors', 'background'): 'black'}),
+        ('new_options', {
+            ('colors', 'background'): 'black', ('new', 'option'): 'x'
+        }),
+        ('lists', {('colors', 'font'): 'c'})
+    ])
+    def test_update_returns_true_for_changes(self, _, values):
+        """Test if changed values are saved.
+
+        :param values: a mapping of keys of options to new values.
+        """
+        self.assertTrue(self.tested.update(values))
+
+        data = self.tested.read()
+        for key, value in values.items():
+            self.assertEqual(value, get_by_key_chain(data, key))
+
+    def test_update_returns_false_for_same_values(self):
+        """Test if the file isn't written if it contains the values."""
+        mtime = os.stat(self.path).st_mtime_ns
+
+        self.assertFalse(self.tested.update({
+            ('colors', 'background'): '#181818'
+        }))
+
+        self.assertEqual(mtime, os.stat(self.path).st_mtime_ns)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Tests for the minimal D-Bus client."""
+
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from parameterized import parameterized
+
+from base16_theme_switcher.dbus import (
+    ERROR,
+    ERROR_NAME,
+    MEMBER,
+    METHOD_CALL,
+    METHOD_RETURN,
+    REPLY_SERIAL,
+    SIGNAL,
+    Connection,
+    DBusError,
+    build_message,
+    notify,
+    parse_address,
+    read_message,
+    split_signature,
+)
+
+
+class StubBus:
+    """A message bus server answering method calls of its clients.
+
+    The bus replies to Hello like a real bus, followed by a signal, and
+    to other methods using a mapping of their names to callables
+    returning a signature and a body of a reply. Unknown methods get an
+    error reply.
+    """
+
+    def __init__(self, directory, methods=None):
+        """Create a new instance and start serving.
+
+        :param directory: a directory in which the socket is created.
+        :param methods: a mapping of names of methods to callables
+            receiving a body of a call.
+        """
+        self.path = os.path.join(directory, 'bus')
+        self.address = 'unix:path=' + self.path
+        self.methods = dict(methods or {})
+        self.calls = []
+        self.connections = 0
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(1)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop serving."""
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        self._thread.join(5)
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with client, client.makefile('rb') as stream:
+                try:
+                    self._handle(client, stream)
+                except (EOFError, OSError, DBusError):
+                    pass
+
+    def _handle(self, client, stream):
+        def read(size):
+            data = stream.read(size)
+            if len(data) < size:
+                raise EOFError
+            return data
+
+        if read(1) != b'\0':
+            return
+        if not stream.readline().startswith(b'AUTH EXTERNAL '):
+            client.sendall(b'REJECTED EXTERNAL\r\n')
+            return
+        client.sendall(b'OK 0123456789abcdef0123456789abcdef\r\n')
+        if stream.readline() != b'BEGIN\r\n':
+            return
+        serial = 0
+        while True:
+            message = read_message(read)
+            self.calls.append(message)
+            member = message.fields[MEMBER]
+            serial += 1
+            if member == 'Hello':
+                client.sendall(build_message(
+                    METHOD_RETURN, serial,
+                    {REPLY_SERIAL: message.serial}, 's', [':1.1']
+                ))
+                serial += 1
+                client.sendall(build_message(
+                    SIGNAL, serial, {MEMBER: 'NameAcquired'}, 's', [':1.1']
+                ))
+            elif member in self.methods:
+                signature, body = self.methods[member](message.body)
+                client.sendall(build_message(
+                    METHOD_RETURN, serial,
+                    {REPLY_SERIAL: message.serial}, signature, body
+                ))
+            else:
+                client.sendall(build_message(
+                    ERROR, serial, {
+                        REPLY_SERIAL: message.serial,
+                        ERROR_NAME: 'org.freedesktop.DBus.Error.'
+                                    'ServiceUnknown'
+                    }, 's', ['No such service.']
+                ))
+
+
+class StubBusTestCase(unittest.TestCase):
+    """A base for tests using a stub message bus."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.bus = StubBus(
+            directory.name, {'Notify': lambda body: ('u', [7])}
+        )
+        self.addCleanup(self.bus.close)
+
+
+class MarshallingTest(unittest.TestCase):
+    """Tests for writing and reading messages."""
+
+    def test_build_message_writes_wire_format(self):
+        """Test if a message is written as described by the spec."""
+        data = build_message(METHOD_CALL, 1, {MEMBER: 'Hi'}, 'y', [255])
+
+        self.assertEqual(
+            b'l\x01\x00\x01\x01\x00\x00\x00\x01\x00\x00\x00'
+            b'\x17\x00\x00\x00'
+            b'\x03\x01s\x00\x02\x00\x00\x00Hi\x00\x00\x00\x00\x00\x00'
+            b'\x08\x01g\x00\x01y\x00\x00'
+            b'\xff',
+            data
+        )
+
+    @parameterized.expand([
+        ('basic_types', 'ybnqiuxtds', [
+            1, True, -2, 3, -4, 5, -6, 7, 0.5, 'zażółć'
+        ]),
+        ('paths_and_signatures', 'og', ['/org/example', 'a{sv}']),
+        ('empty_array_of_aligned_type', 'yat', [1, []]),
+        ('nested_arrays', 'aas', [[['a', 'b'], [], ['c']]]),
+        ('structs', 'a(yv)', [[(1, ('s', 'x')), (2, ('ai', [1, 2]))]]),
+        ('dictionaries', 'a{sv}y', [
+            {'urgency': ('y', 2), 'category': ('s', 'x')}, 3
+        ])
+    ])
+    def test_reads_written_message(self, _, signature, body):
+        """Test if values are read back from a written message.
+
+        :param signature: a signature of the body of the message.
+        :param body: values of the body.
+        """
+        data = build_message(SIGNAL, 3, {MEMBER: 'Changed'}, signature, body)
+        offset = 0
+
+        def read(size):
+            nonlocal offset
+            offset += size
+            return data[offset - size:offset]
+
+        message = read_message(read)
+
+        self.assertEqual(len(data), offset)
+        self.assertEqual(
+            (SIGNAL, 3, 'Changed'),
+            (message.type, message.serial, message.fields[MEMBER])
+        )
+        self.assertEqual(tuple(body), message.body)
+
+    @parameterized.expand([
+        ('basic_types', 'sub', ['s', 'u', 'b']),
+        ('containers', 'a{sv}(iai)as', ['a{sv}', '(iai)', 'as'])
+    ])
+    def test_split_signature(self, _, signature, expected):
+        """Test if a signature is split into complete types.
+
+        :param signature: the signature.
+        :param expected: the expected complete types.
+        """
+        self.assertEqual(expected, split_signature(signature))
+
+    @parameterized.expand([
+        ('unsupported', 'sm'),
+        ('incomplete', 'a{sv')
+    ])
+    def test_split_signature_raises_DBusError(self, _, signature):
+        """Test if invalid signatures are rejected.
+
+        :param signature: the signature.
+        """
+        with self.assertRaises(DBusError):
+            split_signature(signature)
+
+
+class ParseAddressTest(unittest.TestCase):
+    """Tests for parse_address function."""
+
+    def test_gets_unix_socket_addresses(self):
+        """Test if paths and abstract names of sockets are found."""
+        self.assertEqual(
+            ['/run/user/1000/bus', '\0/tmp/dbus-a b'],
+            parse_address(
+                'unix:path=/run/user/1000/bus;tcp:host=localhost,port=1;'
+                'unix:abstract=/tmp/dbus-a%20b,guid=01'
+            )
+        )
+
+
+class ConnectionTest(StubBusTestCase):
+    """Tests for Connection class."""
+
+    def open(self):
+        """Open a connection to the stub bus, closed after the test.
+
+        :returns: the connection.
+        """
+        connection = Connection.open(self.bus.address)
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_open_says_hello(self):
+        """Test if a unique name is requested after authentication."""
+        connection = self.open()
+
+        self.assertEqual(':1.1', connection.unique_name)
+        self.assertEqual(['Hello'], [
+            c.fields[MEMBER] for c in self.bus.calls
+        ])
+
+    def test_notify_calls_notification_service(self):
+        """Test if a notification is sent as a method call."""
+        connection = self.open()
+
+        self.assertEqual(7, notify(connection, 'app', 'Summary', 'Body', 2))
+        self.assertEqual(7, notify(connection, 'app', 'Other'))
+
+        self.assertEqual(
+            ('app', 0, '', 'Summary', 'Body', [], {'urgency': ('y', 2)}, -1),
+            self.bus.calls[1].body
+        )
+        self.assertEqual(3, len(self.bus.calls))
+        self.assertEqual(1, self.bus.connections)
+
+    def test_call_raises_DBusError_for_error_reply(self):
+        """Test if an error reply is raised as an exception."""
+        connection = self.open()
+
+        with self.assertRaisesRegex(DBusError, 'No such service.') as cm:
+            connection.call('org.example', '/', 'org.example', 'Missing')
+        self.assertEqual(
+            'org.freedesktop.DBus.Error.ServiceUnknown', cm.exception.name
+        )
+
+    def test_open_raises_OSError_for_missing_bus(self):
+        """Test if a missing socket is reported."""
+        with self.assertRaises(OSError):
+            Connection.open(self.bus.address + '-missing')
+
+    def test_open_raises_OSError_for_unsupported_address(self):
+        """Test if an address without UNIX sockets is reported."""
+        with self.assertRaisesRegex(OSError, 'No supported D-Bus address'):
+            Connection.open('tcp:host=localhost,port=1')
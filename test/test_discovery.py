@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Tests for finding theme files."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from parameterized import parameterized
+
+from base16_theme_switcher.discovery import (
+    find_files,
+    load_theme_directories,
+    probe_files,
+    save_theme_directories,
+)
+from base16_theme_switcher.themes import Base16ThemeNameMap
+
+EXTENSIONS = '.Xresources', '.yaml'
+
+
+class DirectoryTestCase(unittest.TestCase):
+    """A base for tests using a temporary directory tree."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def make(self, *names):
+        """Create empty files in the temporary directory.
+
+        :param names: relative paths to the files.
+        :returns: a list of absolute paths to the files.
+        """
+        paths = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+            paths.append(path)
+        return paths
+
+
+class FindFilesTest(DirectoryTestCase):
+    """Tests for find_files function."""
+
+    def test_finds_files_with_extensions(self):
+        """Test if only files with given extensions are found."""
+        expected = self.make('a.Xresources', 'x/b.yaml', 'x/y/c.yaml')
+        self.make('README.md', 'x/d.json')
+
+        self.assertEqual([expected], find_files([self.root], EXTENSIONS))
+
+    def test_prunes_ignored_directories(self):
+        """Test if ignored directories are not searched."""
+        expected = self.make('a.yaml')
+        self.make(
+            '.git/b.yaml', 'node_modules/c.yaml', 'build-1/d.yaml',
+            'x/.git/e.yaml'
+        )
+
+        self.assertEqual([expected], find_files(
+            [self.root], EXTENSIONS, ['.git', 'node_modules', 'build-*']
+        ))
+
+    def test_follows_symlink_loops_once(self):
+        """Test if a symbolic link to an ancestor is not followed."""
+        expected = self.make('x/a.yaml')
+        os.symlink(self.root, os.path.join(self.root, 'x', 'loop'))
+
+        self.assertEqual([expected], find_files([self.root], EXTENSIONS))
+
+    def test_returns_files_by_root(self):
+        """Test if files are grouped by roots, in order of the roots."""
+        first = self.make('first/a.yaml', 'first/b.yaml')
+        second = self.make('second/a.yaml')
+        roots = [os.path.join(self.root, n) for n in ('second', 'first')]
+
+        self.assertEqual(
+            [second, first], find_files(roots, EXTENSIONS, max_workers=1)
+        )
+
+    def test_skips_missing_root(self):
+        """Test if nothing is found in a missing root."""
+        expected = self.make('a.yaml')
+        roots = [os.path.join(self.root, 'missing'), self.root]
+
+        self.assertEqual([[], expected], find_files(roots, EXTENSIONS))
+
+    def test_reports_files_found_in_each_directory(self):
+        """Test if found files are reported before the search ends."""
+        expected = self.make('a.yaml', 'x/b.yaml', 'x/c.Xresources')
+        on_found = Mock()
+
+        find_files([self.root], EXTENSIONS, on_found=on_found)
+
+        self.assertEqual(2, on_found.call_count)
+        self.assertCountEqual(
+            expected, [p for c in on_found.call_args_list for p in c[0][0]]
+        )
+
+    def test_themes_are_taken_from_roots_by_priority(self):
+        """Test if a theme from an earlier root shadows a later one."""
+        first, second = self.make(
+            'first/a.Xresources', 'second/a.Xresources'
+        )
+
+        themes = Base16ThemeNameMap.from_unique_in([
+            os.path.join(self.root, 'second'),
+            os.path.join(self.root, 'first')
+        ])
+
+        self.assertEqual(second, str(themes['a'].path))
+
+
+class ProbeFilesTest(DirectoryTestCase):
+    """Tests for probe_files function."""
+
+    def test_probes_conventional_directories(self):
+        """Test if the root and its conventional subdirectories are
+        probed if no directories are known."""
+        expected = self.make('a.yaml', 'xresources/a.Xresources')
+        self.make('other/a.yaml', 'xresources/b.Xresources')
+
+        self.assertEqual(
+            expected,
+            probe_files(self.root, ['a.Xresources', 'a.yaml'])
+        )
+
+    def test_probes_known_directories_of_root(self):
+        """Test if only known directories in the root are probed."""
+        expected = self.make('x/y/a.yaml')
+        self.make('a.yaml', 'z/a.yaml')
+        directories = [
+            os.path.join(self.root, 'x', 'y'),
+            os.path.join(self.root + '-other', 'x')
+        ]
+
+        self.assertEqual(
+            expected, probe_files(self.root, ['a.yaml'], directories)
+        )
+
+
+class ThemeDirectoriesTest(unittest.TestCase):
+    """Tests for saving and loading directories containing themes."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache', 'theme-dirs.json')
+
+    def test_loads_saved_directories(self):
+        """Test if saved directories are loaded for the same search."""
+        save_theme_directories(self.path, ['/a'], ['.git'], {'/a/y', '/a/x'})
+
+        self.assertEqual(
+            ['/a/x', '/a/y'],
+            load_theme_directories(self.path, ['/a'], ['.git'])
+        )
+
+    @parameterized.expand([
+        ('roots', ['/b'], ['.git']),
+        ('ignored_directories', ['/a'], [])
+    ])
+    def test_returns_none_for_other(self, _, roots, ignore):
+        """Test if directories saved for another search are not loaded.
+
+        :param roots: roots of the search.
+        :param ignore: patterns of ignored directories of the search.
+        """
+        save_theme_directories(self.path, ['/a'], ['.git'], {'/a/x'})
+
+        self.assertIsNone(load_theme_directories(self.path, roots, ignore))
+
+    def test_returns_none_for_missing_file(self):
+        """Test if None is returned if nothing was saved."""
+        self.assertIsNone(load_theme_directories(self.path, ['/a'], []))
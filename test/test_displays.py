@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Tests for discovering X displays and applying themes to them."""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import Mock, call, patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.displays import (
+    DisplayResult,
+    apply_to_displays,
+    find_displays,
+    merge_resources,
+)
+
+
+class FindDisplaysTest(unittest.TestCase):
+    """Tests for find_displays function."""
+
+    def test_returns_sorted_display_names(self):
+        """Test if names of displays with sockets are returned."""
+        with tempfile.TemporaryDirectory() as socket_dir:
+            for name in ('X10', 'X0', 'X2', 'other', 'X1-lock'):
+                open(os.path.join(socket_dir, name), 'w').close()
+
+            actual = find_displays(socket_dir)
+
+        self.assertEqual([':0', ':2', ':10'], actual)
+
+    def test_returns_empty_list_for_missing_dir(self):
+        """Test if no displays are found in a non-existing directory."""
+        self.assertEqual([], find_displays('/non/existing/socket/dir'))
+
+
+class MergeResourcesTest(unittest.TestCase):
+    """Tests for merge_resources function."""
+
+    @parameterized.expand([
+        ('given_display', ':1', ['xrdb', '-display', ':1', '-merge']),
+        ('inherited_display', None, ['xrdb', '-merge'])
+    ])
+    @patch('base16_theme_switcher.displays.commands.run')
+    def test_merges_resources_into(self, _, display, expected_args, run_mock):
+        """Test if xrdb is executed with expected arguments.
+
+        :param display: a name of a display passed to the function.
+        :param expected_args: arguments expected to be used to run xrdb.
+        """
+        merge_resources(display, '#define base00 #000000')
+
+        run_mock.assert_called_once_with(
+            expected_args,
+            input='#define base00 #000000',
+            check=True
+        )
+
+
+class ApplyToDisplaysTest(unittest.TestCase):
+    """Tests for apply_to_displays function."""
+
+    def setUp(self):
+        self.theme = Mock()
+        self.theme.name = 'example-theme'
+        self.displays = [':0', ':1', ':2']
+
+    def test_uses_display_appliers_for_each_display(self):
+        """Test if display-scoped appliers are used for each display."""
+        appliers = [Mock(), Mock()]
+
+        apply_to_displays(self.theme, self.displays, appliers, 2)
+
+        for a in appliers:
+            a.apply_to_display.assert_has_calls(
+                [call(self.theme, d) for d in self.displays],
+                any_order=True
+            )
+
+    def test_returns_report_with_failures(self):
+        """Test if a failure for one display is reported separately."""
+        error = subprocess.CalledProcessError(1, 'xrdb')
+        applier = Mock()
+
+        def apply_to_display(theme, display):
+            if display == ':1':
+                raise error
+
+        applier.apply_to_display.side_effect = apply_to_display
+
+        actual = apply_to_displays(self.theme, self.displays, [applier])
+
+        expected = [
+            DisplayResult(':0', None),
+            DisplayResult(':1', error),
+            DisplayResult(':2', None)
+        ]
+        self.assertEqual(expected, actual)
+        self.assertFalse(actual[1].succeeded)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Tests for exporting palettes of themes."""
+
+import io
+import json
+import os
+import unittest
+from unittest.mock import Mock
+
+from parameterized import parameterized
+
+from base16_theme_switcher.export import (
+    export_palettes,
+    read_palette,
+    select_themes,
+)
+from base16_theme_switcher.schemes import COLOR_NAMES
+from base16_theme_switcher.terminals import get_osc_sequences
+from base16_theme_switcher.themes import Base16Theme
+
+from .test_schemes import SchemeFileTestCase, get_scheme_text
+
+COLORS = {n: '#{0}{0}{0}'.format(n[-1].lower() * 2) for n in COLOR_NAMES}
+
+
+class SelectThemesTest(unittest.TestCase):
+    """Tests for select_themes function."""
+
+    @parameterized.expand([
+        ('all', [], ['dark', 'light', 'solarized-dark']),
+        ('patterns', ['*-dark', 'light'], ['light', 'solarized-dark'])
+    ])
+    def test_selects(self, _, patterns, expected):
+        """Test if themes matching the patterns are selected.
+
+        :param patterns: the patterns.
+        :param expected: names of expected themes.
+        """
+        themes = [Mock() for _ in range(3)]
+        for theme, name in zip(themes, ['dark', 'light', 'solarized-dark']):
+            theme.name = name
+
+        selected = select_themes(themes, patterns)
+
+        self.assertEqual(expected, [t.name for t in selected])
+
+
+class ReadPaletteTest(SchemeFileTestCase):
+    """Tests for read_palette function."""
+
+    def test_returns_error_for_unreadable_archive(self):
+        """Test if an archive that can't be read is reported."""
+        archive = self.write('broken.zip', 'not an archive')
+
+        colors, error = read_palette(os.path.join(archive, 'a.yaml'))
+
+        self.assertIsNone(colors)
+        self.assertIn('broken.zip', error)
+
+
+class ExportPalettesTest(SchemeFileTestCase):
+    """Tests for export_palettes function."""
+
+    def setUp(self):
+        super().setUp()
+        values = [v[1:] for v in COLORS.values()]
+        self.themes = [
+            Base16Theme.from_(self.write(n + '.yaml', get_scheme_text(
+                values, **overrides
+            )))
+            for n, overrides in [
+                ('first', {}),
+                ('invalid', {'base00': None}),
+                ('second', {}),
+                ('third', {})
+            ]
+        ]
+
+    def _export(self, format_name):
+        stream = io.StringIO()
+        count = export_palettes(self.themes, stream, format_name, 2)
+        return count, stream.getvalue().splitlines()
+
+    def test_writes_valid_palettes_in_order(self):
+        """Test if palettes are written in order of themes."""
+        count, lines = self._export('jsonl')
+
+        self.assertEqual(3, count)
+        palettes = [json.loads(line) for line in lines]
+        self.assertEqual(
+            ['first', 'second', 'third'], [p['name'] for p in palettes]
+        )
+        self.assertEqual(COLORS, palettes[0]['colors'])
+
+    def test_writes_csv_header(self):
+        """Test if a CSV table starts with a header."""
+        _, lines = self._export('csv')
+
+        self.assertEqual('name,' + ','.join(COLOR_NAMES), lines[0])
+        self.assertEqual(
+            'first,' + ','.join(COLORS[n] for n in COLOR_NAMES), lines[1]
+        )
+
+    def test_writes_css_rules(self):
+        """Test if a CSS rule is written for each theme."""
+        _, lines = self._export('css')
+
+        self.assertIn('[data-theme="second"] {', lines)
+        self.assertIn('  --base0D: #dddddd;', lines)
+
+    def test_writes_osc_lines(self):
+        """Test if a line of escape sequences is written per theme."""
+        _, lines = self._export('osc')
+
+        self.assertEqual([get_osc_sequences(COLORS)] * 3, lines)
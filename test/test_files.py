@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for creating files replacing configuration files."""
+
+import os
+import tempfile
+import unittest
+
+from base16_theme_switcher.files import create_replacement
+
+
+class CreateReplacementTest(unittest.TestCase):
+    """Tests for create_replacement function."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        self.path = os.path.join(self.dir, 'config')
+
+    def create(self, path):
+        """Create a replacement file, closed after the test.
+
+        :param path: a path to the replaced file.
+        :returns: a tuple of a path to the temporary file and the
+            resolved path to the replaced file.
+        """
+        fd, tmp_path, target = create_replacement(path)
+        os.close(fd)
+        return tmp_path, target
+
+    def test_copies_permissions_of_existing_file(self):
+        """Test if the replacement has the mode of the replaced file."""
+        open(self.path, 'w').close()
+        os.chmod(self.path, 0o604)
+
+        tmp_path, _ = self.create(self.path)
+
+        self.assertEqual(0o604, os.stat(tmp_path).st_mode & 0o777)
+        self.assertEqual(self.dir, os.path.dirname(tmp_path))
+
+    def test_uses_umask_for_new_file(self):
+        """Test if the replacement of a missing file honours umask."""
+        umask = os.umask(0o027)
+        self.addCleanup(os.umask, umask)
+
+        tmp_path, _ = self.create(self.path)
+
+        self.assertEqual(0o640, os.stat(tmp_path).st_mode & 0o777)
+
+    def test_resolves_symbolic_links(self):
+        """Test if the target of a link is to be replaced."""
+        real_dir = os.path.join(self.dir, 'real')
+        os.mkdir(real_dir)
+        target = os.path.join(real_dir, 'config')
+        open(target, 'w').close()
+        os.symlink(target, self.path)
+
+        tmp_path, actual = self.create(self.path)
+
+        self.assertEqual(os.path.realpath(target), actual)
+        self.assertEqual(
+            os.path.realpath(real_dir), os.path.dirname(tmp_path)
+        )
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Tests for rendering a gallery of swatches of themes."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from base16_theme_switcher.gallery import (
+    INDEX_NAME,
+    Gallery,
+    render_swatch,
+    render_theme,
+)
+from base16_theme_switcher.themes import Base16SchemeTheme
+
+from .test_schemes import SchemeFileTestCase, get_scheme_text
+
+
+class RenderSwatchTest(unittest.TestCase):
+    """Tests for render_swatch function."""
+
+    def test_renders_all_colors(self):
+        """Test if a square is rendered for each color."""
+        colors = ['#{:06x}'.format(i) for i in range(16)]
+
+        svg = render_swatch('a<b', colors)
+
+        self.assertEqual(16, svg.count('<rect '))
+        for c in colors:
+            self.assertIn('fill="{}"'.format(c), svg)
+        self.assertIn('<title>a&lt;b</title>', svg)
+
+
+class RenderThemeTest(SchemeFileTestCase):
+    """Tests for render_theme function."""
+
+    def test_returns_error_for_unreadable_archive(self):
+        """Test if an archive that can't be read is reported."""
+        archive = self.write('broken.zip', 'not an archive')
+        image = os.path.join(self.dir.name, 'a.svg')
+
+        error = render_theme(os.path.join(archive, 'a.yaml'), image)
+
+        self.assertIn('broken.zip', error)
+        self.assertFalse(os.path.exists(image))
+
+
+class GalleryTest(SchemeFileTestCase):
+    """Tests for Gallery class."""
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.output = Path(self.output_dir.name)
+        self.tested = Gallery(self.output_dir.name)
+        self.paths = [
+            self.write('first.yaml', get_scheme_text(), 1000),
+            self.write('second.yaml', get_scheme_text(), 1000),
+            self.write('invalid.yaml', get_scheme_text(base00=None), 1000)
+        ]
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+        super().tearDown()
+
+    def _update(self):
+        return self.tested.update(
+            [Base16SchemeTheme(Path(p)) for p in self.paths], max_workers=2
+        )
+
+    def test_renders_valid_themes(self):
+        """Test if images are written for valid themes only."""
+        self.assertEqual((3, 0, 1), self._update())
+
+        self.assertTrue((self.output / 'first.svg').exists())
+        self.assertTrue((self.output / 'second.svg').exists())
+        self.assertFalse((self.output / 'invalid.svg').exists())
+        index = (self.output / INDEX_NAME).read_text()
+        self.assertIn('first.svg', index)
+        self.assertNotIn('invalid.svg', index)
+
+    def test_skips_unchanged_themes(self):
+        """Test if only modified themes are rendered again."""
+        self._update()
+        os.utime(self.paths[0], ns=(2000, 2000))
+
+        self.assertEqual((1, 2, 1), self._update())
+
+    def test_removes_images_of_missing_themes(self):
+        """Test if images of themes no longer found are removed."""
+        self._update()
+        del self.paths[1]
+
+        self._update()
+
+        self.assertFalse((self.output / 'second.svg').exists())
+        self.assertNotIn(
+            'second.svg', (self.output / INDEX_NAME).read_text()
+        )
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""Tests for changing values in INI files in place."""
+
+import os
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from base16_theme_switcher.inifiles import (
+    IniFileEditor,
+    UnsupportedEditError,
+    replace_atomically,
+    find_sections,
+    flatten_sections,
+    format_value,
+    index_lines,
+)
+
+CONTENT = '''# Colors of the terminal
+background = "#181818" # inline comment
+foreground='#d8d8d8'
+font = Mono, 10
+
+[tabs]
+    active = "#7cafc2"   # selected
+    title = """
+a multi-line value
+"""
+    [[bell]]
+    color = red
+    "odd key" = x
+[window]
+opacity=0.9
+'''
+
+
+class IndexLinesTest(unittest.TestCase):
+    """Tests for index_lines function."""
+
+    def setUp(self):
+        self.index = index_lines(CONTENT.splitlines(True))
+
+    @parameterized.expand([
+        ('unquoted', ('tabs', 'bell', 'color'), 'red'),
+        ('double_quoted', ('background',), '#181818'),
+        ('single_quoted', ('foreground',), '#d8d8d8'),
+        ('double_quoted_with_comment', ('tabs', 'active'), '#7cafc2'),
+        ('quoted_key', ('tabs', 'bell', 'odd key'), 'x'),
+        ('after_multi_line_value', ('window', 'opacity'), '0.9')
+    ])
+    def test_finds_value(self, _, key, expected):
+        """Test if values of options are found.
+
+        :param key: a key of the option.
+        :param expected: the expected value.
+        """
+        location = self.index.locations[key]
+        line = CONTENT.splitlines(True)[location.line]
+
+        self.assertEqual(expected, location.value)
+        self.assertIn(line[location.start:location.end], (
+            expected, '"{}"'.format(expected), "'{}'".format(expected)
+        ))
+
+    @parameterized.expand([
+        ('list', ('font',)),
+        ('multi_line', ('tabs', 'title'))
+    ])
+    def test_marks_unsupported_value(self, _, key):
+        """Test if values that can't be changed in place are marked.
+
+        :param key: a key of the option.
+        """
+        self.assertIsNone(self.index.locations[key])
+
+    def test_finds_sections(self):
+        """Test if names of nested sections are found."""
+        self.assertEqual(
+            {('tabs',), ('tabs', 'bell'), ('window',)}, self.index.sections
+        )
+
+
+class FormatValueTest(unittest.TestCase):
+    """Tests for format_value function."""
+
+    @parameterized.expand([
+        ('plain', 'red', 'red'),
+        ('number', 0.5, '0.5'),
+        ('with_comment_character', '#ffffff', '"#ffffff"'),
+        ('with_double_quote', 'a "b"', '\'a "b"\''),
+        ('empty', '', '""'),
+        ('surrounding_whitespace', ' a', '" a"')
+    ])
+    def test_formats(self, _, value, expected):
+        """Test if values are quoted when necessary.
+
+        :param value: the value.
+        :param expected: the expected representation.
+        """
+        self.assertEqual(expected, format_value(value))
+
+    @parameterized.expand([
+        ('list', ['a', 'b']),
+        ('multi_line', 'a\nb'),
+        ('both_quotes', '"a\' b')
+    ])
+    def test_raises_UnsupportedEditError(self, _, value):
+        """Test if values that can't be written on a line are rejected.
+
+        :param value: the value.
+        """
+        with self.assertRaises(UnsupportedEditError):
+            format_value(value)
+
+
+class FlattenSectionsTest(unittest.TestCase):
+    """Tests for flatten_sections and find_sections functions."""
+
+    def setUp(self):
+        self.data = {'a': '1', 'b': {'c': '2', 'd': {}, 'e': {'f': '3'}}}
+
+    def test_flatten_sections(self):
+        """Test if values of options get keys including sections."""
+        self.assertEqual(
+            {('a',): '1', ('b', 'c'): '2', ('b', 'e', 'f'): '3'},
+            dict(flatten_sections(self.data))
+        )
+
+    def test_find_sections(self):
+        """Test if empty sections are found too."""
+        self.assertCountEqual(
+            [('b',), ('b', 'd'), ('b', 'e')], find_sections(self.data)
+        )
+
+
+class IniFileEditorTest(unittest.TestCase):
+    """Tests for IniFileEditor class."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'config.ini')
+        with open(self.path, 'w') as f:
+            f.write(CONTENT)
+        os.chmod(self.path, 0o640)
+        self.tested = IniFileEditor(self.path)
+
+    def read(self):
+        """Read the edited file.
+
+        :returns: the content of the file.
+        """
+        with open(self.path) as f:
+            return f.read()
+
+    def test_update_replaces_only_changed_values(self):
+        """Test if comments and formatting are preserved."""
+        self.assertTrue(self.tested.update({
+            ('background',): '#000000',
+            ('tabs', 'active'): 'blue',
+            ('tabs', 'bell', 'color'): 'red',
+            ('tabs', 'bell', 'odd key'): 'y',
+            ('window', 'opacity'): 1
+        }))
+
+        expected = CONTENT.replace(
+            '"#181818" # inline', '"#000000" # inline'
+        ).replace(
+            '"#7cafc2"   #', 'blue   #'
+        ).replace(
+            '"odd key" = x', '"odd key" = y'
+        ).replace('opacity=0.9', 'opacity=1')
+        self.assertEqual(expected, self.read())
+        self.assertEqual(0o640, os.stat(self.path).st_mode & 0o777)
+        self.assertEqual(['config.ini'], os.listdir(self.directory))
+
+    def test_update_skips_unchanged_values(self):
+        """Test if the file isn't written if it contains the values."""
+        before = os.stat(self.path)
+
+        self.assertFalse(self.tested.update({
+            ('background',): '#181818',
+            ('tabs', 'active'): '#7cafc2'
+        }))
+
+        after = os.stat(self.path)
+        self.assertEqual(
+            (before.st_ino, before.st_mtime_ns),
+            (after.st_ino, after.st_mtime_ns)
+        )
+
+    def test_update_uses_index_of_written_file(self):
+        """Test if values can be changed repeatedly."""
+        self.tested.update({('foreground',): 'white'})
+        self.tested.update({('foreground',): '#ffffff'})
+
+        self.assertIn('foreground="#ffffff"\n', self.read())
+        self.assertEqual(
+            '#ffffff', self.tested.get_index().locations[
+                ('foreground',)
+            ].value
+        )
+
+    def test_update_indexes_externally_changed_file(self):
+        """Test if the file is indexed again after another change."""
+        self.tested.get_index()
+        with open(self.path, 'w') as f:
+            f.write('# new\n\nbackground = a\n')
+
+        self.assertTrue(self.tested.update({('background',): 'b'}))
+
+        self.assertEqual('# new\n\nbackground = b\n', self.read())
+
+    @parameterized.expand([
+        ('missing', ('tabs', 'missing'), 'a'),
+        ('list', ('font',), 'Sans'),
+        ('multi_line', ('tabs', 'title'), 'a'),
+        ('unquotable', ('foreground',), 'a\nb')
+    ])
+    def test_update_raises_UnsupportedEditError(self, _, key, value):
+        """Test if changes requiring a rewrite leave the file intact.
+
+        :param key: a key of a changed option.
+        :param value: a new value of the option.
+        """
+        with self.assertRaises(UnsupportedEditError):
+            self.tested.update({('background',): 'a', key: value})
+
+        self.assertEqual(CONTENT, self.read())
+
+
+class ReplaceAtomicallyTest(unittest.TestCase):
+    """Tests for replace_atomically function."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'config.ini')
+
+    def test_replaces_target_of_symbolic_link(self):
+        """Test if a link to the file is kept."""
+        target = os.path.join(self.directory, 'target.ini')
+        with open(target, 'w') as f:
+            f.write('a = 1\n')
+        os.chmod(target, 0o604)
+        os.symlink(target, self.path)
+
+        with replace_atomically(self.path) as f:
+            f.write(b'a = 2\n')
+
+        self.assertTrue(os.path.islink(self.path))
+        with open(target) as f:
+            self.assertEqual('a = 2\n', f.read())
+        self.assertEqual(0o604, os.stat(target).st_mode & 0o777)
+
+    def test_honours_umask_for_new_file(self):
+        """Test if a new file doesn't get the mode of a temporary file."""
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+
+        with replace_atomically(self.path) as f:
+            f.write(b'a = 1\n')
+
+        self.assertEqual(0o644, os.stat(self.path).st_mode & 0o777)
+
+    def test_removes_new_file_on_error(self):
+        """Test if the original file is kept if writing fails."""
+        with open(self.path, 'w') as f:
+            f.write('a = 1\n')
+
+        with self.assertRaises(ValueError):
+            with replace_atomically(self.path) as f:
+                f.write(b'a = 2\n')
+                raise ValueError
+
+        self.assertEqual(['config.ini'], os.listdir(self.directory))
+        with open(self.path) as f:
+            self.assertEqual('a = 1\n', f.read())
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Tests for the persistent history of durations of theme appliers."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from base16_theme_switcher.latency import (
+    LatencyStore,
+    format_summary,
+    percentile,
+)
+
+
+class PercentileTest(unittest.TestCase):
+    """Tests for percentile function."""
+
+    @parameterized.expand([
+        (50, 5),
+        (95, 10),
+        (99, 10),
+        (10, 1),
+        (0, 1)
+    ])
+    def test_returns(self, q, expected):
+        """Test if the nearest-rank percentile is returned.
+
+        :param q: the requested percentile.
+        :param expected: the expected result for samples 1 to 10.
+        """
+        samples = [7, 3, 10, 1, 5, 2, 9, 4, 8, 6]
+        self.assertEqual(expected, percentile(samples, q))
+
+
+class LatencyStoreTest(unittest.TestCase):
+    """Tests for LatencyStore class."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'cache', 'latency.json')
+        self.tested = LatencyStore(self.path, capacity=3)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_adds_samples_in_milliseconds(self):
+        """Test if recorded durations are available as samples."""
+        self.tested.record('applier', 0.25)
+        self.tested.record('applier', 0.5)
+
+        self.assertEqual([250, 500], self.tested.samples('applier'))
+
+    def test_record_discards_oldest_samples(self):
+        """Test if the store keeps only the most recent durations."""
+        for d in range(5):
+            self.tested.record('applier', d)
+
+        self.assertEqual([2000, 3000, 4000], self.tested.samples('applier'))
+
+    def test_percentile_returns_None_for_unknown_applier(self):
+        """Test if there is no percentile without samples."""
+        self.assertIsNone(self.tested.percentile('unknown', 95))
+
+    def test_save_persists_samples(self):
+        """Test if the samples are available to another store."""
+        self.tested.record('applier', 0.1)
+        self.tested.save()
+
+        other = LatencyStore(self.path, capacity=3)
+        self.assertEqual([100], other.samples('applier'))
+
+    def test_save_merges_samples_of_other_stores(self):
+        """Test if concurrently recorded samples are not lost."""
+        other = LatencyStore(self.path, capacity=3)
+        self.tested.record('applier', 0.1)
+        other.record('applier', 0.2)
+        other.record('other-applier', 0.3)
+
+        other.save()
+        self.tested.save()
+
+        with open(self.path) as f:
+            actual = json.load(f)
+        self.assertEqual(
+            {'applier': [200, 100], 'other-applier': [300]}, actual
+        )
+
+    def test_samples_ignores_invalid_file(self):
+        """Test if an unreadable history is treated as empty."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('not json')
+
+        self.assertEqual([], self.tested.samples('applier'))
+
+    def test_summary(self):
+        """Test if the summary contains counts and percentiles."""
+        for d in (0.001, 0.002, 0.003):
+            self.tested.record('applier', d)
+
+        self.assertEqual({'applier': (3, 2, 3, 3)}, self.tested.summary())
+
+
+class FormatSummaryTest(unittest.TestCase):
+    """Tests for format_summary function."""
+
+    def test_formats_table(self):
+        """Test if each applier is presented in a separate row."""
+        actual = format_summary({
+            'xrdb-merge': (10, 12.5, 20, 31.25),
+            'gtk': (2, 100, 150, 150)
+        })
+        lines = actual.splitlines()
+
+        self.assertEqual(3, len(lines))
+        self.assertEqual(
+            ['xrdb-merge', '10', '12.5', '20.0', '31.2'], lines[1].split()
+        )
+        self.assertEqual(['gtk', '2', '100.0', '150.0', '150.0'],
+                         lines[2].split())
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import fcntl
+import json
+import os
+import tempfile
+import unittest
+
+from base16_theme_switcher.locking import SwitchCoordinator
+
+
+class SwitchCoordinatorTest(unittest.TestCase):
+    """Tests for SwitchCoordinator class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.lock_path = os.path.join(self.tmp_dir.name, 'switch.lock')
+        self.tested = SwitchCoordinator(self.lock_path)
+        self.handled = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _hold_lock(self):
+        """Acquire the lock as if another process held it.
+
+        :returns: a descriptor of the locked file.
+        """
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        self.addCleanup(os.close, fd)
+        return fd
+
+    def test_handles_request_if_lock_is_free(self):
+        """Test if the request is handled by the calling process."""
+        self.assertTrue(self.tested.submit('first', self.handled.append))
+        self.assertEqual(['first'], self.handled)
+
+    def test_records_request_if_lock_is_held(self):
+        """Test if the request is left for the lock holder."""
+        self._hold_lock()
+
+        self.assertFalse(self.tested.submit('first', self.handled.append))
+        self.assertEqual([], self.handled)
+
+    def test_coalesces_requests_made_while_switching(self):
+        """Test if only the newest of concurrent requests is handled."""
+        other = SwitchCoordinator(self.lock_path)
+        results = []
+
+        def handler(request):
+            if not self.handled:
+                for name in 'second', 'third', 'fourth':
+                    results.append(other.submit(name, self.handled.append))
+            self.handled.append(request)
+
+        self.assertTrue(self.tested.submit('first', handler))
+        self.assertEqual([False] * 3, results)
+        self.assertEqual(['first', 'fourth'], self.handled)
+
+    def test_discards_older_pending_request(self):
+        """Test if a request older than the handled one is discarded."""
+        fd = self._hold_lock()
+        self.tested.submit('old', self.handled.append)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+        self.tested.submit('new', self.handled.append)
+        self.tested.submit('newest', self.handled.append)
+
+        self.assertEqual(['new', 'newest'], self.handled)
+
+    def test_releases_lock_after_error(self):
+        """Test if the lock is released when the handler fails."""
+        def fail(_):
+            raise KeyError()
+
+        with self.assertRaises(KeyError):
+            self.tested.submit('first', fail)
+
+        self.assertTrue(self.tested.submit('second', self.handled.append))
+
+    def test_ignores_invalid_pending_request(self):
+        """Test if a recorded request rejected by a validator is dropped."""
+        def handler(request):
+            with open(self.lock_path + '.pending', 'w') as f:
+                json.dump({'request': 'unknown', 'time': 2 ** 62}, f)
+            self.handled.append(request)
+
+        with self.assertLogs('base16_theme_switcher.locking', 'WARNING'):
+            self.tested.submit('known', handler, 'known'.__eq__)
+
+        self.assertEqual(['known'], self.handled)
+        self.assertFalse(os.path.exists(self.lock_path + '.pending'))
+
+    def test_handles_request_if_lock_file_cannot_be_created(self):
+        """Test if a request is handled without the lock directory."""
+        blocker = os.path.join(self.tmp_dir.name, 'file')
+        open(blocker, 'w').close()
+        tested = SwitchCoordinator(os.path.join(blocker, 'switch.lock'))
+
+        with self.assertLogs('base16_theme_switcher.locking', 'WARNING'):
+            self.assertTrue(tested.submit('first', self.handled.append))
+
+        self.assertEqual(['first'], self.handled)
+
+    def test_run_exclusively_calls_action(self):
+        """Test if the action is called if no request is recorded."""
+        self.assertTrue(self.tested.run_exclusively(
+            lambda: self.handled.append('action'), self.handled.append
+        ))
+        self.assertEqual(['action'], self.handled)
+
+    def test_run_exclusively_skips_superseded_action(self):
+        """Test if a recorded request is handled instead of the action."""
+        fd = self._hold_lock()
+        self.tested.submit('first', self.handled.append)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+        self.assertFalse(self.tested.run_exclusively(
+            lambda: self.handled.append('action'), self.handled.append
+        ))
+        self.assertEqual(['first'], self.handled)
+
+    def test_run_exclusively_handles_requests_made_meanwhile(self):
+        """Test if requests made during the action are handled after it."""
+        other = SwitchCoordinator(self.lock_path)
+        results = []
+
+        def action():
+            results.append(other.submit('first', self.handled.append))
+            self.handled.append('action')
+
+        self.tested.run_exclusively(action, self.handled.append)
+
+        self.assertEqual([False], results)
+        self.assertEqual(['action', 'first'], self.handled)
@@ -1,25 +1,31 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import subprocess
 import unittest
 from unittest.mock import Mock, MagicMock, patch
 
 from parameterized import parameterized
 
-from base16_theme_switcher.logging import NotifySendHandler
+from base16_theme_switcher.logging import (
+    DBusNotificationHandler,
+    NotifySendHandler,
+)
+
+from .test_dbus import StubBusTestCase
 
 
 class NotifySendHandlerTest(unittest.TestCase):
     """Tests for NotifySendHandler class."""
 
     def setUp(self):
-        self.subprocess_call_patcher = patch(
-            'base16_theme_switcher.logging.subprocess.call'
+        self.run_patcher = patch(
+            'base16_theme_switcher.logging.commands.run'
         )
-        self.subprocess_call_patch = self.subprocess_call_patcher.start()
+        self.run_patch = self.run_patcher.start()
 
     def tearDown(self):
-        self.subprocess_call_patcher.stop()
+        self.run_patcher.stop()
 
     @parameterized.expand([
         ('normal', logging.INFO),
@@ -40,15 +46,105 @@ class NotifySendHandlerTest(unittest.TestCase):
         msg = 'Test message'
         record_mock.getMessage.return_value = msg
 
-        expected_command = (
-            'notify-send -u "{}" "Base16 Theme Switcher" "{}"'.format(
-                urgency_level, msg)
-        )
+        expected_command = [
+            'notify-send', '-u', urgency_level, 'Base16 Theme Switcher', msg
+        ]
 
         tested = NotifySendHandler()
         tested.emit(record_mock)
 
-        self.subprocess_call_patch.assert_called_once_with(
-            expected_command,
-            shell=True
+        self.run_patch.assert_called_once_with(expected_command)
+
+    @parameterized.expand([
+        ('missing_command', FileNotFoundError(2, 'No such file')),
+        ('timeout', subprocess.TimeoutExpired('notify-send', 1))
+    ])
+    def test_emit_passes_errors_to_handleError(self, _, error):
+        """Test if a failure to show a message isn't raised.
+
+        :param error: an error raised when executing the command.
+        """
+        self.run_patch.side_effect = error
+        record = logging.makeLogRecord({'levelno': logging.INFO})
+        tested = NotifySendHandler()
+        tested.handleError = Mock()
+
+        tested.emit(record)
+
+        tested.handleError.assert_called_once_with(record)
+
+
+class DBusNotificationHandlerTest(StubBusTestCase):
+    """Tests for DBusNotificationHandler class."""
+
+    def setUp(self):
+        super().setUp()
+        run_patcher = patch('base16_theme_switcher.logging.commands.run')
+        self.run_mock = run_patcher.start()
+        self.addCleanup(run_patcher.stop)
+
+    def emit(self, tested, *messages):
+        """Emit records with messages using a handler.
+
+        :param tested: the handler.
+        :param messages: tuples of levels and texts of the messages.
+        """
+        for level, text in messages:
+            tested.emit(logging.makeLogRecord(
+                {'levelno': level, 'msg': text}
+            ))
+
+    def test_emit_sends_notifications_over_one_connection(self):
+        """Test if messages are sent directly to the bus."""
+        tested = DBusNotificationHandler(address=self.bus.address)
+        self.addCleanup(tested.close)
+
+        self.emit(tested, (logging.INFO, 'first'), (logging.ERROR, 'second'))
+
+        self.assertEqual(
+            [('first', 1), ('second', 2)],
+            [(c.body[4], c.body[6]['urgency'][1]) for c in self.bus.calls[1:]]
         )
+        self.assertEqual(1, self.bus.connections)
+        self.run_mock.assert_not_called()
+
+    def test_emit_falls_back_to_notify_send(self):
+        """Test if notify-send is used if the service is unavailable."""
+        del self.bus.methods['Notify']
+        tested = DBusNotificationHandler(address=self.bus.address)
+        self.addCleanup(tested.close)
+
+        self.emit(tested, (logging.INFO, 'first'), (logging.INFO, 'second'))
+
+        self.assertEqual(2, self.run_mock.call_count)
+        self.assertEqual(1, self.bus.connections)
+        self.run_mock.assert_called_with([
+            'notify-send', '-u', 'normal', 'Base16 Theme Switcher', 'second'
+        ])
+
+    def test_emit_passes_fallback_errors_to_handleError(self):
+        """Test if a missing notify-send doesn't break logging."""
+        tested = DBusNotificationHandler(
+            address='unix:path=' + self.bus.path + '-missing'
+        )
+        tested.handleError = Mock()
+        self.run_mock.side_effect = FileNotFoundError(2, 'No such file')
+
+        self.emit(tested, (logging.ERROR, 'message'))
+
+        self.assertEqual(1, tested.handleError.call_count)
+
+    def test_emit_passes_unexpected_errors_to_handleError(self):
+        """Test if an unexpected error of the D-Bus call isn't raised."""
+        tested = DBusNotificationHandler(address=self.bus.address)
+        self.addCleanup(tested.close)
+        tested.handleError = Mock()
+
+        with patch(
+                'base16_theme_switcher.logging.dbus.notify',
+                side_effect=ValueError
+        ):
+            self.emit(tested, (logging.INFO, 'message'))
+
+        self.assertEqual(1, tested.handleError.call_count)
+        self.run_mock.assert_not_called()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Tests for parsing command-line arguments."""
+
+import io
+import unittest
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.__main__ import main, parse_args
+
+
+class ParseArgsTest(unittest.TestCase):
+    """Tests for parse_args function."""
+
+    @parameterized.expand([
+        ('bare_theme_name', ['ocean'], 'set', 'ocean'),
+        ('theme_name_after_options', ['-v', '-c', 'x.yml', 'ocean'], 'set',
+         'ocean'),
+        ('set_options', ['-d', ':1', 'ocean'], 'set', 'ocean'),
+        ('no_arguments', [], 'set', None),
+        ('set_command', ['set', 'ocean'], 'set', 'ocean'),
+        ('reload_option', ['-r'], 'reload', None),
+        ('combined_reload_option', ['-vr'], 'reload', None),
+        ('other_command', ['--config=x.yml', 'stats'], 'stats', None),
+        ('display_jobs', ['-j', '2', 'ocean'], 'set', 'ocean')
+    ])
+    def test_gets_command(self, _, argv, command, theme):
+        """Test if the command and the theme name are recognized.
+
+        :param argv: command-line arguments.
+        :param command: the expected command.
+        :param theme: the expected name of a theme.
+        """
+        args = parse_args(argv)
+
+        self.assertEqual(
+            (command, theme), (args.command, getattr(args, 'theme', None))
+        )
+
+    @parameterized.expand([
+        ('zero_display_jobs', ['-j', '0', 'ocean']),
+        ('negative_display_jobs', ['--display-jobs=-1']),
+        ('text_jobs', ['gallery', 'out', '-j', 'x']),
+        ('zero_jobs', ['export', '-j', '0'])
+    ])
+    def test_rejects_non_positive_job_count(self, _, argv):
+        """Test if numbers of parallel jobs must be positive.
+
+        :param argv: command-line arguments.
+        """
+        with patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                parse_args(argv)
+
+    def test_rejects_reload_option_with_theme_name(self):
+        """Test if a theme can't be both set and reloaded."""
+        with patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                parse_args(['-r', 'ocean'])
+
+
+class MainTest(unittest.TestCase):
+    """Tests for main function."""
+
+    def setUp(self):
+        run_patcher = patch('base16_theme_switcher.completion.run')
+        self.run_mock = run_patcher.start()
+        self.run_mock.return_value = 0
+        self.addCleanup(run_patcher.stop)
+        app_main_patcher = patch('base16_theme_switcher.app.main')
+        self.app_main_mock = app_main_patcher.start()
+        self.addCleanup(app_main_patcher.stop)
+
+    def main(self, *args):
+        """Execute the application with given arguments.
+
+        :param args: the arguments.
+        :returns: an exit status, or None if the application didn't exit.
+        """
+        with patch('sys.argv', ['base16-theme-switcher'] + list(args)):
+            try:
+                main()
+            except SystemExit as e:
+                return e.code
+        return None
+
+    def test_completes_after_global_options(self):
+        """Test if complete is executed with the configured path."""
+        status = self.main('-c', 'config.yml', 'complete', 'base')
+
+        self.assertEqual(0, status)
+        self.run_mock.assert_called_once_with('base', None, 'config.yml')
+        self.app_main_mock.assert_not_called()
+
+    def test_sets_bare_theme_name(self):
+        """Test if a theme name without a command is set."""
+        self.main('-c', 'config.yml', 'ocean')
+
+        args = self.app_main_mock.call_args[0][0]
+        self.assertEqual(
+            ('set', 'ocean', 'config.yml'),
+            (args.command, args.theme, args.config)
+        )
+        self.run_mock.assert_not_called()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Tests for metrics exported for Prometheus."""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from parameterized import parameterized
+
+from base16_theme_switcher.metrics import (
+    DEFAULT_BUCKETS,
+    Metrics,
+    render,
+    save,
+)
+
+
+class MetricsTest(unittest.TestCase):
+    """Tests for Metrics class."""
+
+    def setUp(self):
+        self.tested = Metrics()
+
+    def test_increments_counters_by_labels(self):
+        """Test if counters with different labels are separate."""
+        self.tested.increment('b16ts_runs_total', command='set')
+        self.tested.increment('b16ts_runs_total', 2, command='set')
+        self.tested.increment('b16ts_runs_total', command='reload')
+
+        self.assertEqual(
+            {
+                'b16ts_runs_total{command="set"}': 3,
+                'b16ts_runs_total{command="reload"}': 1
+            },
+            self.tested.add_to({})['counters']
+        )
+
+    @parameterized.expand([
+        ('smallest_bucket', 0.001, 0),
+        ('bucket_bound', 0.1, 4),
+        ('infinite_bucket', 60, len(DEFAULT_BUCKETS) - 1)
+    ])
+    def test_observes_in_buckets(self, _, value, first_bucket):
+        """Test if a value is counted in buckets with higher bounds.
+
+        :param value: an observed value.
+        :param first_bucket: an index of the first bucket counting it.
+        """
+        self.tested.observe('b16ts_run_duration_seconds', value)
+
+        histogram = self.tested.add_to({})['histograms'][
+            'b16ts_run_duration_seconds'
+        ]
+        self.assertEqual(
+            [0] * first_bucket + [1] * (len(DEFAULT_BUCKETS) - first_bucket),
+            histogram['buckets']
+        )
+        self.assertEqual(value, histogram['sum'])
+
+    def test_times_failing_block(self):
+        """Test if a duration is observed when a block raises an error."""
+        with self.assertRaises(ValueError):
+            with self.tested.time('b16ts_phase_duration_seconds', phase='x'):
+                raise ValueError
+
+        self.assertIn(
+            'b16ts_phase_duration_seconds{phase="x"}',
+            self.tested.add_to({})['histograms']
+        )
+
+    def test_adds_to_previous_totals(self):
+        """Test if counters are summed and gauges are replaced."""
+        previous = {
+            'counters': {'b16ts_switches_total': 5},
+            'gauges': {'b16ts_themes': 10},
+            'histograms': {}
+        }
+        self.tested.increment('b16ts_switches_total')
+        self.tested.set('b16ts_themes', 12)
+
+        state = self.tested.add_to(previous)
+
+        self.assertEqual(6, state['counters']['b16ts_switches_total'])
+        self.assertEqual(12, state['gauges']['b16ts_themes'])
+        self.assertEqual(5, previous['counters']['b16ts_switches_total'])
+
+
+class RenderTest(unittest.TestCase):
+    """Tests for render function."""
+
+    def setUp(self):
+        metrics = Metrics()
+        metrics.increment('b16ts_failures_total', exception='KeyError')
+        metrics.observe('b16ts_applier_duration_seconds', 0.2, applier='gtk')
+        self.lines = render(metrics.add_to({})).splitlines()
+
+    @parameterized.expand([
+        ('type', '# TYPE b16ts_failures_total counter'),
+        ('counter', 'b16ts_failures_total{exception="KeyError"} 1'),
+        (
+            'bucket',
+            'b16ts_applier_duration_seconds_bucket{applier="gtk",le="0.25"} 1'
+        ),
+        (
+            'infinite_bucket',
+            'b16ts_applier_duration_seconds_bucket{applier="gtk",le="+Inf"} 1'
+        ),
+        ('sum', 'b16ts_applier_duration_seconds_sum{applier="gtk"} 0.2'),
+        ('count', 'b16ts_applier_duration_seconds_count{applier="gtk"} 1')
+    ])
+    def test_contains(self, _, expected):
+        """Test if the text contains an expected line.
+
+        :param expected: the line.
+        """
+        self.assertIn(expected, self.lines)
+
+
+class SaveTest(unittest.TestCase):
+    """Tests for save function."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'b16ts.prom')
+
+    def _save_switch(self):
+        metrics = Metrics()
+        metrics.increment('b16ts_switches_total')
+        save(metrics, self.path)
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_accumulates_runs(self):
+        """Test if totals of several runs are written."""
+        self._save_switch()
+        lines = self._save_switch()
+
+        self.assertIn('b16ts_switches_total 2', lines)
+        self.assertTrue(any(
+            line.startswith('b16ts_last_run_timestamp_seconds ')
+            for line in lines
+        ))
+
+    def test_keeps_metrics_of_concurrent_runs(self):
+        """Test if runs saving metrics at the same time are all counted."""
+        threads = [
+            threading.Thread(target=self._save_switch) for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertIn('b16ts_switches_total 9', self._save_switch())
+
+    def test_ignores_invalid_state(self):
+        """Test if an invalid state file is replaced."""
+        with open(self.path + '.json', 'w', encoding='utf-8') as f:
+            f.write('{')
+
+        lines = self._save_switch()
+
+        self.assertIn('b16ts_switches_total 1', lines)
+        with open(self.path + '.json', encoding='utf-8') as f:
+            self.assertEqual(
+                1, json.load(f)['counters']['b16ts_switches_total']
+            )
+
+    def test_leaves_no_temporary_files(self):
+        """Test if only the metrics, state and lock files are left."""
+        self._save_switch()
+
+        self.assertEqual(
+            ['b16ts.prom', 'b16ts.prom.json', 'b16ts.prom.lock'],
+            sorted(os.listdir(os.path.dirname(self.path)))
+        )
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 """Tests for components of plugin discovery and loading system."""
 
+import importlib
+import sys
+from pathlib import Path
 from random import shuffle
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
@@ -9,9 +13,11 @@ from parameterized import parameterized
 
 from base16_theme_switcher.plugin_loading import (
     ConfigValueError,
+    LazyPlugin,
     SetupError,
     apply_configured_plugins,
     get_modules_by_name_prefix,
+    read_plugin_roles,
 )
 
 
@@ -48,6 +54,7 @@ class GetModulesByNamePrefixTest(TestCase):
             'base16_theme_switcher.plugin_loading.importlib'
         )
         self.importlib_mock = self.importlib_patcher.start()
+        self.importlib_mock.util.find_spec.return_value = None
 
     def tearDown(self):
         self.pkgutil_patcher.stop()
@@ -78,6 +85,141 @@ class GetModulesByNamePrefixTest(TestCase):
 
         self.assertCountEqual(expected, module_to_name_map.keys())
 
+    def test_doesnt_import_modules_declaring_roles(self):
+        """Test if lazy plugins are returned for declared roles."""
+        lazy_module_name = self.PLUGIN_MODULE_NAMES[0]
+
+        def find_spec(name):
+            if name != lazy_module_name:
+                return None
+            spec = Mock()
+            spec.loader.get_source.return_value = 'PLUGIN_ROLES = ("prompt",)'
+            return spec
+
+        self.importlib_mock.util.find_spec.side_effect = find_spec
+
+        module_to_name_map = get_modules_by_name_prefix(self.PREFIX)
+
+        plugin = module_to_name_map[self.PLUGIN_NAMES[0]]
+        self.assertIsInstance(plugin, LazyPlugin)
+        self.assertEqual(('prompt',), plugin.roles)
+        self.assertNotIn(
+            lazy_module_name,
+            [c[0][0] for c in self.importlib_mock.import_module.call_args_list]
+        )
+
+
+class PluginModuleTestCase(TestCase):
+    """A base for tests using plugin modules written to a directory."""
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        sys.path.insert(0, self.tmp_dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp_dir.name)
+        for name in [n for n in sys.modules if n.startswith('b16ts_test_')]:
+            del sys.modules[name]
+        self.tmp_dir.cleanup()
+
+    def write_module(self, name, source):
+        """Write a source of a plugin module.
+
+        :param name: a name of the module.
+        :param source: the source.
+        """
+        Path(self.tmp_dir.name, name + '.py').write_text(source)
+        importlib.invalidate_caches()
+
+
+class ReadPluginRolesTest(PluginModuleTestCase):
+    """Tests for read_plugin_roles function."""
+
+    @parameterized.expand([
+        ('tuple', 'PLUGIN_ROLES = ("prompt", "applier")',
+         ('prompt', 'applier')),
+        ('string', 'PLUGIN_ROLES = "applier"', ('applier',)),
+        ('missing', 'ROLES = ("prompt",)', None),
+        ('not_literal', 'PLUGIN_ROLES = get_roles()', None),
+        ('invalid_syntax', 'PLUGIN_ROLES = (', None),
+    ])
+    def test_reads(self, _, source, expected):
+        """Test if expected roles are read from a module.
+
+        :param source: a source of the module.
+        :param expected: the expected roles.
+        """
+        self.write_module('b16ts_test_plugin', source)
+
+        self.assertEqual(expected, read_plugin_roles('b16ts_test_plugin'))
+
+    def test_doesnt_import_module(self):
+        """Test if the module isn't executed while reading its roles."""
+        self.write_module(
+            'b16ts_test_plugin',
+            'PLUGIN_ROLES = ("prompt",)\nraise RuntimeError()\n'
+        )
+
+        self.assertEqual(('prompt',), read_plugin_roles('b16ts_test_plugin'))
+        self.assertNotIn('b16ts_test_plugin', sys.modules)
+
+    def test_returns_none_for_missing_module(self):
+        """Test if None is returned for a module that doesn't exist."""
+        self.assertIsNone(read_plugin_roles('b16ts_test_missing'))
+
+
+class LazyPluginTest(PluginModuleTestCase):
+    """Tests for LazyPlugin class."""
+
+    def setUp(self):
+        super().setUp()
+        self.tested = LazyPlugin(
+            'plugin', 'b16ts_test_plugin', ('prompt',)
+        )
+
+    def test_apply_to_registers_plugin(self):
+        """Test if apply_to passes the plugin to add_lazy_plugin."""
+        plugin_api_impl_mock = Mock()
+
+        self.tested.apply_to(plugin_api_impl_mock)
+
+        plugin_api_impl_mock.add_lazy_plugin.assert_called_once_with(
+            self.tested
+        )
+
+    def test_activate_applies_module(self):
+        """Test if the plugin module is applied to the object."""
+        self.write_module(
+            'b16ts_test_plugin',
+            'def apply_to(plugin_api_impl):\n'
+            '    plugin_api_impl.applied = True\n'
+        )
+        plugin_api_impl_mock = Mock(applied=False)
+
+        self.tested.activate(plugin_api_impl_mock)
+
+        self.assertTrue(plugin_api_impl_mock.applied)
+
+    @parameterized.expand([
+        ('missing_module', None),
+        ('setup_error', 'def apply_to(_):\n    raise SetupError()\n'),
+    ])
+    def test_raises_SetupError(self, _, source):
+        """Test if SetupError is raised for a plugin failing to activate.
+
+        :param source: a source of the plugin module, or None if the
+            module doesn't exist.
+        """
+        if source is not None:
+            self.write_module(
+                'b16ts_test_plugin',
+                'from base16_theme_switcher.config_structures import '
+                'SetupError\n' + source
+            )
+
+        with self.assertRaises(SetupError):
+            self.tested.activate(Mock())
+
 
 class ApplyConfiguredPluginsTest(TestCase):
     """Tests for apply_configured_plugins function."""
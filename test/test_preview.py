@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Tests for previewing themes."""
+
+import threading
+import unittest
+from unittest.mock import Mock, call
+
+from base16_theme_switcher.preview import ThemePreview
+
+
+class ThemePreviewTest(unittest.TestCase):
+    """Tests for ThemePreview class."""
+
+    def setUp(self):
+        self.applied = threading.Event()
+        self.apply_mock = Mock(side_effect=lambda n: self.applied.set())
+
+    def create(self, delay=0):
+        """Create a tested preview, closed after each test.
+
+        :param delay: a debouncing delay of the preview, in seconds.
+        :returns: the preview.
+        """
+        preview = ThemePreview(self.apply_mock, 'original', delay)
+        self.addCleanup(preview.close)
+        return preview
+
+    def select_and_wait(self, preview, theme_name):
+        """Select a theme and wait until it is applied.
+
+        :param preview: the tested preview.
+        :param theme_name: a name of the theme.
+        """
+        self.applied.clear()
+        preview.select(theme_name)
+        self.assertTrue(self.applied.wait(5))
+
+    def test_applies_selected_theme(self):
+        """Test if a selected theme is applied in the background."""
+        preview = self.create()
+
+        self.select_and_wait(preview, 'first')
+
+        self.apply_mock.assert_called_once_with('first')
+
+    def test_applies_only_last_of_quick_selections(self):
+        """Test if themes selected in quick succession are skipped."""
+        preview = self.create(delay=0.2)
+
+        for name in 'first', 'second', 'third':
+            preview.select(name)
+        self.assertTrue(self.applied.wait(5))
+
+        self.apply_mock.assert_called_once_with('third')
+
+    def test_close_drops_pending_selection(self):
+        """Test if a theme not applied yet isn't applied on close."""
+        preview = self.create(delay=60)
+        preview.select('first')
+
+        preview.close()
+
+        self.apply_mock.assert_not_called()
+
+    def test_cancel_restores_original_theme(self):
+        """Test if the original theme is applied on cancel."""
+        preview = self.create()
+        self.select_and_wait(preview, 'first')
+
+        preview.cancel()
+
+        self.assertEqual(
+            [call('first'), call('original')], self.apply_mock.mock_calls
+        )
+
+    def test_cancel_doesnt_apply_anything_if_nothing_was_previewed(self):
+        """Test if nothing is restored if nothing was applied."""
+        self.create().cancel()
+
+        self.apply_mock.assert_not_called()
+
+    def test_keeps_previewing_after_failure(self):
+        """Test if a failure to apply a theme is only logged."""
+        def apply(name):
+            self.applied.set()
+            if name == 'first':
+                raise OSError('first')
+
+        self.apply_mock.side_effect = apply
+        preview = self.create()
+
+        with self.assertLogs('base16_theme_switcher.preview', 'WARNING'):
+            self.select_and_wait(preview, 'first')
+        self.select_and_wait(preview, 'second')
+
+        self.apply_mock.assert_called_with('second')
+
+    def test_exiting_context_with_error_cancels(self):
+        """Test if the original theme is restored after an error."""
+        with self.assertRaises(ValueError):
+            with self.create() as preview:
+                self.select_and_wait(preview, 'first')
+                raise ValueError
+
+        self.apply_mock.assert_called_with('original')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from base16_theme_switcher.app import ThemeApplier
+from base16_theme_switcher.reloading import ConfigReloader, diff_configs
+
+CONFIG = '''\
+theme-search-dir-path: {themes}
+latency-history-path: {history}
+switch-lock-path: {lock}
+plugins:
+  prompt: {{}}
+  applier:
+    option: {option}
+'''
+
+
+class DiffConfigsTest(unittest.TestCase):
+    """Tests for diff_configs function."""
+
+    def test_finds_changed_options_and_plugins(self):
+        """Test if added, removed and changed keys are found."""
+        old = {
+            'theme': 'first',
+            'removed': 1,
+            'plugins': {'same': {'a': 1}, 'changed': {'a': 1}, 'removed': {}}
+        }
+        new = {
+            'theme': 'second',
+            'added': 1,
+            'plugins': {'same': {'a': 1}, 'changed': {'a': 2}, 'added': {}}
+        }
+
+        diff = diff_configs(old, new)
+
+        self.assertEqual(
+            {'theme', 'removed', 'added', 'plugins'}, diff.options
+        )
+        self.assertEqual({'changed', 'removed', 'added'}, diff.plugins)
+        self.assertFalse(diff.requires_theme_search())
+
+
+class ConfigReloaderTest(unittest.TestCase):
+    """Tests for ConfigReloader class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, 'config.yml')
+
+        self.find_themes_patcher = patch(
+            'base16_theme_switcher.reloading.find_themes'
+        )
+        self.find_themes_mock = self.find_themes_patcher.start()
+        self.find_themes_mock.return_value = MagicMock()
+
+        def apply_prompt(builder):
+            builder.prompt = Mock()
+
+        def apply_applier(builder):
+            builder.add_theme_applier(Mock(spec=ThemeApplier), 'applier')
+
+        self.plugins = {
+            'prompt': Mock(apply_to=Mock(side_effect=apply_prompt)),
+            'applier': Mock(apply_to=Mock(side_effect=apply_applier))
+        }
+        self.write_config()
+        self.tested = ConfigReloader(self.config_path, self.plugins)
+        self.tested.load()
+
+    def tearDown(self):
+        self.find_themes_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def write_config(self, themes='/themes', option=1):
+        """Write the configuration file.
+
+        The modification time is set explicitly, so that a change is
+        detected even on file systems with a low time resolution.
+
+        :param themes: a path to the theme directory.
+        :param option: a value of an option of the applier plugin.
+        """
+        with open(self.config_path, 'w') as f:
+            f.write(CONFIG.format(
+                themes=themes,
+                history=os.path.join(self.tmp_dir.name, 'history.json'),
+                lock=os.path.join(self.tmp_dir.name, 'switch.lock'),
+                option=option
+            ))
+        mtime = getattr(self, 'mtime', 1000000000) + 1000000000
+        os.utime(self.config_path, ns=(mtime, mtime))
+        self.mtime = mtime
+
+    def test_returns_none_if_unchanged(self):
+        """Test if nothing is rebuilt for an unchanged file."""
+        self.assertIsNone(self.tested.reload_if_changed())
+
+    def test_applies_only_plugins_with_changed_sections(self):
+        """Test if unchanged plugins are reused."""
+        self.write_config(option=2)
+
+        self.assertIsNotNone(self.tested.reload_if_changed())
+
+        self.assertEqual(1, self.plugins['prompt'].apply_to.call_count)
+        self.assertEqual(2, self.plugins['applier'].apply_to.call_count)
+        self.assertEqual(1, self.find_themes_mock.call_count)
+
+    def test_reuses_components_of_unchanged_plugins(self):
+        """Test if a reused plugin provides the same prompt."""
+        self.write_config(option=2)
+
+        theme_switcher = self.tested.reload_if_changed()
+
+        prompt = self.plugins['prompt'].apply_to.call_args[0][0].prompt
+        self.assertIs(prompt, theme_switcher._prompt)
+
+    def test_searches_for_themes_if_directory_changed(self):
+        """Test if themes are searched for only after a relevant change."""
+        self.write_config(themes='/other-themes')
+
+        self.tested.reload_if_changed()
+
+        self.assertEqual(2, self.find_themes_mock.call_count)
+        self.assertEqual(1, self.plugins['applier'].apply_to.call_count)
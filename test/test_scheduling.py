@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Tests for scheduling theme appliers according to their dependencies."""
+
+import threading
+import unittest
+from unittest.mock import ANY, Mock
+
+from parameterized import parameterized
+
+from base16_theme_switcher.scheduling import (
+    ApplierScheduler,
+    ApplierTask,
+    DependencyCycleError,
+    SetupError,
+)
+
+
+class RecordingApplier:
+    """A theme applier recording the order in which it was used."""
+
+    def __init__(self, name, log, lock, error=None):
+        self.name = name
+        self._log = log
+        self._lock = lock
+        self._error = error
+
+    def apply(self, theme):
+        with self._lock:
+            self._log.append(self.name)
+        if self._error is not None:
+            raise self._error
+
+
+class TwoPhaseRecordingApplier(RecordingApplier):
+    """A two-phase theme applier recording its phases."""
+
+    def __init__(self, name, log, lock, error=None, prepare_error=None):
+        super().__init__(name, log, lock, error)
+        self._prepare_error = prepare_error
+
+    def _record(self, event):
+        with self._lock:
+            self._log.append(event)
+
+    def prepare(self, theme):
+        self._record('prepare ' + self.name)
+        if self._prepare_error is not None:
+            raise self._prepare_error
+        change = Mock()
+        change.commit.side_effect = lambda: self.apply(theme)
+        change.abort.side_effect = lambda: self._record('abort ' + self.name)
+        return change
+
+
+class ApplierSchedulerTest(unittest.TestCase):
+    """Tests for ApplierScheduler class."""
+
+    def setUp(self):
+        self.log = []
+        self.lock = threading.Lock()
+
+    def task(self, name, dependencies=(), cost=1, error=None):
+        """Get a task with an applier recording its use.
+
+        :param name: a name of the task.
+        :param dependencies: names of tasks the task depends on.
+        :param cost: an estimated cost of the task.
+        :param error: an error to be raised by the applier, if any.
+        :returns: the task.
+        """
+        applier = RecordingApplier(name, self.log, self.lock, error)
+        return ApplierTask(name, applier, tuple(dependencies), cost)
+
+    @parameterized.expand([
+        ('self_dependency', [('a', ['a'])]),
+        ('two_tasks', [('a', ['b']), ('b', ['a'])]),
+        ('three_tasks', [('x', []), ('a', ['c']), ('b', ['a']), ('c', ['b'])])
+    ])
+    def test_init_raises_DependencyCycleError_for(self, _, definitions):
+        """Test if the error is raised for cyclic dependencies.
+
+        :param definitions: pairs of task names and their dependencies.
+        """
+        tasks = [self.task(n, d) for n, d in definitions]
+        with self.assertRaisesRegex(DependencyCycleError, 'in a cycle'):
+            ApplierScheduler(tasks)
+
+    def test_init_raises_SetupError_for_unknown_dependency(self):
+        """Test if the error is raised for an unregistered dependency."""
+        with self.assertRaisesRegex(
+            SetupError,
+            'The "a" theme applier depends on an unknown theme applier: "b".'
+        ):
+            ApplierScheduler([self.task('a', ['b'])])
+
+    def test_init_raises_SetupError_for_duplicate_name(self):
+        """Test if the error is raised for tasks sharing a name."""
+        with self.assertRaisesRegex(
+            SetupError,
+            'A theme applier named "a" is already registered.'
+        ):
+            ApplierScheduler([self.task('a'), self.task('a')])
+
+    def test_run_respects_dependencies(self):
+        """Test if each applier is used after its dependencies."""
+        tasks = [
+            self.task('d', ['b', 'c']),
+            self.task('b', ['a']),
+            self.task('c', ['a']),
+            self.task('a'),
+            self.task('e')
+        ]
+        ApplierScheduler(tasks, max_workers=4).run(Mock())
+
+        self.assertCountEqual('abcde', self.log)
+        for t in tasks:
+            for d in t.dependencies:
+                self.assertLess(self.log.index(d), self.log.index(t.name))
+
+    def test_run_starts_critical_path_first(self):
+        """Test if the most costly chain of appliers is started first."""
+        tasks = [
+            self.task('cheap', cost=5),
+            self.task('first', cost=1),
+            self.task('second', ['first'], cost=10)
+        ]
+        ApplierScheduler(tasks, max_workers=1).run(Mock())
+
+        self.assertEqual(['first', 'cheap', 'second'], self.log)
+
+    def test_run_skips_tasks(self):
+        """Test if skipped tasks are treated as already finished."""
+        tasks = [self.task('a'), self.task('b', ['a'])]
+        ApplierScheduler(tasks).run(Mock(), skip=['a'])
+
+        self.assertEqual(['b'], self.log)
+
+    def test_run_raises_error_of_applier(self):
+        """Test if an error stops the appliers depending on the failed one."""
+        error = ValueError('failed')
+        tasks = [self.task('a', error=error), self.task('b', ['a'])]
+        with self.assertRaisesRegex(ValueError, 'failed'):
+            ApplierScheduler(tasks).run(Mock())
+
+        self.assertEqual(['a'], self.log)
+
+    def test_sequential_uses_appliers_in_order(self):
+        """Test if appliers are used in the given order."""
+        appliers = [
+            RecordingApplier(n, self.log, self.lock) for n in 'cab'
+        ]
+        ApplierScheduler.sequential(appliers).run(Mock())
+
+        self.assertEqual(list('cab'), self.log)
+
+
+class TwoPhaseApplierSchedulerTest(unittest.TestCase):
+    """Tests for running two-phase theme appliers."""
+
+    def setUp(self):
+        self.log = []
+        self.lock = threading.Lock()
+
+    def task(self, name, dependencies=(), two_phase=True, **errors):
+        """Get a task with an applier recording its use.
+
+        :param name: a name of the task.
+        :param dependencies: names of tasks the task depends on.
+        :param two_phase: True if the applier is a two-phase one.
+        :param errors: errors to be raised by the applier, as error or
+            prepare_error keyword arguments.
+        :returns: the task.
+        """
+        if two_phase:
+            applier = TwoPhaseRecordingApplier(
+                name, self.log, self.lock, **errors
+            )
+        else:
+            applier = RecordingApplier(name, self.log, self.lock, **errors)
+        return ApplierTask(name, applier, tuple(dependencies), 1)
+
+    def test_prepares_before_using_appliers(self):
+        """Test if changes are prepared before any applier is used."""
+        tasks = [
+            self.task('a', two_phase=False),
+            self.task('b', ['a']),
+            self.task('c', ['b'])
+        ]
+
+        ApplierScheduler(tasks).run(Mock())
+
+        self.assertCountEqual(['prepare b', 'prepare c'], self.log[:2])
+        self.assertEqual(['a', 'b', 'c'], self.log[2:])
+
+    def test_skips_preparing_skipped_tasks(self):
+        """Test if changes of skipped tasks are not prepared."""
+        ApplierScheduler([self.task('a'), self.task('b', ['a'])]).run(
+            Mock(), skip=['a']
+        )
+
+        self.assertEqual(['prepare b', 'b'], self.log)
+
+    def test_aborts_prepared_changes_if_preparing_fails(self):
+        """Test if nothing is used if preparing any change fails."""
+        tasks = [
+            self.task('a', two_phase=False),
+            self.task('b'),
+            self.task('c', prepare_error=ValueError('c'))
+        ]
+
+        with self.assertRaises(ValueError):
+            ApplierScheduler(tasks).run(Mock())
+
+        self.assertCountEqual(['prepare b', 'prepare c', 'abort b'], self.log)
+
+    def test_aborts_uncommitted_changes_if_applier_fails(self):
+        """Test if changes not committed after a failure are aborted."""
+        tasks = [
+            self.task('a', two_phase=False, error=ValueError('a')),
+            self.task('b', ['a'])
+        ]
+
+        with self.assertRaises(ValueError):
+            ApplierScheduler(tasks).run(Mock())
+
+        self.assertEqual(['prepare b', 'a', 'abort b'], self.log)
+
+    def test_reports_durations_including_preparation(self):
+        """Test if each task is reported once after it is committed."""
+        on_applied = Mock()
+
+        ApplierScheduler([self.task('a')]).run(Mock(), on_applied=on_applied)
+
+        on_applied.assert_called_once_with('a', ANY)
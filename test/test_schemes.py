@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Tests for reading base16 scheme files and caching their palettes."""
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+from base16_theme_switcher.schemes import (
+    COLOR_NAMES,
+    SchemeCache,
+    convert_scheme,
+    load_scheme,
+    to_xresources,
+)
+
+
+def get_scheme_text(values=None, **overrides):
+    """Get a content of a scheme file.
+
+    :param values: a sequence of 16 color values without "#", or None
+        to use generated ones.
+    :param overrides: values for colors with given names, to be used
+        instead of default ones. None removes a color.
+    :returns: the content.
+    """
+    if values is None:
+        values = ['{0}{0}{0}'.format(c * 2) for c in '0123456789abcdef']
+    colors = dict(zip(COLOR_NAMES, values))
+    colors.update(overrides)
+    lines = ['scheme: "Example"', 'author: "Someone"']
+    lines.extend(
+        '{}: "{}"'.format(n, v) for n, v in colors.items() if v is not None
+    )
+    return '\n'.join(lines) + '\n'
+
+
+class SchemeFileTestCase(unittest.TestCase):
+    """A base for tests using scheme files."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, text, mtime=None):
+        """Write a scheme file in a temporary directory.
+
+        :param name: a name of the file.
+        :param text: a content of the file.
+        :param mtime: a modification time to be set for the file.
+        :returns: a path to the file.
+        """
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+
+class LoadSchemeTest(SchemeFileTestCase):
+    """Tests for load_scheme function."""
+
+    def test_returns_prefixed_colors(self):
+        """Test if colors are returned with "#" prefix."""
+        path = self.write('example.yaml', get_scheme_text(base0A='ABCDEF'))
+
+        actual = load_scheme(path)
+
+        self.assertEqual('#000000', actual['base00'])
+        self.assertEqual('#abcdef', actual['base0A'])
+        self.assertEqual(16, len(actual))
+
+    def test_keeps_leading_zeros_of_unquoted_values(self):
+        """Test if values are not interpreted as numbers."""
+        path = self.write('example.yaml', 'base00: 000000\nbase01: 010101\n')
+        self.assertEqual(
+            {'base00': '#000000', 'base01': '#010101'}, load_scheme(path)
+        )
+
+    def test_returns_empty_map_for_non_mapping(self):
+        """Test if a file without a mapping has no colors."""
+        path = self.write('list.yaml', '- a\n- b\n')
+        self.assertEqual({}, load_scheme(path))
+
+
+class ToXresourcesTest(unittest.TestCase):
+    """Tests for to_xresources function."""
+
+    def test_defines_colors_and_resources(self):
+        """Test if colors are defined and used for resources."""
+        actual = to_xresources({'base00': '#000000', 'base05': '#555555'})
+
+        self.assertIn('#define base00 #000000\n', actual)
+        self.assertIn('#define base05 #555555\n', actual)
+        self.assertIn('*foreground:   base05\n', actual)
+
+
+class ConvertSchemeTest(SchemeFileTestCase):
+    """Tests for convert_scheme function."""
+
+    def test_returns_no_palette_for_invalid_scheme(self):
+        """Test if an invalid scheme is recognized."""
+        path = self.write(
+            'invalid.yaml', get_scheme_text(base01='zzzzzz'), 1000
+        )
+        self.assertEqual((path, 1000, None, None), convert_scheme(path))
+
+    def test_returns_no_mtime_for_missing_file(self):
+        """Test if a missing file is recognized."""
+        path = os.path.join(self.dir.name, 'missing.yaml')
+        self.assertEqual((path, None, None, None), convert_scheme(path))
+
+
+class SchemeCacheTest(SchemeFileTestCase):
+    """Tests for SchemeCache class."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_path = os.path.join(self.dir.name, 'cache', 'schemes')
+        self.values = ['{:06x}'.format(i * 0x0f0e0d) for i in range(16)]
+        self.paths = [
+            self.write('a.yaml', get_scheme_text(self.values), 1000),
+            self.write('b.yaml', get_scheme_text(), 1000),
+            self.write('c.yaml', get_scheme_text(base0F=None), 1000)
+        ]
+
+    def test_get_returns_None_for_unknown_scheme(self):
+        """Test if nothing is returned before the cache is updated."""
+        self.assertIsNone(SchemeCache(self.cache_path).get(self.paths[0]))
+
+    def test_update_persists_valid_schemes(self):
+        """Test if colors of schemes are available to another cache."""
+        SchemeCache(self.cache_path).update(self.paths, max_workers=2)
+
+        tested = SchemeCache(self.cache_path)
+        actual = tested.get(self.paths[0])
+
+        self.assertEqual(
+            {n: '#' + v for n, v in zip(COLOR_NAMES, self.values)},
+            actual.definitions
+        )
+        self.assertEqual(
+            (15, 14, 13), actual.derived_colors.rgb('base01')
+        )
+        self.assertIsNotNone(tested.get(self.paths[1]))
+        self.assertIsNone(tested.get(self.paths[2]))
+
+    def test_is_valid_reports_recorded_validity(self):
+        """Test if schemes are known to be valid only when up to date."""
+        tested = SchemeCache(self.cache_path)
+        tested.update(self.paths)
+        os.utime(self.paths[1], ns=(2000, 2000))
+
+        self.assertEqual(
+            [True, None, False], [tested.is_valid(p) for p in self.paths]
+        )
+
+    def test_get_returns_None_for_modified_scheme(self):
+        """Test if an entry of a modified file is not used."""
+        SchemeCache(self.cache_path).update(self.paths)
+        os.utime(self.paths[0], ns=(2000, 2000))
+
+        self.assertIsNone(SchemeCache(self.cache_path).get(self.paths[0]))
+
+    def test_update_converts_only_new_and_modified_schemes(self):
+        """Test if up-to-date entries, even invalid ones, are reused."""
+        SchemeCache(self.cache_path).update(self.paths)
+        os.utime(self.paths[1], ns=(2000, 2000))
+
+        with patch(
+            'base16_theme_switcher.schemes.convert_scheme'
+        ) as convert_mock:
+            convert_mock.side_effect = convert_scheme
+            SchemeCache(self.cache_path).update(self.paths)
+
+        convert_mock.assert_called_once_with(self.paths[1])
+
+    def test_update_doesnt_fork_workers(self):
+        """Test if workers are started without forking the process."""
+        with patch(
+            'base16_theme_switcher.schemes.ProcessPoolExecutor',
+            wraps=ProcessPoolExecutor
+        ) as executor_mock:
+            SchemeCache(self.cache_path).update(self.paths, max_workers=2)
+
+        context = executor_mock.call_args[1]['mp_context']
+        self.assertEqual('forkserver', context.get_start_method())
+        self.assertIsNotNone(SchemeCache(self.cache_path).get(self.paths[0]))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Tests for compiled templates of configuration files."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from parameterized import parameterized
+
+from base16_theme_switcher.config_structures import (
+    ConfiguredFileNotFoundError,
+)
+from base16_theme_switcher.templates import (
+    CompiledTemplate,
+    TemplateCache,
+    TemplateThemeApplier,
+)
+
+
+class CompiledTemplateTest(unittest.TestCase):
+    """Tests for CompiledTemplate class."""
+
+    @parameterized.expand([
+        ('placeholders', 'fg={base05} bg={base00}', 'fg=#d8d8d8 bg=#181818'),
+        ('no_placeholders', 'plain text', 'plain text'),
+        ('only_placeholder', '{base00}', '#181818'),
+        ('other_braces', 'a { color: {base05}; } {name}',
+         'a { color: #d8d8d8; } {name}'),
+        ('repeated_placeholder', '{base00}{base00}', '#181818#181818')
+    ])
+    def test_render_with(self, _, text, expected):
+        """Test if placeholders are replaced with colors.
+
+        :param text: a text of the template.
+        :param expected: the expected result of rendering.
+        """
+        colors = {'base00': '#181818', 'base05': '#d8d8d8'}
+        self.assertEqual(expected, CompiledTemplate(text).render(colors))
+
+    def test_color_names(self):
+        """Test if names of all colors used in the template are returned."""
+        tested = CompiledTemplate('{base01} {base0F} {base01}')
+        self.assertEqual({'base01', 'base0F'}, tested.color_names)
+
+
+class TemplateFileTestCase(unittest.TestCase):
+    """A base for tests using template files."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, text, mtime=None):
+        """Write a file in a temporary directory.
+
+        :param name: a name of the file.
+        :param text: a content of the file.
+        :param mtime: a modification time to be set for the file.
+        :returns: a path to the file.
+        """
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+
+class TemplateCacheTest(TemplateFileTestCase):
+    """Tests for TemplateCache class."""
+
+    def test_get_reuses_compiled_template(self):
+        """Test if an unchanged template is compiled only once."""
+        path = self.write('template', '{base00}', mtime=1000)
+        tested = TemplateCache()
+        self.assertIs(tested.get(path), tested.get(path))
+
+    def test_get_recompiles_modified_template(self):
+        """Test if a template is compiled again after a modification."""
+        path = self.write('template', '{base00}', mtime=1000)
+        tested = TemplateCache()
+        tested.get(path)
+        self.write('template', '{base01}', mtime=2000)
+
+        self.assertEqual({'base01'}, tested.get(path).color_names)
+
+
+class TemplateThemeApplierTest(TemplateFileTestCase):
+    """Tests for TemplateThemeApplier class."""
+
+    def setUp(self):
+        super().setUp()
+        self.colors = {'base00': '#181818', 'base05': '#d8d8d8'}
+        self.theme = MagicMock()
+        self.theme.__getitem__.side_effect = self.colors.__getitem__
+
+    def test_apply_writes_rendered_templates(self):
+        """Test if each template is rendered into its output file."""
+        outputs = {
+            self.write('a.tpl', 'bg={base00}'): os.path.join(
+                self.dir.name, 'a.conf'),
+            self.write('b.tpl', 'fg={base05} bg={base00}'): os.path.join(
+                self.dir.name, 'b.conf')
+        }
+
+        TemplateThemeApplier(outputs).apply(self.theme)
+
+        for name, expected in (('a.conf', 'bg=#181818'),
+                               ('b.conf', 'fg=#d8d8d8 bg=#181818')):
+            with open(os.path.join(self.dir.name, name)) as f:
+                self.assertEqual(expected, f.read())
+        self.assertCountEqual(
+            ['base00', 'base05'],
+            [c[0][0] for c in self.theme.__getitem__.call_args_list]
+        )
+
+    def test_prepare_writes_files_on_commit(self):
+        """Test if output files are replaced only on commit."""
+        output = self.write('a.conf', 'old')
+        applier = TemplateThemeApplier({
+            self.write('a.tpl', 'bg={base00}'): output
+        })
+
+        change = applier.prepare(self.theme)
+        with open(output) as f:
+            self.assertEqual('old', f.read())
+        change.commit()
+
+        with open(output) as f:
+            self.assertEqual('bg=#181818', f.read())
+
+    def test_abort_removes_staged_files(self):
+        """Test if aborting leaves only the original files."""
+        output = self.write('a.conf', 'old')
+        template = self.write('a.tpl', 'bg={base00}')
+
+        TemplateThemeApplier({template: output}).prepare(self.theme).abort()
+
+        with open(output) as f:
+            self.assertEqual('old', f.read())
+        self.assertCountEqual(['a.conf', 'a.tpl'], os.listdir(self.dir.name))
+
+    def test_apply_keeps_permissions_and_symbolic_links(self):
+        """Test if a linked output file is replaced with its mode."""
+        target = self.write('a.conf', 'old')
+        os.chmod(target, 0o640)
+        link = os.path.join(self.dir.name, 'link.conf')
+        os.symlink(target, link)
+
+        TemplateThemeApplier({
+            self.write('a.tpl', 'bg={base00}'): link
+        }).apply(self.theme)
+
+        self.assertTrue(os.path.islink(link))
+        with open(target) as f:
+            self.assertEqual('bg=#181818', f.read())
+        self.assertEqual(0o640, os.stat(target).st_mode & 0o777)
+
+    def test_apply_raises_ConfiguredFileNotFoundError(self):
+        """Test if the error is raised for a missing template."""
+        outputs = {
+            os.path.join(self.dir.name, 'missing.tpl'): os.path.join(
+                self.dir.name, 'out.conf')
+        }
+        with self.assertRaises(ConfiguredFileNotFoundError):
+            TemplateThemeApplier(outputs).apply(self.theme)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Tests for changing colors of running terminals."""
+
+import os
+import pty
+import tty
+import unittest
+from unittest.mock import MagicMock, patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.app import TerminalColorsApplier
+from base16_theme_switcher.schemes import COLOR_NAMES
+from base16_theme_switcher.terminals import (
+    find_terminals,
+    get_osc_sequences,
+    write_to_terminals,
+)
+
+COLORS = {n: '#{0}{0}{0}'.format(n[-1].lower() * 2) for n in COLOR_NAMES}
+
+
+class GetOscSequencesTest(unittest.TestCase):
+    """Tests for get_osc_sequences function."""
+
+    @parameterized.expand([
+        ('palette_color', '\033]4;1;rgb:88/88/88\033\\'),
+        ('last_palette_color', '\033]4;21;rgb:66/66/66\033\\'),
+        ('foreground', '\033]10;rgb:55/55/55\033\\'),
+        ('background', '\033]11;rgb:00/00/00\033\\'),
+        ('cursor', '\033]12;rgb:55/55/55\033\\')
+    ])
+    def test_contains(self, _, expected):
+        """Test if the sequences set an expected color.
+
+        :param expected: an expected sequence.
+        """
+        self.assertIn(expected, get_osc_sequences(COLORS))
+
+
+class PseudoTerminalTestCase(unittest.TestCase):
+    """A base for tests using pseudo-terminals."""
+
+    def open_terminal(self):
+        """Open a pseudo-terminal closed after the test.
+
+        The terminal is put in raw mode, so the written data is passed
+        to the master side unchanged.
+
+        :returns: a tuple containing a descriptor of the master side
+            and a path to the terminal.
+        """
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.addCleanup(os.close, master)
+        self.addCleanup(os.close, slave)
+        return master, os.ttyname(slave)
+
+    @staticmethod
+    def read_all(fd, size):
+        """Read a given number of bytes from a descriptor.
+
+        :param fd: the descriptor.
+        :param size: the number of bytes.
+        :returns: the bytes.
+        """
+        data = b''
+        while len(data) < size:
+            data += os.read(fd, size - len(data))
+        return data
+
+
+class FindTerminalsTest(PseudoTerminalTestCase):
+    """Tests for find_terminals function."""
+
+    def test_finds_terminals_of_user(self):
+        """Test if an open pseudo-terminal is found."""
+        _, path = self.open_terminal()
+
+        self.assertIn(path, find_terminals(os.path.dirname(path)))
+
+    def test_skips_terminals_of_other_users(self):
+        """Test if pseudo-terminals of another user are not found."""
+        _, path = self.open_terminal()
+
+        self.assertNotIn(
+            path, find_terminals(os.path.dirname(path), os.getuid() + 1)
+        )
+
+    def test_returns_empty_list_for_missing_dir(self):
+        """Test if no terminals are found in a missing directory."""
+        self.assertEqual([], find_terminals('/nonexistent/pts'))
+
+
+class WriteToTerminalsTest(PseudoTerminalTestCase):
+    """Tests for write_to_terminals function."""
+
+    def test_writes_to_all_terminals(self):
+        """Test if the data is written to each terminal."""
+        terminals = [self.open_terminal() for _ in range(3)]
+        data = get_osc_sequences(COLORS).encode('ascii')
+
+        errors = write_to_terminals([p for _, p in terminals], data, 1)
+
+        self.assertEqual({}, errors)
+        for master, _ in terminals:
+            self.assertEqual(data, self.read_all(master, len(data)))
+
+    def test_times_out_for_terminal_not_read(self):
+        """Test if writing to a terminal that isn't read times out."""
+        _, path = self.open_terminal()
+
+        errors = write_to_terminals([path], b'x' * 1024 * 1024, 0.1)
+
+        self.assertIsInstance(errors[path], TimeoutError)
+
+    def test_reports_missing_terminal(self):
+        """Test if an error is returned for a missing terminal."""
+        errors = write_to_terminals(['/nonexistent/pts/0'], b'data', 1)
+
+        self.assertIsInstance(errors['/nonexistent/pts/0'], OSError)
+
+
+class TerminalColorsApplierTest(PseudoTerminalTestCase):
+    """Tests for TerminalColorsApplier class."""
+
+    def test_recolors_terminals(self):
+        """Test if escape sequences of the theme are written."""
+        master, path = self.open_terminal()
+        theme = MagicMock()
+        theme.__getitem__.side_effect = COLORS.__getitem__
+        expected = get_osc_sequences(COLORS).encode('ascii')
+
+        with patch(
+            'base16_theme_switcher.app.find_terminals', return_value=[path]
+        ):
+            TerminalColorsApplier().apply(theme)
+
+        self.assertEqual(expected, self.read_all(master, len(expected)))
@@ -1,16 +1,30 @@
 # -*- coding: utf-8 -*-
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import Mock, MagicMock
 
 from parameterized import parameterized
 
+from base16_theme_switcher.schemes import SchemeCache
 from base16_theme_switcher.themes import (
+    Base16SchemeTheme,
     Base16Theme,
     Base16ThemeNameMap,
     DuplicateThemeNameError,
+    FrozenTheme,
     InvalidThemeError,
+    ProbedThemeNameMap,
+    StreamedThemeNameMap,
+    ThemeNameChange,
+    stream_theme_names,
 )
 
+from .test_schemes import SchemeFileTestCase, get_scheme_text
+
 
 class Base16ThemeTest(TestCase):
     """Tests for Base16Theme class."""
@@ -88,21 +102,97 @@ class Base16ThemeTest(TestCase):
         with self.assertRaisesRegex(InvalidThemeError, msg):
             _ = self.tested['base01']
 
+    def test_derived_colors_are_memoized(self):
+        """Test if representations of colors are computed only once."""
+        self.path.read_text.return_value = '\n'.join(
+            '#define base0{} #0{}0{}0{}'.format(c, c, c, c)
+            for c in '0123456789ABCDEF'
+        )
+
+        derived_colors = self.tested.derived_colors
+
+        self.assertEqual((10, 10, 10), derived_colors.rgb('base0A'))
+        self.assertIs(derived_colors, self.tested.derived_colors)
+
     def test_find_all_in(self):
         """Test if the class method returns expected theme objects.
 
         The expected theme objects are instances of Base16Theme
-        representing all .Xresources files found under a directory with
-        given path.
+        representing all .Xresources files found under directories with
+        given paths, in order of the directories.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            expected_paths = []
+            for name in 'first/a', 'first/sub/b', 'second/a', 'second/c':
+                path = Path(root, name + '.Xresources')
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+                expected_paths.append(path)
+            dir_paths = []
+            for name in 'first', 'second':
+                dir_path = MagicMock()
+                dir_path.__enter__.return_value = Path(root, name)
+                dir_paths.append(dir_path)
+
+            actual_paths = [
+                t.path for t in Base16Theme.find_all_in(dir_paths)
+            ]
+
+        self.assertEqual(expected_paths, actual_paths)
+
+
+class Base16SchemeThemeTest(TestCase):
+    """Tests for Base16SchemeTheme class."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'example-scheme.yaml')
+        with open(self.path, 'w') as f:
+            f.write('scheme: "Example"\nbase00: "181818"\nbase01: "fffggg"\n')
+        self.tested = Base16SchemeTheme(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_name(self):
+        """Test if the name of the theme is the name of the file."""
+        self.assertEqual('example-scheme', self.tested.name)
+
+    def test_getitem_returns_color(self):
+        """Test if a color defined in the scheme is returned."""
+        self.assertEqual('#181818', self.tested['base00'])
+
+    @parameterized.expand([
+        ('invalid', 'base01'),
+        ('missing', 'base02')
+    ])
+    def test_getitem_raises_InvalidThemeError_for(self, error, name):
+        """Test if the error is raised for an incorrect color.
+
+        :param error: a description of the error.
+        :param name: a name of the requested color.
         """
-        expected_paths = [Mock() for _ in range(4)]
-        dir_path = MagicMock()
-        dir_path.rglob.side_effect = (
-            lambda c: expected_paths if c == '*.Xresources' else []
+        msg = '{} color definition in {}: {}'.format(
+            error.capitalize(), self.path, name
         )
+        with self.assertRaisesRegex(InvalidThemeError, msg):
+            _ = self.tested[name]
+
+    def test_getitem_uses_cache(self):
+        """Test if colors are taken from the scheme cache."""
+        cache = Mock()
+        cache.get.return_value.definitions = {'base00': '#000000'}
+        tested = Base16SchemeTheme(self.path, cache)
+
+        self.assertEqual('#000000', tested['base00'])
+        cache.get.assert_called_once_with(self.path)
 
-        actual_paths = [t.path for t in Base16Theme.find_all_in(dir_path)]
-        self.assertCountEqual(expected_paths, actual_paths)
+    def test_content_contains_resources(self):
+        """Test if the scheme is converted to X resources."""
+        content = self.tested.content
+
+        self.assertIn('#define base00 #181818', content)
+        self.assertIn('*background:   base00', content)
 
 
 def theme_mock(name='example-theme'):
@@ -208,3 +298,274 @@ class Base16ThemeNameMapTest(TestCase):
         expected = Base16ThemeNameMap(unique_themes)
         actual = Base16ThemeNameMap.from_unique(with_duplicates)
         self.assertEqual(expected, actual)
+
+
+class ProbeInTest(TestCase):
+    """Tests for Base16Theme.probe_in method."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _make(self, *names):
+        for name in names:
+            path = Path(self.dir.name, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                get_scheme_text() if path.suffix == '.yaml' else ''
+            )
+
+    def _probe(self, roots, name, directories=None):
+        paths = []
+        for root in roots:
+            path = MagicMock()
+            path.__enter__.return_value = Path(self.dir.name, root)
+            paths.append(path)
+        return Base16Theme.probe_in(paths, name, directories=directories)
+
+    def test_returns_theme_from_first_root(self):
+        """Test if a theme from the first root containing it is found."""
+        self._make('first/base16/a.yaml', 'second/a.Xresources')
+
+        theme = self._probe(['second', 'first'], 'a')
+
+        self.assertEqual(
+            Path(self.dir.name, 'second', 'a.Xresources'), theme.path
+        )
+        self.assertNotIsInstance(theme, Base16SchemeTheme)
+
+    def test_returns_scheme_theme(self):
+        """Test if a scheme file is found as a scheme theme."""
+        self._make('first/base16/a.yaml')
+
+        self.assertIsInstance(
+            self._probe(['first'], 'a'), Base16SchemeTheme
+        )
+
+    @parameterized.expand([
+        ('missing', ['first/b.yaml', 'first/x/a.yaml']),
+        ('ambiguous', ['first/a.yaml', 'first/xresources/a.Xresources'])
+    ])
+    def test_returns_none(self, _, names):
+        """Test if None is returned if no unique theme is found.
+
+        :param names: names of files in the theme directory.
+        """
+        self._make(*names)
+
+        self.assertIsNone(self._probe(['first'], 'a'))
+
+    def test_returns_none_for_other_yaml_file(self):
+        """Test if a YAML file that isn't a scheme isn't a theme."""
+        Path(self.dir.name, 'first').mkdir()
+        Path(self.dir.name, 'first', 'config.yaml').write_text(
+            'output: xresources\n'
+        )
+
+        self.assertIsNone(self._probe(['first'], 'config'))
+
+    def test_probes_known_directories(self):
+        """Test if known directories containing themes are probed."""
+        self._make('first/x/a.yaml')
+
+        theme = self._probe(
+            ['first'], 'a', [os.path.join(self.dir.name, 'first', 'x')]
+        )
+
+        self.assertEqual(
+            Path(self.dir.name, 'first', 'x', 'a.yaml'), theme.path
+        )
+
+
+class ProbedThemeNameMapTest(TestCase):
+    """Tests for ProbedThemeNameMap class."""
+
+    def setUp(self):
+        self.theme = Mock()
+        self.theme.name = 'probed'
+        self.all_themes = MagicMock()
+        self.find_all = Mock(return_value=self.all_themes)
+        self.tested = ProbedThemeNameMap(self.theme, self.find_all)
+
+    def test_gets_probed_theme_without_search(self):
+        """Test if the probed theme is returned without a search."""
+        self.assertIs(self.theme, self.tested['probed'])
+        self.assertTrue(self.tested)
+        self.find_all.assert_not_called()
+
+    def test_searches_for_other_theme(self):
+        """Test if all themes are searched for once for another theme."""
+        self.tested['other']
+        self.tested.sorted_by_name
+
+        self.find_all.assert_called_once_with()
+        self.all_themes.__getitem__.assert_called_once_with('other')
+        self.assertIs(
+            self.all_themes.sorted_by_name, self.tested.sorted_by_name
+        )
+
+
+class StreamedThemeNameMapTest(TestCase):
+    """Tests for StreamedThemeNameMap class."""
+
+    def setUp(self):
+        self.all_themes = Base16ThemeNameMap(
+            Base16Theme(Path('/themes', n + '.Xresources'))
+            for n in ('cached', 'late', 'new')
+        )
+        self.found = threading.Event()
+
+    def find_all(self, on_found):
+        """Report theme files in two batches, waiting between them.
+
+        :param on_found: a callable reporting found theme files.
+        :returns: a collection of all themes.
+        """
+        on_found(['/themes/new.Xresources', '/themes/cached.yaml'])
+        self.found.wait(5)
+        return self.all_themes
+
+    def test_changes_starts_with_cached_names(self):
+        """Test if cached and found names are streamed during a search."""
+        tested = StreamedThemeNameMap(self.find_all, ['cached', 'old'])
+        changes = tested.changes()
+
+        first = [next(changes) for _ in range(3)]
+        self.found.set()
+
+        self.assertEqual([
+            ThemeNameChange('cached', True),
+            ThemeNameChange('old', True),
+            ThemeNameChange('new', True)
+        ], first)
+        self.assertEqual([
+            ThemeNameChange('old', False),
+            ThemeNameChange('late', True)
+        ], list(changes))
+
+    def test_getitem_waits_for_search(self):
+        """Test if themes are taken from the finished search."""
+        self.found.set()
+        tested = StreamedThemeNameMap(self.find_all)
+
+        self.assertIs(self.all_themes['late'], tested['late'])
+        self.assertEqual(3, len(tested))
+
+    def test_raises_error_of_search(self):
+        """Test if an error of the search is raised to its users."""
+        def find_all(on_found):
+            on_found(['/themes/new.yaml'])
+            raise ValueError('no themes')
+
+        tested = StreamedThemeNameMap(find_all)
+        changes = tested.changes()
+
+        self.assertEqual(ThemeNameChange('new', True), next(changes))
+        with self.assertRaisesRegex(ValueError, 'no themes'):
+            next(changes)
+        with self.assertRaisesRegex(ValueError, 'no themes'):
+            tested['new']
+        self.assertTrue(tested)
+
+    def test_stream_theme_names_of_other_mapping(self):
+        """Test if names of other collections are streamed sorted."""
+        self.assertEqual(
+            [ThemeNameChange(n, True) for n in ('cached', 'late', 'new')],
+            list(stream_theme_names(self.all_themes))
+        )
+
+
+class FrozenThemeTest(SchemeFileTestCase):
+    """Tests for snapshots of themes."""
+
+    def setUp(self):
+        super().setUp()
+        self.theme = Base16SchemeTheme(
+            Path(self.write('dark.yaml', get_scheme_text()))
+        )
+
+    def test_snapshot_contains_loaded_theme(self):
+        """Test if a snapshot provides everything the theme provides."""
+        tested = self.theme.snapshot()
+
+        self.assertIsInstance(tested, FrozenTheme)
+        self.assertEqual(
+            ('dark', str(self.theme.path), self.theme.content),
+            (tested.name, tested.path, tested.content)
+        )
+        self.assertEqual('#777777', tested['base07'])
+        self.assertEqual(self.theme.definitions, dict(tested.definitions))
+        self.assertEqual((119, 119, 119), tested.derived_colors.rgb('base07'))
+        with self.assertRaises(KeyError):
+            tested['base10']
+
+    def test_snapshot_is_immutable(self):
+        """Test if attributes and definitions can't be changed."""
+        tested = self.theme.snapshot()
+
+        with self.assertRaises(AttributeError):
+            tested.name = 'other'
+        with self.assertRaises(TypeError):
+            tested.definitions['base00'] = '#000000'
+
+    def test_snapshot_is_hashable_and_picklable(self):
+        """Test if a snapshot is equal to its unpickled copy."""
+        tested = self.theme.snapshot()
+
+        restored = pickle.loads(pickle.dumps(tested))
+
+        self.assertEqual(tested, restored)
+        self.assertEqual(hash(tested), hash(restored))
+        for name in 'base00', 'base0D':
+            self.assertEqual(
+                (tested.derived_colors.xterm256(name),
+                 tested.derived_colors.hsl(name)),
+                (restored.derived_colors.xterm256(name),
+                 restored.derived_colors.hsl(name))
+            )
+        self.assertIs(restored, restored.snapshot())
+
+    def test_snapshot_raises_InvalidThemeError(self):
+        """Test if an invalid theme can't be snapshotted."""
+        theme = Base16SchemeTheme(
+            Path(self.write('broken.yaml', get_scheme_text(base0A=None)))
+        )
+
+        with self.assertRaises(InvalidThemeError):
+            theme.snapshot()
+
+
+class FromUniqueInTest(SchemeFileTestCase):
+    """Tests for Base16ThemeNameMap.from_unique_in method."""
+
+    def setUp(self):
+        super().setUp()
+        for name in 'templates', 'schemes':
+            os.mkdir(os.path.join(self.dir.name, name))
+        self.write('schemes/dark.yaml', get_scheme_text())
+        self.write('schemes/light.yaml', get_scheme_text())
+        self.write(
+            'templates/config.yaml',
+            'default:\n  extension: .Xresources\n  output: xresources\n'
+        )
+        self.write('schemes/broken.yaml', get_scheme_text(base0F=None))
+
+    @parameterized.expand([
+        ('without_cache', False),
+        ('with_cache', True)
+    ])
+    def test_leaves_out_other_yaml_files(self, _, cached):
+        """Test if only YAML files that are schemes become themes.
+
+        :param cached: True if a scheme cache is to be used.
+        """
+        cache = None
+        if cached:
+            cache = SchemeCache(os.path.join(self.dir.name, 'cache'))
+
+        themes = Base16ThemeNameMap.from_unique_in(self.dir.name, cache)
+
+        self.assertEqual(['dark', 'light'], sorted(themes))
+        self.assertEqual(
+            ['dark', 'light'], [t.name for t in themes.sorted_by_name]
+        )
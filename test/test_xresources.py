@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Tests for merging changed X resources."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from base16_theme_switcher.schemes import COLOR_NAMES, to_xresources
+from base16_theme_switcher.xresources import (
+    ResourceDatabase,
+    expand_resources,
+    get_server_stamp,
+    parse_resources,
+)
+
+FAKE_XRDB = '''\
+#!{python}
+"""A fake xrdb keeping resources in a JSON file."""
+import json
+import os
+import sys
+
+DATABASE = os.path.join(os.path.dirname(__file__), 'database.json')
+with open(os.path.join(os.path.dirname(__file__), 'calls'), 'a') as f:
+    f.write(json.dumps(sys.argv[1:]) + '\\n')
+try:
+    with open(DATABASE) as f:
+        database = json.load(f)
+except FileNotFoundError:
+    database = {{}}
+if '-query' in sys.argv:
+    for name, value in sorted(database.items()):
+        print('{{}}:\\t{{}}'.format(name, value))
+elif '-merge' in sys.argv:
+    for line in sys.stdin:
+        name, _, value = line.partition(':')
+        if name and not name.startswith('#'):
+            database[name.strip()] = value.strip()
+    with open(DATABASE, 'w') as f:
+        json.dump(database, f)
+'''
+
+COLORS = {n: '#{0}{0}{0}'.format(n[-1].lower() * 2) for n in COLOR_NAMES}
+
+
+class ExpandResourcesTest(unittest.TestCase):
+    """Tests for expand_resources function."""
+
+    def test_expands_theme(self):
+        """Test if macros of a base16 theme are expanded."""
+        resources = expand_resources(to_xresources(COLORS))
+
+        self.assertEqual('#555555', resources['*foreground'])
+        self.assertEqual('#000000', resources['*background'])
+        self.assertEqual('#666666', resources['*color21'])
+        self.assertEqual(25, len(resources))
+
+    def test_expands_defined_conditions(self):
+        """Test if a branch of a condition is chosen by a definition."""
+        content = '#define opacity\n' + to_xresources(COLORS).replace(
+            'background_opacity', 'opacity'
+        ).replace('[opacity]', '[90]')
+
+        resources = expand_resources(content)
+
+        self.assertEqual('[90]#000000', resources['*background'])
+
+    @parameterized.expand([
+        ('include', '#include "colors"\n*foreground: base05\n'),
+        ('if', '#if 1\n*foreground: #000000\n#endif\n'),
+        ('predefined_symbol', '#ifdef COLOR\n*foreground: #000000\n#endif\n'),
+        ('function_macro', '#define f(x) x\n*foreground: f(#000000)\n'),
+        ('comment', '/* comment */\n*foreground: #000000\n'),
+        ('unterminated_condition', '#ifdef a\n*foreground: #000000\n')
+    ])
+    def test_returns_none_for_unsupported(self, _, content):
+        """Test if None is returned for unsupported content.
+
+        :param content: the content.
+        """
+        self.assertIsNone(expand_resources(content))
+
+
+class ParseResourcesTest(unittest.TestCase):
+    """Tests for parse_resources function."""
+
+    def test_normalizes_loose_bindings(self):
+        """Test if equivalent names of resources are the same."""
+        self.assertEqual(
+            {'*foreground': '#ffffff', 'URxvt*background': '#000000'},
+            parse_resources(
+                '*.foreground:\t#ffffff\nURxvt*.background:\t#000000\n'
+            )
+        )
+
+
+class ResourceDatabaseTest(unittest.TestCase):
+    """Tests for ResourceDatabase class using a fake xrdb."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        xrdb = os.path.join(self.directory, 'xrdb')
+        with open(xrdb, 'w') as f:
+            f.write(FAKE_XRDB.format(python=sys.executable))
+        os.chmod(xrdb, 0o755)
+        patcher = patch.dict(os.environ, {
+            'PATH': self.directory + os.pathsep + os.environ['PATH']
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tested = ResourceDatabase(':1')
+
+    def _get_calls(self):
+        try:
+            with open(os.path.join(self.directory, 'calls')) as f:
+                return [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return []
+
+    def _get_database(self):
+        with open(os.path.join(self.directory, 'database.json')) as f:
+            return json.load(f)
+
+    def test_queries_database_once(self):
+        """Test if the database is queried only by the first merge."""
+        self.tested.merge(to_xresources(COLORS))
+        self.tested.merge(to_xresources(dict(COLORS, base00='#101010')))
+
+        queries = [c for c in self._get_calls() if '-query' in c]
+        self.assertEqual([['-display', ':1', '-query']], queries)
+
+    def test_merges_only_changed_resources(self):
+        """Test if only resources with changed values are merged."""
+        self.tested.merge(to_xresources(COLORS))
+
+        changed = self.tested.merge(
+            to_xresources(dict(COLORS, base00='#101010'))
+        )
+
+        self.assertEqual(
+            {'*background': '#101010', '*color0': '#101010'}, changed
+        )
+        self.assertEqual('#101010', self._get_database()['*color0'])
+        self.assertEqual(
+            ['-display', ':1', '-nocpp', '-merge'], self._get_calls()[-1]
+        )
+
+    def test_skips_xrdb_for_unchanged_theme(self):
+        """Test if xrdb isn't executed if no resources changed."""
+        self.tested.merge(to_xresources(COLORS))
+        count = len(self._get_calls())
+
+        self.assertEqual({}, self.tested.merge(to_xresources(COLORS)))
+        self.assertEqual(count, len(self._get_calls()))
+
+    def test_uses_existing_resources(self):
+        """Test if resources already in the database are not merged."""
+        with open(os.path.join(self.directory, 'database.json'), 'w') as f:
+            json.dump({'*.foreground': COLORS['base05']}, f)
+
+        changed = self.tested.merge(to_xresources(COLORS))
+
+        self.assertNotIn('*foreground', changed)
+        self.assertIn('*background', changed)
+
+    def test_merges_unsupported_content_whole(self):
+        """Test if unsupported content is merged whole."""
+        self.tested.merge(to_xresources(COLORS))
+        content = '#include "colors"\n'
+
+        self.assertIsNone(self.tested.merge(content))
+        self.tested.merge(to_xresources(COLORS))
+
+        calls = self._get_calls()
+        self.assertIn(['-display', ':1', '-merge'], calls)
+        self.assertEqual(2, sum('-query' in c for c in calls))
+
+
+class GetServerStampTest(unittest.TestCase):
+    """Tests for get_server_stamp function."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.socket_dir = directory.name
+        open(os.path.join(self.socket_dir, 'X1'), 'w').close()
+
+    @parameterized.expand([
+        ('plain', ':1'),
+        ('with_screen', ':1.0'),
+        ('unix', 'unix:1')
+    ])
+    def test_identifies_local_display(self, _, display):
+        """Test if a display with a socket gets its number.
+
+        :param display: a name of the display.
+        """
+        stamp = get_server_stamp(display, self.socket_dir)
+
+        self.assertEqual('1', stamp[0])
+
+    @parameterized.expand([
+        ('remote', 'example.com:1'),
+        ('missing_socket', ':2'),
+        ('invalid', 'x')
+    ])
+    def test_returns_none(self, _, display):
+        """Test if displays without local sockets aren't identified.
+
+        :param display: a name of the display.
+        """
+        self.assertIsNone(get_server_stamp(display, self.socket_dir))
+
+    def test_changes_after_restart(self):
+        """Test if a new socket of the display gets a new stamp."""
+        socket = os.path.join(self.socket_dir, 'X1')
+        before = get_server_stamp(':1', self.socket_dir)
+        os.unlink(socket)
+        open(os.path.join(self.socket_dir, 'other'), 'w').close()
+        open(socket, 'w').close()
+
+        self.assertNotEqual(before, get_server_stamp(':1', self.socket_dir))
+
+
+class SavedResourceDatabaseTest(ResourceDatabaseTest):
+    """Tests for ResourceDatabase class saving its model."""
+
+    def setUp(self):
+        super().setUp()
+        self.socket_dir = os.path.join(self.directory, 'sockets')
+        os.mkdir(self.socket_dir)
+        open(os.path.join(self.socket_dir, 'X1'), 'w').close()
+        self.tested = self._create_tested()
+
+    def _create_tested(self):
+        return ResourceDatabase(
+            ':1', os.path.join(self.directory, 'state'), self.socket_dir
+        )
+
+    def _count_queries(self):
+        return sum('-query' in c for c in self._get_calls())
+
+    def test_uses_saved_model(self):
+        """Test if another instance doesn't query the database."""
+        self.tested.merge(to_xresources(COLORS))
+
+        changed = self._create_tested().merge(
+            to_xresources(dict(COLORS, base00='#101010'))
+        )
+
+        self.assertEqual(
+            {'*background': '#101010', '*color0': '#101010'}, changed
+        )
+        self.assertEqual(1, self._count_queries())
+
+    def test_queries_restarted_server(self):
+        """Test if a model saved for another server is discarded."""
+        self.tested.merge(to_xresources(COLORS))
+        socket = os.path.join(self.socket_dir, 'X1')
+        os.unlink(socket)
+        open(os.path.join(self.socket_dir, 'other'), 'w').close()
+        open(socket, 'w').close()
+        os.unlink(os.path.join(self.directory, 'database.json'))
+
+        changed = self._create_tested().merge(to_xresources(COLORS))
+
+        self.assertIn('*background', changed)
+        self.assertEqual(2, self._count_queries())
+
+    def test_discards_model_after_whole_merge(self):
+        """Test if the saved model isn't used after a whole merge."""
+        self.tested.merge(to_xresources(COLORS))
+        self.tested.merge('#include "colors"\n')
+
+        self._create_tested().merge(to_xresources(COLORS))
+
+        self.assertEqual(2, self._count_queries())